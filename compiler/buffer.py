@@ -9,10 +9,15 @@ Authors: Albert Wu
 This file is designed to run on python3
 """
 
+import re
+
 DELIMS = ('{', '}',
           '(', ')',
           '=', '.',
           ';', ',')
+# String and char literals are single tokens, however many delimiters
+# they hold.
+LITERAL = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
 PS1 = 'compil> '
 PS2 = '        '
 interrupt = '\nExiting compiler'
@@ -75,10 +80,23 @@ class Buffer:
         ['class', 'Ex', '{', 'int', 'x', '=', '4', ';', '}']
         >>> Buffer.tokenize("int x() {}")
         ['int', 'x', '(', ')', '{', '}']
+        >>> Buffer.tokenize('s = "a, b.";')
+        ['s', '=', '"a, b."', ';']
         """
+        tokens, position = [], 0
+        for literal in LITERAL.finditer(line):
+            tokens.extend(Buffer.split(line[position:literal.start()]))
+            tokens.append(literal.group(0))
+            position = literal.end()
+        return tokens + Buffer.split(line[position:])
+
+    @staticmethod
+    def split(text):
+        """Splits text holding no literals at whitespace and around
+        the delimiters."""
         for delim in DELIMS:
-            line = line.replace(delim, ' ' + delim + ' ')
-        return line.split()
+            text = text.replace(delim, ' ' + delim + ' ')
+        return text.split()
 
     @property
     def empty(self):
@@ -85,6 +85,7 @@ def eval_class(stmt):
             eval_variable(cls, expr)
         elif op == METHOD:
             eval_method(cls, expr)
+    build_constant_pool(cls)
     return cls
 
 def eval_variable(cls, expr):
@@ -98,7 +99,7 @@ def eval_variable(cls, expr):
     """
     assert expr.type == VARIABLE, 'Not a valid var: {}'.format(expr)
     var = Variable(expr['datatype'], expr['name'], expr['value'], 
-            expr['static'], expr['private'])
+            expr['static'], expr['private'], expr['final'])
     cls.declare_var(var)
 
 
@@ -117,7 +118,24 @@ def eval_method(cls, expr):
     assert expr.type == METHOD, 'Not a valid method: {}'.format(expr)
     is_constructor = expr['name'] == cls.name;
     cls.declare_method(Method(None if is_constructor else expr['name'],
-        expr['datatype'], expr['args'], expr['body']))
+        expr['datatype'], expr['args'], expr['body'], expr['static'],
+        expr['private'], expr['final'], expr['annotations'],
+        expr['synchronized']))
+
+
+def build_constant_pool(cls):
+    """Adds the literals of CLS's field initializers, constructors and
+    methods to its constant pool (see structures.ConstantPool).
+
+    DESCRIPTION:
+    Each literal is parsed here, once; at run time the interpreter
+    reads its value from the pool instead of parsing its text again.
+    """
+    for var in cls.instance_attr.values():
+        if var.value is not None:
+            cls.constants.add_all(var.value)
+    for method in list(cls.constructors.values()) + list(cls.methods.values()):
+        cls.constants.add_all(method.body)
 
 
 ################
@@ -109,6 +109,33 @@ def validate_name(name):
     if not re.match("[a-zA-Z][\w]*$", name):
         raise CompileException("invalid identifier: '{}'".format(name))
 
+def read_type(datatype, tokens):
+    """Reads a type whose first token is DATATYPE, and validates it.
+
+    DESCRIPTION:
+    A valid type is an identifier, optionally followed by type
+    arguments in angle brackets: 'HashMap<String, Integer>', and by
+    array brackets: 'int[][]'. The
+    buffer splits type arguments at their commas, so the remaining
+    tokens are popped off TOKENS and joined back together, without
+    spaces.
+
+    ARGUMENTS:
+    datatype -- the first token of the type
+    tokens   -- Buffer of tokens
+
+    RETURNS:
+    The type, a string
+
+    >>> read_type('HashMap<String', Buffer(', List<Integer>> m;'))
+    'HashMap<String,List<Integer>>'
+    """
+    while datatype.count('<') > datatype.count('>'):
+        datatype += tokens.pop()
+    if not re.match(r"[a-zA-Z][\w]*(<[\w<>,?]*>)?(\[\])*$", datatype):
+        raise CompileException("invalid type: '{}'".format(datatype))
+    return datatype
+
 def is_number(token):
     """Returns True if token can be converted to an int."""
     try:
@@ -145,31 +172,48 @@ def read_statement(tokens):
         value: Statement(EXPR)
     - Method Declaration:
         type: METHOD, name: string, datatype: string,
-        args:  list of pairs, body: list of Statements
+        args:  list of pairs, body: list of Statements,
+        annotations: list of the names of its annotations
+        ("@Memoize" gives 'Memoize')
     - Constructor Declaration:
         type: METHOD, name: string, datatype: None,
         args:  list of pairs, body: list of Statements
     """
     val = tokens.pop()
 
+    annotations = []
+    while val.startswith('@'):
+        annotations.append(val[1:])
+        val = tokens.pop()
+
     is_private = False
     if val.lower() in MODIFIERS:
         is_private = val == 'private'
         val = tokens.pop()
 
-    is_static = False
-    if val == 'static':
-        is_static = True
+    is_static, is_final, is_synchronized = False, False, False
+    while val in ('static', 'final', 'synchronized'):
+        is_static = is_static or val == 'static'
+        is_final = is_final or val == 'final'
+        is_synchronized = is_synchronized or val == 'synchronized'
         val = tokens.pop()
         
     if val == 'class':
-        if is_static:
-            raise CompileException('invalid modifier for class: static')
+        if is_static or is_synchronized:
+            raise CompileException('invalid modifier for class: ' +
+                                   ('static' if is_static else 'synchronized'))
         return read_class(is_private, tokens)
     else:
         # val is expected to be a type declaration
-        validate_name(val)
-        return read_declare(is_private, is_static, val, tokens)
+        datatype = read_type(val, tokens)
+        result = read_declare(is_private, is_static, datatype, tokens,
+                              is_final)
+        if result.type == METHOD:
+            result['annotations'] = annotations
+            result['synchronized'] = is_synchronized
+        elif is_synchronized:
+            raise CompileException('invalid modifier for field: synchronized')
+        return result
 
 def read_class(is_private, tokens):
     """Reads a complete class declaration.
@@ -206,7 +250,7 @@ def read_class(is_private, tokens):
     return Statement(CLASS, name=name, body=exp, super=superclass,
                     private=is_private)
 
-def read_declare(is_private, is_static, datatype, tokens):
+def read_declare(is_private, is_static, datatype, tokens, is_final=False):
     """Reads a complete field declaration.
     
     DESCRIPTION:
@@ -226,6 +270,7 @@ def read_declare(is_private, is_static, datatype, tokens):
     is_static  -- True if the field is static, False otherwise
     datatype   -- a string, the type of variable
     tokens     -- Buffer of tokens
+    is_final   -- True if the field is final, False otherwise
 
     RETURNS:
     The following dictionary:
@@ -234,19 +279,20 @@ def read_declare(is_private, is_static, datatype, tokens):
       'type':    type, string
       'private': True if field is private, False otherwise
       'static':  True if field is static, False otherwise
+      'final':   True if field is final, False otherwise
       }
     """
     name = tokens.pop()
     if name == '(':
         # expect it to be a constructor
         return read_method(is_private, is_static, None, datatype, 
-                tokens)
+                tokens, is_final)
     validate_name(name)
     
     next_token = tokens.pop()
     if next_token == '(':
         return read_method(is_private, is_static, datatype, 
-                           name, tokens)
+                           name, tokens, is_final)
     elif next_token == '=':
         result = read_assign(is_private, is_static, datatype, name, 
                             tokens)
@@ -254,9 +300,12 @@ def read_declare(is_private, is_static, datatype, tokens):
     else:
         result = Statement(VARIABLE, name=name, datatype=datatype, 
                 private=is_private, static=is_static, value=None)
+    result['final'] = is_final
 
     if next_token == ',':
         tokens.prepend(datatype)
+        if is_final:
+            tokens.prepend('final')
         if is_static:
             tokens.prepend('static')
         if is_private:
@@ -292,10 +341,14 @@ def read_expr(tokens):
     x.method(arg)
     x + y.method(arg)
     Ex(arg)
+    new HashMap<String, Integer>()
     """
-    result = []
-    while tokens.current() != ';' and tokens.current() != ',':
+    result, generics = [], 0
+    while generics or (tokens.current() != ';' and tokens.current() != ','):
         next_token = tokens.pop()
+        if generics or re.match(r'[A-Z][\w]*<', next_token):
+            # the commas between type arguments do not end the expression
+            generics += next_token.count('<') - next_token.count('>')
         if result and is_number(result[-1]) and next_token == '.':
             decimal = tokens.current()
             if is_number(decimal):
@@ -311,7 +364,8 @@ def read_expr(tokens):
 
 
 
-def read_method(is_private, is_static, datatype, name, tokens):
+def read_method(is_private, is_static, datatype, name, tokens,
+                is_final=False):
     """Reads a method declaration.
     
     DESCRIPTION:
@@ -325,6 +379,7 @@ def read_method(is_private, is_static, datatype, name, tokens):
     datatype   -- type, string
     name       -- name, string
     tokens     -- Buffer of tokens
+    is_final   -- True if the method is final, False otherwise
 
     RETURNS:
     A Statement object with the following attributes:
@@ -336,12 +391,14 @@ def read_method(is_private, is_static, datatype, name, tokens):
         body        a single string
         private     True if method is private
         static      True if method is static
+        final       True if method is final
     """
     validate_name(name)
     args = parse_args(tokens)
     body = parse_body(tokens)
     return Statement(METHOD, name=name, datatype=datatype, args=args,
-                     body=body, private=is_private, static=is_static)
+                     body=body, private=is_private, static=is_static,
+                     final=is_final)
     
 def parse_args(tokens):
     """Subroutine used to parse arguments.
@@ -359,14 +416,12 @@ def parse_args(tokens):
     """
     args = []
     if tokens.current() != ')':
-        validate_name(tokens.current())
-        datatype = tokens.pop()
+        datatype = read_type(tokens.pop(), tokens)
         validate_name(tokens.current())
         args.append((datatype, tokens.pop()))
     while tokens.current() == ',':
         tokens.pop()
-        validate_name(tokens.current())
-        datatype = tokens.pop()
+        datatype = read_type(tokens.pop(), tokens)
         validate_name(tokens.current())
         args.append((datatype, tokens.pop()))
     if tokens.pop() != ')':
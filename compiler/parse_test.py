@@ -242,6 +242,12 @@ def general_test():
     assert_error("""read_statement(Buffer("class Ex { int x,; }"))""")
     assert_error("""read_statement(Buffer("class Ex { int -x,; }"))""")
     assert_error("""read_statement(Buffer("class Ex { static private int -x,; }"))""")
+    assert_error("""read_statement(Buffer("class Ex { synchronized int x; }"))""")
+    assert_error("""read_statement(Buffer("synchronized class Ex { }"))""")
+
+    s = read_statement(Buffer("class Ex { static synchronized void f() {} void g() {} }"))
+    assert_equal(s['body'][0]['synchronized'], True)
+    assert_equal(s['body'][1]['synchronized'], False)
 
     print('All tests passed!\n')
     
@@ -0,0 +1,179 @@
+'''
+compile_cache.py
+A cache of compiled classes for the /compile endpoint.  Students press "Compile" on the same code again
+and again; the cache keys a compiled class by a hash of its source, so the same source is compiled once.
+
+    cache = CompileCache(lambda source: serialize.dumps(load_str(source)), directory='/tmp/cc')
+    cache.get("class A { int x; }")     # -> ('{"v":1,"class":"A",...}', 'miss')
+    cache.get("class A {\n  int x;\n}") # -> ('{"v":1,"class":"A",...}', 'hit'): the same once normalized
+
+Results are kept in memory, least recently used first out, up to max_bytes.  Given a directory, results
+pushed out of memory are written there, and found there again later (even by another process of the
+web server); the directory may be emptied at any time.  A key also covers the compiler's own source, so
+results of an older compiler are not used.
+
+Requests for a source being compiled wait for that compilation, rather than compiling it again.  Errors
+are not cached; each request waiting on a compilation that fails raises its error.
+'''
+import os
+import re
+import hashlib
+import tempfile
+import threading
+import collections
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The source of the compiler and of the form of its output (see server.py)
+COMPILER = ['../../compiler/compile_parse.py', '../../compiler/compile_eval.py',
+            '../../interface/structures.py', '../../interface/serialize.py']
+
+# A string or character literal, kept as it is, or a run of whitespace, made one space
+LITERAL_OR_SPACE = re.compile(r'''("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|\s+''')
+
+"""
+normalize() returns source with the whitespace that does not change its meaning made uniform: runs of
+whitespace outside string and character literals become one space, and none is left at either end.
+
+>>> normalize('class A {\\n\\tString s = "a  b";  }  ')
+'class A { String s = "a  b"; }'
+"""
+def normalize(source):
+    return LITERAL_OR_SPACE.sub(lambda match: match.group(1) or ' ', source).strip()
+
+def fingerprint(files=COMPILER):
+    """The hash of the compiler's source, which every key includes."""
+    digest = hashlib.sha256()
+    for name in files:
+        with open(os.path.join(HERE, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+class Flight(object):
+    """A compilation in progress, which the requests for the same source wait for."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class CompileCache(object):
+    """Compiled sources by the hash of their normalized text.  compile is the function compiling a source
+    to the text sent back; max_bytes bounds the text held in memory; directory, if given, is where text
+    pushed out of memory is kept.  The cache is thread-safe.
+    """
+    def __init__(self, compile, max_bytes=16 << 20, directory=None):
+        self.compile = compile
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.salt = fingerprint()
+        self.entries = collections.OrderedDict()    # Key -> text, least recently used first
+        self.size = 0       # Bytes of text in entries
+        self.flights = {}   # Key -> Flight, of the sources being compiled
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()     # How many gets ended in each way, and evictions
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, source):
+        return hashlib.sha256((self.salt + '\n' + normalize(source)).encode('utf-8')).hexdigest()
+
+    """
+    get() returns the compiled text of a source, compiling it if it is not in the cache.
+
+    Returns:
+    A tuple (text, how): how is 'hit' if the text was in memory, 'disk' if it was in the directory,
+    'shared' if it was compiled for another request while this one waited, and 'miss' if it was compiled
+    for this request
+
+    Exceptions:
+    CompileException, ... -- raised as compile raises them
+    """
+    def get(self, source):
+        key = self.key(source)
+        with self.lock:
+            text = self.entries.get(key)
+            if text is not None:
+                self.entries.move_to_end(key)
+                self.counts['hit'] += 1
+                return text, 'hit'
+            flight = self.flights.get(key)
+            leading = flight is None
+            if leading:
+                flight = self.flights[key] = Flight()
+        if not leading:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return self.count(flight.value, 'shared')
+        how = 'disk'
+        try:
+            text = self.load(key)
+            if text is None:
+                how, text = 'miss', self.compile(source)
+        except Exception as error:
+            flight.error = error
+            raise
+        else:
+            flight.value = text
+            self.store(key, text)
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+        return self.count(text, how)
+
+    def count(self, text, how):
+        with self.lock:
+            self.counts[how] += 1
+        return text, how
+
+    def store(self, key, text):
+        evicted = []
+        with self.lock:
+            self.entries[key] = text
+            self.size += len(text.encode('utf-8'))
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                old_key, old_text = self.entries.popitem(last=False)
+                self.size -= len(old_text.encode('utf-8'))
+                evicted.append((old_key, old_text))
+            self.counts['evicted'] += len(evicted)
+        for old_key, old_text in evicted:   # Written outside the lock: other requests need not wait.
+            self.spill(old_key, old_text)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key), encoding='utf-8') as f:
+                return f.read()
+        except OSError:     # Not there, or not readable: compiled again.
+            return None
+
+    def spill(self, key, text):
+        """Writes the text of a key to the directory, whole or not at all; a full or read-only disk only
+        loses the text."""
+        if self.directory is None:
+            return
+        folder = os.path.dirname(self.path(key))
+        temporary = None
+        try:
+            os.makedirs(folder, exist_ok=True)
+            handle, temporary = tempfile.mkstemp(dir=folder)
+            with os.fdopen(handle, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temporary, self.path(key))
+        except OSError:
+            if temporary is not None and os.path.exists(temporary):
+                os.remove(temporary)
+
+    """
+    stats() returns how many gets were hits, disk hits, shared and misses, how many entries were pushed
+    out of memory, and the entries and bytes held in memory.
+    """
+    def stats(self):
+        with self.lock:
+            stats = {how: self.counts[how] for how in ('hit', 'disk', 'shared', 'miss', 'evicted')}
+            stats.update(entries=len(self.entries), bytes=self.size)
+        return stats
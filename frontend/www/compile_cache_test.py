@@ -0,0 +1,135 @@
+"""
+compile_cache_test.py
+
+Testing harness for compile_cache.py. Run with
+
+    python3 compile_cache_test.py
+
+This file is designed to run on python3
+"""
+
+import time
+import shutil
+import tempfile
+import threading
+from compile_eval import *
+from compile_cache import CompileCache, normalize
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+compiled = []
+
+def counting_compile(source):
+    """Compiles SOURCE as /compile does, keeping count of the calls."""
+    compiled.append(source)
+    return str(read_line(source))
+
+def memory_test():
+    global cache
+    print("*---- Memory Cache Test ----*")
+    cache = CompileCache(counting_compile)
+    result, how = cache.get('class A { int x; }')
+    assert_equal(how, 'miss')
+    assert_equal(result, str(read_line('class A { int x; }')))
+    assert_equal(cache.get('class A { int x; }'), (result, 'hit'))
+    assert_equal(cache.get('  class A {\n\tint x;   }\n'), (result, 'hit'))
+    assert_equal(len(compiled), 1)
+
+    print("  --- literals are not normalized ---")
+    assert_equal(normalize('class B { String s = "a  b";\n}'), 'class B { String s = "a  b"; }')
+    assert_equal(cache.get('class B { public void f() { String s = "a b"; } }')[1], 'miss')
+    assert_equal(cache.get('class B { public void f() { String s = "a  b"; } }')[1], 'miss')
+
+    print("  --- errors are raised, and not cached ---")
+    assert_error("cache.get('class { }')")
+    assert_error("cache.get('class { }')")
+    assert_equal(compiled.count('class { }'), 2)
+
+    print("  --- least recently used out first ---")
+    small = CompileCache(counting_compile, max_bytes=len(result.encode()) * 2 + 1)
+    small.get('class A { int x; }')
+    small.get('class C { int x; }')
+    small.get('class A { int x; }')
+    small.get('class D { int x; }')
+    assert_equal(small.get('class A { int x; }')[1], 'hit')
+    assert_equal(small.get('class C { int x; }')[1], 'miss')
+    assert_equal(small.stats()['evicted'], 2)
+    print('All tests passed!\n')
+
+def disk_test():
+    print("*---- Disk Spill Test ----*")
+    directory = tempfile.mkdtemp()
+    try:
+        size = len(str(read_line('class A { int x; }')).encode())
+        cache = CompileCache(counting_compile, max_bytes=size + 1, directory=directory)
+        first = cache.get('class A { int x; }')[0]
+        cache.get('class E { int x; }')
+        assert_equal(cache.get('class A { int x; }'), (first, 'disk'))
+        assert_equal(cache.get('class A { int x; }'), (first, 'hit'))
+
+        print("  --- shared by another cache ---")
+        other = CompileCache(counting_compile, directory=directory)
+        assert_equal(other.get('class E { int x; }')[1], 'disk')
+    finally:
+        shutil.rmtree(directory)
+    print('All tests passed!\n')
+
+def single_flight_test():
+    print("*---- Single Flight Test ----*")
+    calls = []
+    def slow_compile(source):
+        calls.append(source)
+        time.sleep(0.2)
+        if 'bad' in source:
+            raise SyntaxError(source)
+        return source.upper()
+    cache = CompileCache(slow_compile)
+    results = []
+    def request(source):
+        try:
+            results.append(cache.get(source))
+        except SyntaxError as error:
+            results.append(('error', str(error)))
+    threads = [threading.Thread(target=request, args=('class F { }',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert_equal(len(calls), 1)
+    assert_equal(sorted(how for _, how in results), ['miss'] + ['shared'] * 7)
+    assert_equal({text for text, _ in results}, {'CLASS F { }'})
+
+    print("  --- waiters share the error ---")
+    results.clear()
+    threads = [threading.Thread(target=request, args=('class bad { }',)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert_equal(len(calls), 2)
+    assert_equal(results, [('error', 'class bad { }')] * 4)
+    assert_equal(cache.stats()['shared'], 7)
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    memory_test()
+    disk_test()
+    single_flight_test()
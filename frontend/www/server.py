@@ -1,5 +1,24 @@
-from bottle import route, run, post, static_file, request
+import os
+import re
+import sys
+import json
+import uuid
+import argparse
+from bottle import route, run, post, static_file, request, response, default_app
 from compile_eval import *
+import serving
+from compile_cache import CompileCache
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../interpreter'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+from workers import WorkerPool, PoolManager, Reply
+from zygote import Zygote
+from compiler.compile_eval import load_str
+from interface.exceptions import CompileException
+from interface import serialize
+
+pool = None     # The worker processes running Java code; started by main()
+compile_cache = None    # Compiled classes, by the hash of their source; made by main()
 
 @route('/index')
 def load():
@@ -43,7 +62,140 @@ def compile():
         s += 'public void ' + request.forms.get('name6') + '() { '
         s += request.forms.get('bind6') + ' } '
 
-    return str(read_line(s.replace('\n', ' ') +' }'))
+    try:
+        result, how = compile_cache.get(s.replace('\n', ' ') +' }')
+    except (CompileException, AssertionError, SyntaxError) as e:
+        response.status = 400
+        return {'v': serialize.VERSION, 'error': str(e)}
+    response.content_type = 'application/x-ndjson; charset=utf-8'
+    response.set_header('X-Compile-Cache', how)
+    # A big class can be fetched in parts: COUNT records from START.
+    if request.forms.get('start') or request.forms.get('count'):
+        records = result.split('\n')
+        start = int(request.forms.get('start') or 0)
+        count = int(request.forms.get('count') or len(records))
+        response.set_header('X-Compile-Records', str(len(records)))
+        return '\n'.join(records[start:start + count])
+    return result
     #return s.replace('\n', ' ')
 
-run(host='localhost', port=8080, debug=True)
+def session_id():
+    """Returns the id of the user's interpreter session, from the
+    session cookie; a user without one is given a new session."""
+    sid = request.get_cookie('session')
+    if not sid:
+        sid = uuid.uuid4().hex
+        response.set_cookie('session', sid, path='/')
+    return sid
+
+def job(kind, payload):
+    """Runs a job in the user's session on the worker pool, and
+    returns its reply as a JSON object."""
+    return pool.run(session_id(), kind, payload)._asdict()
+
+@post('/load')
+def load_classes():
+    # Compiled here, through the cache, and sent to the worker in serialized form.
+    try:
+        compiled, how = compile_cache.get(request.forms.get('source'))
+    except (CompileException, AssertionError, SyntaxError) as e:
+        return Reply(False, None, '', 'SyntaxError: ' + str(e))._asdict()
+    return job('load_compiled', compiled)
+
+@post('/execute')
+def execute():
+    return job('execute', request.forms.get('statements'))
+
+def event(name, text):
+    """Returns a server-sent event: its name, and its text, a data line
+    for each line of it."""
+    lines = re.split(r'\r\n|\r|\n', text)
+    return 'event: ' + name + '\n' + ''.join('data: ' + line + '\n' for line in lines) + '\n'
+
+def server_sent(events):
+    """Generates the server-sent events of a streamed job (see
+    WorkerPool.stream): a 'stdout' event for each piece of its
+    output, a 'truncated' event with the number of characters of
+    output dropped, if the client fell too far behind to keep them, a
+    'stderr' event with its error, if it raised one, and an 'end'
+    event with its reply, as /execute returns it."""
+    try:
+        yield ': running\n\n'    # Sends the headers at once, before the job's output.
+        for kind, data in events:
+            if kind == 'reply':
+                if data.error is not None:
+                    yield event('stderr', data.error)
+                yield event('end', json.dumps(data._asdict()))
+            else:
+                yield event(kind, str(data))
+    finally:
+        events.close()  # The client may have gone; the job is left to end.
+
+@post('/run')
+def run_streamed():
+    # Each piece of output is sent (as a chunk) as soon as the worker sends it.  The pool reads the worker
+    # whether or not the client keeps up, so a slow client holds up neither the worker nor its other
+    # sessions; what it has not taken is kept for it up to workers.STREAM_LIMIT, and the rest dropped.
+    events = pool.stream(session_id(), 'execute', request.forms.get('statements'))
+    response.content_type = 'text/event-stream; charset=utf-8'
+    response.set_header('Cache-Control', 'no-cache')
+    return server_sent(events)
+
+@post('/reset')
+def reset():
+    return job('close', None)
+
+def main():
+    global pool, compile_cache
+    parser = argparse.ArgumentParser(description='Java interpreter web server')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes running Java code (default: one per core)')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='seconds a job may run before its worker is replaced')
+    parser.add_argument('--zygote', action='store_true',
+                        help='fork workers from a warmed-up zygote process')
+    parser.add_argument('--preload', nargs='*', default=[], metavar='FILE',
+                        help='Java files loaded into every session (implies --zygote)')
+    parser.add_argument('--compile-cache-size', type=int, default=16 << 20, metavar='BYTES',
+                        help='compiled classes kept in memory, in bytes')
+    parser.add_argument('--compile-cache-dir', default=None, metavar='DIR',
+                        help='directory compiled classes pushed out of memory are kept in')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--server', choices=['dev', 'threaded', 'prefork'], default='dev',
+                        help='dev: bottle\'s server, one request at a time; threaded: a thread per '
+                             'connection, with keep-alive; prefork: processes sharing the socket, each threaded')
+    parser.add_argument('--threads', type=int, default=serving.DEFAULT_THREADS,
+                        help='connections each web server process serves at once (threaded, prefork)')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='web server processes (prefork; default: one per core)')
+    args = parser.parse_args()
+    compile_cache = CompileCache(lambda source: serialize.dumps(load_str(source)), args.compile_cache_size,
+                                 args.compile_cache_dir)
+    preload = [open(name).read() for name in args.preload]
+    zygote, manager = None, None
+    if args.server == 'prefork':
+        # The web server processes share one pool, so each finds the sessions the others made.
+        manager = PoolManager()
+        manager.start()
+        pool = manager.WorkerPool(args.workers, args.timeout,
+                                  preload if args.zygote or args.preload else None)
+    else:
+        if args.zygote or args.preload:
+            zygote = Zygote(preload)
+        pool = WorkerPool(args.workers, args.timeout, zygote=zygote)
+    try:
+        if args.server == 'dev':
+            run(host='localhost', port=args.port, debug=True)
+        elif args.server == 'threaded':
+            serving.serve_threaded(default_app(), 'localhost', args.port, args.threads)
+        else:
+            serving.serve_preforked(default_app(), 'localhost', args.port, args.processes, args.threads)
+    finally:
+        pool.close()
+        if zygote is not None:
+            zygote.close()
+        if manager is not None:
+            manager.shutdown()
+
+if __name__ == '__main__':
+    main()
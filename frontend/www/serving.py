@@ -0,0 +1,275 @@
+'''
+serving.py
+WSGI servers for running server.py in production.  Bottle's default server (wsgiref) answers one request
+at a time, and closes the connection after each; these answer many at once, and keep connections open
+between requests (HTTP/1.1 keep-alive).  Both use only the standard library.
+
+    serve_threaded(app, 'localhost', 8080, threads=32)         # One process, a thread per connection
+    serve_preforked(app, 'localhost', 8080, processes=4)       # Processes sharing one listening socket
+
+A thread serves one connection, for as long as the client keeps it open and sends a request at least
+every KEEP_ALIVE seconds.  threads bounds the connections a process serves at once; the others wait in
+the socket's backlog until a thread is free.  The threads of a process take turns running Python (the
+GIL), so they help while requests wait (for a worker running Java code, say); preforked processes each
+accept connections from the socket they inherited, and run Python in parallel.
+
+A response whose length is not known in advance (one an application streams, as an iterator of pieces)
+is sent to HTTP/1.1 clients in chunks, each piece as soon as it is made, and the connection is kept.
+'''
+import os
+import sys
+import socket
+import signal
+import threading
+import socketserver
+import multiprocessing
+import multiprocessing.connection
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, ServerHandler
+
+KEEP_ALIVE = 15.0       # Seconds an idle connection is kept open
+DEFAULT_THREADS = 16    # Connections a process serves at once
+MAX_DRAIN = 1 << 16     # Most bytes of an unread request body read (and dropped) to keep the connection
+
+class Body(object):
+    """The body of a request, as the application reads it (wsgi.input).  Reads stop at the end of the body,
+    so that they neither block nor take the start of the next request on the connection."""
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.left = length      # Bytes of the body not yet read
+
+    def read(self, size=-1):
+        return self.take(self.stream.read, size)
+
+    def readline(self, size=-1):
+        return self.take(self.stream.readline, size)
+
+    def readlines(self, hint=-1):
+        lines, total = [], 0
+        for line in self:
+            lines.append(line)
+            total += len(line)
+            if 0 < hint <= total:
+                break
+        return lines
+
+    def __iter__(self):
+        line = self.readline()
+        while line:
+            yield line
+            line = self.readline()
+
+    def take(self, read, size):
+        if size is None or size < 0 or size > self.left:
+            size = self.left
+        data = read(size) if size else b''
+        self.left = self.left - len(data) if data else 0    # Nothing read: the client has gone.
+        return data
+
+    """
+    drain() reads the rest of the body, if the application has left it unread.
+
+    Returns:
+    True if the body has been read to its end, False if it is too long to read (MAX_DRAIN)
+    """
+    def drain(self):
+        if self.left > MAX_DRAIN:
+            return False
+        while self.left:
+            if not self.read(self.left):
+                return False
+        return True
+
+class Handler(ServerHandler):
+    """Writes the response to one request.  A response without a Content-Length is sent in chunks
+    (Transfer-Encoding: chunked), if the client speaks HTTP/1.1; otherwise the connection is closed after
+    it, to say where it ends."""
+    http_version = '1.1'
+    chunked = False     # Whether the body is sent in chunks
+
+    def cleanup_headers(self):
+        ServerHandler.cleanup_headers(self)     # Sets Content-Length where it can.
+        connection = self.request_handler
+        if 'Content-Length' not in self.headers and self.status[:3] not in ('204', '304') and \
+                connection.command != 'HEAD':
+            if connection.request_version == 'HTTP/1.1':
+                self.chunked = True
+                self.headers['Transfer-Encoding'] = 'chunked'
+            else:
+                connection.close_connection = True
+        if connection.close_connection:
+            self.headers['Connection'] = 'close'
+
+    def write(self, data):
+        if self.status and not self.headers_sent:
+            self.bytes_sent = len(data)     # The Content-Length of a body of one piece
+            self.send_headers()     # Decides whether the body is chunked.
+            self.bytes_sent = 0
+        if not self.chunked:
+            ServerHandler.write(self, data)
+        elif data:      # An empty chunk would end the body.
+            ServerHandler.write(self, b'%x\r\n%s\r\n' % (len(data), data))
+
+    def finish_content(self):
+        ServerHandler.finish_content(self)
+        if self.chunked:
+            self._write(b'0\r\n\r\n')
+            self._flush()
+
+class KeepAliveHandler(WSGIRequestHandler):
+    """Serves the requests of one connection in turn, until the client closes it or asks to, or it is idle
+    for KEEP_ALIVE seconds."""
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE
+    # A response is written whole, at once: the headers would otherwise wait for the client to
+    # acknowledge them before the body is sent (Nagle's algorithm), up to its delayed ACK (40ms).
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            WSGIRequestHandler.log_message(self, format, *args)
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            self.handle_one_request()
+
+    def handle_one_request(self):
+        self.close_connection = True
+        try:
+            self.raw_requestline = self.rfile.readline(65537)
+        except (socket.timeout, ConnectionError):
+            return
+        if not self.raw_requestline:
+            return
+        if len(self.raw_requestline) > 65536:
+            self.requestline, self.request_version, self.command = '', '', ''
+            self.send_error(414)
+            return
+        if not self.parse_request():    # It has sent the error.
+            return
+        if self.request_version != 'HTTP/1.1' or 'Transfer-Encoding' in self.headers:
+            self.close_connection = True    # HTTP/1.0 clients, and chunked request bodies, are not kept.
+        try:
+            length = max(0, int(self.headers.get('Content-Length') or 0))
+        except ValueError:
+            self.send_error(400, "Bad Content-Length")
+            return
+        body = Body(self.rfile, length)
+        environ = self.get_environ()
+        environ['wsgi.input'] = body
+        handler = Handler(body, self.wfile, self.get_stderr(), environ,
+                          multithread=True, multiprocess=self.server.multiprocess)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+        if not self.close_connection and not body.drain():
+            self.close_connection = True
+
+class ThreadedWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    """A WSGI server serving each connection in a thread of its own, with at most threads at once."""
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+    multiprocess = False    # Whether other processes serve the same application
+    quiet = False   # Whether requests go unlogged
+
+    def __init__(self, address, threads=DEFAULT_THREADS, handler=KeepAliveHandler):
+        self.slots = threading.BoundedSemaphore(threads)
+        WSGIServer.__init__(self, address, handler)
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()    # Leaves the next connections in the backlog while every thread is busy.
+        try:
+            socketserver.ThreadingMixIn.process_request(self, request, client_address)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            socketserver.ThreadingMixIn.process_request_thread(self, request, client_address)
+        finally:
+            self.slots.release()
+
+"""
+make_server() makes a ThreadedWSGIServer for the application, listening on host and port.
+
+Arguments:
+app -- the WSGI application
+host, port -- where to listen; port 0 picks a free port (see server.server_address)
+threads -- the most connections served at once
+quiet -- if True, requests are not logged (to stderr)
+
+Returns:
+The server, listening but not yet serving
+"""
+def make_server(app, host, port, threads=DEFAULT_THREADS, quiet=False):
+    server = ThreadedWSGIServer((host, port), threads)
+    server.set_app(app)
+    server.quiet = quiet
+    return server
+
+"""
+serve_threaded() serves the application from threads of this process, until it is interrupted.
+"""
+def serve_threaded(app, host, port, threads=DEFAULT_THREADS, quiet=False):
+    server = make_server(app, host, port, threads, quiet)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+"""
+serve_preforked() serves the application from processes forked from this one, each with its threads,
+until it is interrupted or sent SIGTERM.  The processes accept connections from the one listening
+socket; one that dies is replaced.
+
+Arguments:
+app -- the WSGI application; it is loaded before the fork, so the processes share its memory
+host, port -- where to listen
+processes -- the number of processes; by default, one per core
+threads -- the most connections each process serves at once
+quiet -- if True, requests are not logged
+ready -- if given, called with the listening server once the processes are started
+"""
+def serve_preforked(app, host, port, processes=None, threads=DEFAULT_THREADS, quiet=False, ready=None):
+    server = make_server(app, host, port, threads, quiet)
+    server.multiprocess = True
+    server.socket.setblocking(False)    # The processes race to accept; the losers go back to waiting.
+    context = multiprocessing.get_context('fork')
+    children = [start_child(context, server) for _ in range(processes or os.cpu_count() or 1)]
+    stopping = []
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    try:
+        if ready is not None:
+            ready(server)
+        while not stopping:
+            multiprocessing.connection.wait([child.sentinel for child in children], timeout=0.5)
+            for index, child in enumerate(children):
+                if not child.is_alive() and not stopping:
+                    children[index] = start_child(context, server)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join()
+        server.server_close()
+
+def start_child(context, server):
+    child = context.Process(target=serve_child, args=(server,), daemon=True)
+    child.start()
+    return child
+
+def serve_child(server):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # The parent stops the processes on ^C.
+    try:
+        server.serve_forever()
+    finally:
+        sys.stdout.flush()
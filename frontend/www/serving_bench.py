@@ -0,0 +1,128 @@
+'''
+serving_bench.py
+Measures the requests per second the web servers of serving.py answer, against the number of threads
+(threaded) or processes (prefork) they run, with bottle's default server (wsgiref, "dev") for
+comparison.  Run with
+
+    python3 serving_bench.py --mode threaded --workers 1 2 4 8 16
+    python3 serving_bench.py --mode prefork --app compile --workers 1 2 4
+
+Each server runs in a process of its own, answering one of two applications:
+
+wait -- waits --delay seconds and answers, as /load and /execute do while a worker runs the Java code
+compile -- compiles a class, as /compile does; it keeps a process busy, so only preforked processes
+(on as many cores) add to the requests per second
+
+The load comes from --clients threads, each sending requests on a connection it keeps open.
+'''
+import time
+import argparse
+import threading
+import itertools
+import http.client
+import multiprocessing
+from wsgiref.simple_server import make_server as make_dev_server, WSGIRequestHandler
+import serving
+
+SOURCE = ('class Counter { int count; int step; '
+          'public void tick() { count = count + step; } '
+          'public void reset() { count = 0; step = 1; } '
+          'public void twice() { tick(); tick(); } }')
+
+def make_app(name, delay):
+    if name == 'wait':
+        def app(environ, start_response):
+            time.sleep(delay)
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+    else:
+        from compile_eval import read_line
+        def app(environ, start_response):
+            environ['wsgi.input'].read(int(environ.get('CONTENT_LENGTH') or 0))
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [str(read_line(SOURCE)).encode()]
+    return app
+
+class QuietDevHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def run_server(mode, workers, app_name, delay, ports):
+    app = make_app(app_name, delay)
+    if mode == 'dev':
+        server = make_dev_server('localhost', 0, app, handler_class=QuietDevHandler)
+        ports.put(server.server_address[1])
+        server.serve_forever()
+    elif mode == 'threaded':
+        server = serving.make_server(app, 'localhost', 0, threads=workers, quiet=True)
+        ports.put(server.server_address[1])
+        server.serve_forever()
+    else:
+        serving.serve_preforked(app, 'localhost', 0, processes=workers, threads=1, quiet=True,
+                                ready=lambda server: ports.put(server.server_address[1]))
+
+"""
+load() sends requests to the server on port from clients threads, and returns the requests per second
+answered, the mean and 99th percentile latency in seconds, and the number of requests that failed (their
+connection refused or reset).
+"""
+def load(port, requests, clients):
+    numbers = itertools.count()
+    latencies = []
+    errors = []
+    def client():
+        connection = http.client.HTTPConnection('localhost', port)
+        while next(numbers) < requests:
+            began = time.perf_counter()
+            try:
+                connection.request('POST', '/', body=b'source=' + SOURCE.encode())
+                connection.getresponse().read()    # A closed connection is opened again by the next request.
+            except (ConnectionError, http.client.HTTPException):
+                errors.append(1)
+                connection.close()
+                continue
+            latencies.append(time.perf_counter() - began)
+        connection.close()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    latencies.sort()
+    return (len(latencies) / elapsed, sum(latencies) / len(latencies),
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], len(errors))
+
+def bench(mode, workers, args):
+    context = multiprocessing.get_context('fork')
+    ports = context.Queue()
+    process = context.Process(target=run_server, args=(mode, workers, args.app, args.delay, ports))
+    process.start()
+    try:
+        port = ports.get(timeout=10)
+        load(port, min(args.requests, 20), 1)   # Warms the server up.
+        return load(port, args.requests, args.clients)
+    finally:
+        process.terminate()
+        process.join()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the web servers of serving.py')
+    parser.add_argument('--mode', choices=['threaded', 'prefork'], default='threaded')
+    parser.add_argument('--app', choices=['wait', 'compile'], default='wait')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help='threads (threaded) or processes (prefork) to measure')
+    parser.add_argument('--delay', type=float, default=0.01, help='seconds the wait application waits')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--clients', type=int, default=32)
+    args = parser.parse_args()
+    print('{0:>10} {1:>8} {2:>12} {3:>10} {4:>10} {5:>8}'.format('server', 'workers', 'requests/s', 'mean ms',
+                                                               'p99 ms', 'errors'))
+    for mode, workers in [('dev', 1)] + [(args.mode, n) for n in args.workers]:
+        rate, mean, p99, errors = bench(mode, workers, args)
+        print('{0:>10} {1:>8} {2:>12.1f} {3:>10.2f} {4:>10.2f} {5:>8}'.format(mode, workers, rate, mean * 1000,
+                                                                              p99 * 1000, errors))
+
+if __name__ == '__main__':
+    main()
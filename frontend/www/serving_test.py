@@ -0,0 +1,135 @@
+"""
+serving_test.py
+
+Testing harness for serving.py. Run with
+
+    python3 serving_test.py
+
+This file is designed to run on python3
+"""
+
+import os
+import time
+import socket
+import threading
+import http.client
+import multiprocessing
+import serving
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+def echo(environ, start_response):
+    body = environ['wsgi.input'].read()
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    if environ['PATH_INFO'] == '/stream':
+        return iter([b'no ', b'length'])
+    if environ['PATH_INFO'] == '/slow':
+        return slow()
+    if environ['PATH_INFO'] == '/unread':
+        return [b'unread']
+    return [str(os.getpid()).encode() + b' ' + body]
+
+def slow():
+    yield b'first'
+    time.sleep(0.3)
+    yield b'second'
+
+def threaded_test():
+    print("*---- Threaded Server Test ----*")
+    server = serving.make_server(echo, 'localhost', 0, threads=2, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    print("  --- keep-alive ---")
+    connection = http.client.HTTPConnection('localhost', port)
+    connection.request('POST', '/', body=b'one')
+    assert_equal(connection.getresponse().read().split()[1], b'one')
+    sock = connection.sock
+    connection.request('POST', '/', body=b'two')
+    assert_equal(connection.getresponse().read().split()[1], b'two')
+    assert_equal(connection.sock is sock, True)
+
+    print("  --- bodies are read up to their length ---")
+    connection.request('POST', '/', body=b'')
+    assert_equal(connection.getresponse().read().split()[1:], [])
+    connection.request('POST', '/unread', body=b'left for the server to drain')
+    assert_equal(connection.getresponse().read(), b'unread')
+    connection.request('POST', '/', body=b'three')
+    assert_equal(connection.getresponse().read().split()[1], b'three')
+    assert_equal(connection.sock is sock, True)
+
+    print("  --- chunked ---")
+    connection.request('GET', '/stream')
+    response = connection.getresponse()
+    assert_equal((response.read(), response.getheader('Transfer-Encoding')), (b'no length', 'chunked'))
+    connection.request('POST', '/', body=b'four')
+    assert_equal(connection.getresponse().read().split()[1], b'four')
+    assert_equal(connection.sock is sock, True)
+    connection.request('GET', '/slow')
+    response = connection.getresponse()
+    start = time.time()
+    assert_equal(response.read1(), b'first')
+    assert_equal(time.time() - start < 0.2, True)
+    assert_equal(response.read(), b'second')
+    assert_equal(time.time() - start >= 0.3, True)
+    connection.close()
+
+    print("  --- closing ---")
+    raw = socket.create_connection(('localhost', port))
+    raw.sendall(b'GET /stream HTTP/1.0\r\n\r\n')
+    reply = b''.join(iter(lambda: raw.recv(4096), b''))
+    assert_equal(reply.startswith(b'HTTP/1.1 200 OK'), True)
+    assert_equal(reply.endswith(b'\r\n\r\nno length'), True)
+    raw.close()
+
+    print("  --- at most threads connections at once ---")
+    held = [http.client.HTTPConnection('localhost', port) for _ in range(3)]
+    for connection in held[:2]:
+        connection.request('GET', '/')
+        connection.getresponse().read()
+    waiting = held[2]
+    waiting.timeout = 0.5
+    waiting.request('GET', '/')
+    try:
+        waiting.getresponse()
+        raise AssertionError("a third connection was served")
+    except socket.timeout:
+        pass
+    held[0].close()
+    waiting.sock.settimeout(5)
+    assert_equal(waiting.getresponse().status, 200)
+    server.shutdown()
+    server.server_close()
+    print('All tests passed!\n')
+
+def preforked_test():
+    print("*---- Preforked Server Test ----*")
+    context = multiprocessing.get_context('fork')
+    ports = context.Queue()
+    parent = context.Process(target=serving.serve_preforked, args=(echo, 'localhost', 0, 2, 1, True,
+                                                                   lambda server: ports.put(server.server_address[1])))
+    parent.start()
+    port = ports.get(timeout=10)
+    time.sleep(0.5)
+    pids = set()
+    for _ in range(20):
+        connection = http.client.HTTPConnection('localhost', port)
+        connection.request('GET', '/')
+        pids.add(connection.getresponse().read())
+        connection.close()
+    assert_equal(len(pids), 2)
+    assert_equal(str(parent.pid).encode() in pids, False)
+    parent.terminate()
+    parent.join()
+    assert_equal(parent.exitcode, 0)
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    threaded_test()
+    preforked_test()
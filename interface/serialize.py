@@ -0,0 +1,195 @@
+"""
+serialize.py
+
+A compact, versioned JSON form of compiled classes (ClassObj, with
+their Variables and Methods), for sending them between processes:
+from the web server to the browser (/compile), and from the web
+server to the workers running Java code, which then declare the
+classes without compiling them again.
+
+Contents:
+    dumps, loads
+    records
+    Loader
+
+DESCRIPTION:
+The form is a sequence of JSON records, one per line. Each class is
+a class record followed by method records, each holding a batch of
+its methods and constructors, so a big class is sent, and can be
+read, in parts. Every record holds the format VERSION:
+
+    {"v":1,"class":"A","super":"Object","flags":0,"methods":2,
+     "fields":[["x","int","5",0]],"constants":["5","1"]}
+    {"v":1,"in":"A","methods":[["f","void",[],"x = 1 ;",0,[]],
+     [null,null,[["int","y"]],"x = y ;",0,[]]]}
+
+Modifiers are bits of flags (STATIC, PRIVATE, FINAL, SYNCHRONIZED). A method is [name, type, [[type, name],
+...], body, flags, annotations]; a constructor has no name or type.
+The class's constant pool is sent as the text of its literals, in
+order, so their indices are kept.
+
+this file is designed to run on python3
+"""
+
+import json
+from interface.exceptions import CompileException
+from interface.structures import Variable, Method, ClassObj
+
+VERSION = 1
+
+STATIC, PRIVATE, FINAL, SYNCHRONIZED = 1, 2, 4, 8
+
+# Methods in a method record
+BATCH = 32
+
+# Encodes records without spaces, and without checking for cycles
+# (records are trees), on the C encoder's fast path.
+encoder = json.JSONEncoder(ensure_ascii=False, check_circular=False,
+                           separators=(',', ':'))
+
+def flags(member):
+    """Returns the modifier bits of a Variable or Method."""
+    return (STATIC * bool(member.static) |
+            PRIVATE * bool(member.private) |
+            FINAL * bool(member.final) |
+            SYNCHRONIZED * bool(getattr(member, 'synchronized', False)))
+
+def records(classes, batch=BATCH):
+    """Generates the records of CLASSES, one JSON line (without its
+    newline) at a time.
+
+    ARGUMENTS:
+    classes -- a dictionary of ClassObj objects by name, as
+               compile_eval.load_str returns, or a list of them
+    batch   -- the most methods in one method record
+    """
+    if isinstance(classes, dict):
+        classes = classes.values()
+    for cls in classes:
+        methods = list(cls.constructors.values()) + \
+                  list(cls.methods.values())
+        yield encoder.encode({
+            'v': VERSION,
+            'class': cls.name,
+            'super': cls.superclass(),
+            'flags': PRIVATE * cls.private(),
+            'methods': len(methods),
+            'fields': [[var.name, var.type, var.value, flags(var)]
+                       for var in cls.instance_attr.values()],
+            'constants': cls.constants.literals})
+        for start in range(0, len(methods), batch):
+            yield encoder.encode({
+                'v': VERSION,
+                'in': cls.name,
+                'methods': [[m.name, m.type,
+                             [[arg.type, arg.name] for arg in m.args],
+                             m.body, flags(m), list(m.annotations)]
+                            for m in methods[start:start + batch]]})
+
+def dumps(classes, batch=BATCH):
+    """Returns the serialized form of CLASSES, its records one per
+    line."""
+    return '\n'.join(records(classes, batch))
+
+def loads(text):
+    """Returns the classes serialized in TEXT.
+
+    RAISES:
+    CompileException -- if TEXT is not in a form of this VERSION, or
+                        a class in it is incomplete
+
+    RETURNS:
+    a dictionary of ClassObj objects by name, in the order they were
+    serialized
+    """
+    loader = Loader()
+    for line in text.splitlines():
+        if line.strip():
+            loader.feed(line)
+    return loader.result()
+
+class Loader:
+    """Rebuilds classes from their records, as they arrive.
+
+    DESCRIPTION:
+    feed() takes one record at a time, and returns the class it
+    completes, if any, so a reader can use each class of a long
+    response as soon as its last record has come. result() returns
+    every class, once all have come.
+    """
+    def __init__(self):
+        self.classes = {}
+        self.missing = {}   # Class name -> methods still to come
+
+    def feed(self, line):
+        """Adds the record LINE (a str, or an already decoded dict).
+
+        RAISES:
+        CompileException -- if the record is malformed, of another
+                            VERSION, or for a class not begun
+
+        RETURNS:
+        the ClassObj the record completes, or None
+        """
+        try:
+            record = json.loads(line) if isinstance(line, str) else line
+            version = record.get('v')
+        except (ValueError, AttributeError):
+            raise CompileException('malformed class record')
+        if version != VERSION:
+            raise CompileException('unsupported class format version '
+                                   '{} (expected {})'.format(version,
+                                                             VERSION))
+        try:
+            if 'class' in record:
+                cls = self.begin(record)
+            else:
+                cls = self.add_methods(record)
+        except (KeyError, TypeError, ValueError) as e:
+            raise CompileException('malformed class record: ' + str(e))
+        return cls if self.missing.get(cls.name) == 0 else None
+
+    def begin(self, record):
+        cls = ClassObj(record['class'])
+        bits = record['flags']
+        cls.private(bool(bits & PRIVATE))
+        cls.superclass(record['super'])
+        for name, datatype, value, bits in record['fields']:
+            cls.declare_var(Variable(datatype, name, value,
+                                     bool(bits & STATIC),
+                                     bool(bits & PRIVATE),
+                                     bool(bits & FINAL)))
+        for literal in record['constants']:
+            cls.constants.add(literal)
+        self.classes[cls.name] = cls
+        self.missing[cls.name] = record['methods']
+        return cls
+
+    def add_methods(self, record):
+        name = record['in']
+        if self.missing.get(name, 0) <= 0:
+            raise CompileException('methods for a class not begun: ' +
+                                   str(name))
+        cls = self.classes[name]
+        for method_name, datatype, args, body, bits, annotations in \
+                record['methods']:
+            cls.declare_method(Method(method_name, datatype, args, body,
+                                      bool(bits & STATIC),
+                                      bool(bits & PRIVATE),
+                                      bool(bits & FINAL), annotations,
+                                      bool(bits & SYNCHRONIZED)))
+        self.missing[cls.name] -= len(record['methods'])
+        return cls
+
+    def result(self):
+        """Returns every class fed, by name.
+
+        RAISES:
+        CompileException -- if methods of a class are still to come
+        """
+        for name, missing in self.missing.items():
+            if missing != 0:
+                raise CompileException('class {} is incomplete: {} '
+                                       'methods missing'.format(name,
+                                                                missing))
+        return dict(self.classes)
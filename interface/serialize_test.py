@@ -0,0 +1,107 @@
+import sys
+sys.path.append(sys.path[0] + '/../')
+
+import json
+from compiler.compile_eval import load_str
+from interface.exceptions import CompileException
+from interface import serialize
+
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+
+    ARGUMENTS:
+    src        -- string, passed into eval
+    error_type -- Python exception
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+SOURCE = """class Shape { private int sides = 4; static final String NAME = "a  shape";
+    Shape(int n) { sides = n; }
+    public int getSides() { return sides; }
+    static synchronized double half(double x) { return x / 2 . 5; }
+    @Memoize static int sq(int x) { return x * x; } }
+class Square extends Shape { }"""
+
+def round_trip_test():
+    print("*---- Round Trip Test ----*")
+    classes = load_str(SOURCE)
+    text = serialize.dumps(classes)
+    loaded = serialize.loads(text)
+    assert_equal(list(loaded), ['Shape', 'Square'])
+    for name in classes:
+        assert_equal(str(loaded[name]), str(classes[name]))
+        assert_equal(str(loaded[name].constants),
+                     str(classes[name].constants))
+        assert_equal(loaded[name].superclass(),
+                     classes[name].superclass())
+    assert_equal(serialize.dumps(loaded), text)
+
+    print("  --- members ---")
+    shape = loaded['Shape']
+    assert_equal(shape.instance_attr['sides'].private, True)
+    assert_equal(shape.instance_attr['NAME'].value, '"a  shape"')
+    assert_equal(shape.instance_attr['NAME'].static, True)
+    assert_equal(shape.instance_attr['NAME'].final, True)
+    half = shape.methods[('half', 1)]
+    assert_equal((half.static, half.synchronized, half.type),
+                 (True, True, 'double'))
+    assert_equal(half.args[0].type, 'double')
+    assert_equal(half.body, classes['Shape'].methods[('half', 1)].body)
+    assert_equal(shape.methods[('sq', 1)].annotations, ('Memoize',))
+    assert_equal(shape.constructors[1].is_constructor(), True)
+    assert_equal(shape.constants.index_of('"a  shape"'),
+                 classes['Shape'].constants.index_of('"a  shape"'))
+
+    print("  --- form ---")
+    lines = text.split('\n')
+    assert_equal([json.loads(line)['v'] for line in lines],
+                 [serialize.VERSION] * 3)
+    assert_equal(', ' in text or '": ' in text, False)
+    print('All tests passed!\n')
+
+def partial_test():
+    global loader, text
+    print("*---- Partial Test ----*")
+    classes = load_str(SOURCE)
+    lines = list(serialize.records(classes, batch=2))
+    assert_equal(len(lines), 4)
+    loader = serialize.Loader()
+    assert_equal(loader.feed(lines[0]), None)
+    assert_error("loader.result()", CompileException)
+    assert_equal(loader.feed(lines[1]), None)
+    assert_equal(loader.feed(lines[2]).name, 'Shape')
+    assert_equal(loader.feed(lines[3]).name, 'Square')
+    assert_equal(sorted(loader.result()), ['Shape', 'Square'])
+
+    print("  --- invalid records ---")
+    assert_error("serialize.loads('{\"v\":99,\"class\":\"A\"}')",
+                 CompileException)
+    assert_error("serialize.loads('not json')", CompileException)
+    assert_error("serialize.loads('{\"v\":1,\"in\":\"A\",\"methods\":[]}')",
+                 CompileException)
+    assert_error("serialize.loads('{\"v\":1,\"class\":\"A\"}')",
+                 CompileException)
+    text = serialize.dumps(classes, batch=2)
+    assert_error("serialize.loads(text.rsplit('\\n', 2)[0])",
+                 CompileException)
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    round_trip_test()
+    partial_test()
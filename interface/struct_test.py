@@ -145,9 +145,55 @@ def instance_test():
 
     print('All tests passed!\n')
 
-if __name__ == '__main__':
-    variable_test()
-    method_test()
-    class_test()
-    instance_test()
+def constant_pool_test():
+    print("*---- ConstantPool Test ----*")
+
+    print("  --- build ---")
+    cls = eval_class(read_line(""" class K { String s = "a b"; int n = 3;
+        double f(int x) { return x * 1.5 + 3; } boolean g() { return true; } } """)[0])
+    assert_equal(cls.constants.literals, ['"a b"', '3', '1.5', 'true'])
+    assert_equal(cls.constants[cls.constants.index_of('1.5')], 1.5)
+    assert_equal(cls.constants[cls.constants.index_of('"a b"')], 'a b')
+    assert_equal(cls.constants[cls.constants.index_of('true')], True)
+    assert_equal(cls.constants.index_of('x'), None)
+
+    print("  --- add ---")
+    pool = ConstantPool()
+    assert_equal(pool.add("'c'"), 0)
+    assert_equal(pool.add("1 . 5"), 1)
+    assert_equal(pool.add("1.5"), 1)
+    assert_equal(pool.add("null"), None)
+    assert_equal(pool.add("010"), None)
+    assert_equal(len(pool), 2)
+
+    print("  --- shared storage ---")
+    other = eval_class(read_line('class L { String t = "a b"; }')[0])
+    assert_equal(other.constants[0] is cls.constants[0], True)
+    assert_equal(intern_literal('"a b"') is cls.constants[0], True)
+    assert_error("intern_literal('x + 1')", ValueError)
+    pool.clear()
+    assert_equal((len(pool), pool.index_of("'c'"), pool.add("2")), (0, None, 0))
+
+    print("  --- bounded ---")
+    import interface.structures as structures
+    limit, structures.INTERN_LIMIT = structures.INTERN_LIMIT, 2
+    intern_literal('"x"'), intern_literal('"y"'), intern_literal('"z"')
+    assert_equal(sorted(structures.interned), ['"z"'])
+    assert_equal(cls.constants[cls.constants.index_of('"a b"')], 'a b')
+    structures.INTERN_LIMIT = limit
+
+    print('All tests passed!\n')
 
+if __name__ == '__main__':
+    # Each test runs whether or not the ones before it pass.
+    import traceback
+    failed = []
+    for test in [variable_test, method_test, class_test, instance_test,
+                 constant_pool_test]:
+        try:
+            test()
+        except AssertionError:
+            traceback.print_exc()
+            failed.append(test.__name__)
+    if failed:
+        sys.exit('Failed: ' + ', '.join(failed))
@@ -7,6 +7,7 @@ interpreter.
 Contents:
     Variable
     Method
+    ConstantPool
     ClassObj
     Instance
 
@@ -15,21 +16,25 @@ Authors: Albert Wu
 this file is designed to run on python3
 """
 
+import ast
+import re
+import sys
 from interface.exceptions import CompileException
 
 class Variable:
     """Wrapper class for variable definitions."""
-    def __init__(self, datatype, name, value, static=False, private=False):
+    def __init__(self, datatype, name, value, static=False, private=False,
+                 final=False):
         self.name = name
         self.type = datatype
         self.static = static
         self.private = private
+        self.final = final
         self.value = value
 
     def clone(self):
-        var = Variable(self.name, self.type, self.static, self.private)
-        var.value = self.value
-        return var
+        return Variable(self.type, self.name, self.value, self.static,
+                        self.private, self.final)
 
     def __str__(self):
         return "{private}{type} {name}: {value}".format(
@@ -40,14 +45,23 @@ class Variable:
 
 class Method:
     """Wrapper class for method definitions. By definition, a 
-    constructor is a Method whose name and datatype are None."""
-    def __init__(self, name, datatype, args, body):
+    constructor is a Method whose name and datatype are None.
+    ANNOTATIONS holds the names of its annotations, without the '@'.
+    A SYNCHRONIZED method runs holding the monitor of its class."""
+    def __init__(self, name, datatype, args, body, static=False,
+                 private=False, final=False, annotations=(),
+                 synchronized=False):
         self.name = name
         self.type = datatype
         self.args = []
         for arg in args:
             self.args.append(Variable(arg[0], arg[1], None))
         self.body = body
+        self.static = static
+        self.private = private
+        self.final = final
+        self.annotations = tuple(annotations)
+        self.synchronized = synchronized
 
     def is_constructor(self):
         """Returns True if self is a constructor, False otherwise."""
@@ -63,6 +77,102 @@ class Method:
         return s + ")"
 
 
+# Literals in the text of a body: string and char literals, numbers
+# (which the compiler's tokenizer spaces out as "1 . 5") and booleans.
+LITERAL = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'' +
+                     r'|(?<![\w$.])\d+(?:\s*\.\s*\d*)?(?:[eE][-+]?\d+)?(?![\w$.])' +
+                     r'|(?<![\w$.])(?:true|false)(?![\w$])')
+
+# Every pooled constant, by the text of its literal. The pools of all
+# classes draw their values from here, so identical literals share
+# storage; string values are also interned with sys.intern. An
+# interpreter session keeps a table of its own; either is emptied when
+# it reaches INTERN_LIMIT literals, which the pools already made keep.
+interned = {}
+INTERN_LIMIT = 1 << 16
+
+def intern_literal(text):
+    """Returns the value of the literal TEXT, e.g. 4 for '4', 'a b'
+    for '"a b"' and True for 'true', parsing it only the first time
+    it is seen.
+
+    RAISES:
+    ValueError -- if TEXT is not a literal the interpreter evaluates
+                  as Python does
+    """
+    if text not in interned:
+        if text in ('true', 'false'):
+            value = text == 'true'
+        else:
+            try:
+                value = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                raise ValueError('not a literal: ' + text)
+            if type(value) not in (int, float, str):
+                raise ValueError('not a literal: ' + text)
+        if len(interned) >= INTERN_LIMIT:
+            interned.clear()
+        interned[text] = sys.intern(value) if type(value) is str else value
+    return interned[text]
+
+class ConstantPool:
+    """The typed constants of a class's literals.
+
+    DESCRIPTION:
+    The compiler adds every literal in a class's field initializers
+    and method bodies to the class's pool, so each literal is parsed
+    once, when the class is loaded. The interpreter finds the index of
+    a literal with index_of(), and its value with pool[index].
+    """
+    def __init__(self):
+        self.literals = []
+        self.values = []
+        self.indices = {}
+
+    def add(self, text):
+        """Adds the literal TEXT to the pool, if it is not already in
+        it.
+
+        RETURNS:
+        the index of the literal, or None if TEXT is not a literal
+        """
+        text = re.sub(r'\s+', '', text) if text[0] not in '"\'' else text
+        if text not in self.indices:
+            try:
+                value = intern_literal(text)
+            except ValueError:
+                return None
+            self.indices[text] = len(self.values)
+            self.literals.append(text)
+            self.values.append(value)
+        return self.indices[text]
+
+    def add_all(self, body):
+        """Adds every literal in the text BODY to the pool."""
+        for match in LITERAL.finditer(body):
+            self.add(match.group(0))
+
+    def index_of(self, text):
+        """Returns the index of the literal TEXT, or None if it is not
+        in the pool."""
+        return self.indices.get(text)
+
+    def clear(self):
+        """Empties the pool. The indices it gave out are no longer
+        valid."""
+        self.literals, self.values, self.indices = [], [], {}
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __str__(self):
+        return ', '.join('#{} = {}'.format(i, literal) for i, literal in
+                         enumerate(self.literals))
+
+
 class ClassObj:
     """Representation of a Java class.
 
@@ -81,6 +191,7 @@ class ClassObj:
         self.instance_attr = {} 
         self.methods = {}      
         self.constructors = {} 
+        self.constants = ConstantPool()
 
     def declare_var(self, var):
         """Subroutine used to declare variables."""
@@ -164,19 +275,27 @@ class Instance:
 
     All expressions found in variable assignments are evaluated upon
     instantiation of an Instance, so constructing an Instance object
-    will automatically evaluate those expressions.
+    will automatically evaluate those expressions.  Instance variables
+    may hold the interpreter's native objects, such as an ArrayList or
+    a HashMap; each instance gets its own.
     """
-    def __init__(self, cls):
+    def __init__(self, cls, initializer=None):
         """Constructor.
 
         ARGUMENTS:
-        cls -- a ClassObj
+        cls         -- a ClassObj
+        initializer -- a function that takes the class's Variable and
+                       returns the value the instance's copy starts
+                       with (e.g. natives.initial_value in the
+                       interpreter). Values are copied as they are if
+                       no initializer is given.
         """
         self.type = cls
         self.instance_attr = {}
         for name, value in cls.instance_attr.items():
             self.instance_attr[name] = value.clone()
-            #TODO evaluate variable assignments
+            if initializer is not None:
+                self.instance_attr[name].value = initializer(value)
 
     def getattr(self, name):
         """Gets a variable called NAME.
@@ -1,23 +0,0 @@
-"""Arrays"""
-
-class Array:
-    def __init__(self, type, size, items=None):
-        self.type = type
-        self.size = size
-        self.items = items
-        for i in range(size):
-            
-        
-    
-    
-    def __getitem__(self, index):
-        
-        
-    def change_item(self, index, newvalue):
-        
-        
-    def getLen(self):
-    
-    
-        
-        
\ No newline at end of file
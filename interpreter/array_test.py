@@ -0,0 +1,140 @@
+"""
+array_test.py
+
+Testing harness for arrays.py and vectorize.py. Run with
+
+    python3 array_test.py
+
+This file is designed to run on python3
+"""
+
+from arrays import *
+from variable import Variable
+from util import narrow
+import vectorize
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+def variable(value, datatype, name):
+    var = Variable(None, datatype, name)
+    var.set_value(value)
+    return var
+
+def evaluate(exp_str, instance_vars, stack):
+    """Stand-in for the evaluator: only literals and .length are needed."""
+    for name, var in stack[-1].items():
+        if isinstance(var.get_value(), Array):
+            exp_str = exp_str.replace(name + '.length', str(var.get_value().getLen()))
+    return eval(exp_str)
+
+def array_test():
+    print("*---- Array Test ----*")
+
+    print("  --- __init__ ---")
+    global a
+    a = Array('int', 3)
+    assert_equal(a.items, [0, 0, 0])
+    assert_equal(a.getLen(), 3)
+    assert_equal(a.get_datatype(), 'int[]')
+    assert_equal(Array('boolean', 2).items, [False, False])
+    assert_equal(Array('int', 2, [1, 2 ** 31]).items, [1, -2 ** 31])
+    assert_error("Array('int', -1)")
+
+    print("  --- __getitem__ / change_item ---")
+    a.change_item(1, 5)
+    assert_equal(a[1], 5)
+    a.change_item(2, 2 ** 32 + 7)
+    assert_equal(a[2], 7)
+    assert_error("a[3]")
+    assert_error("a[-1]")
+    assert_error("a.change_item(3, 1)")
+
+    print("  --- array types ---")
+    assert_equal(is_array_type('int[]'), True)
+    assert_equal(is_array_type('int'), False)
+    assert_equal(is_array_type('Foo[]'), False)
+    assert_equal(element_type('double[]'), 'double')
+
+    print("  --- narrow ---")
+    assert_equal(narrow(2 ** 31, 'int'), -2 ** 31)
+    assert_equal(narrow(-1, 'long'), -1)
+    assert_equal(narrow(40000, 'short'), -25536)
+    assert_equal(narrow(3, 'double'), 3.0)
+
+    print('All tests passed!\n')
+
+def vectorize_test():
+    print("*---- vectorize Test ----*")
+
+    if vectorize.numpy is None:
+        print("  --- NumPy not installed, skipping lowering ---")
+        print('All tests passed!\n')
+        return
+
+    print("  --- element-wise ---")
+    a = Array('int', 3, [1, 2, 3])
+    c = Array('int', 3)
+    stack = [{'a': variable(a, 'int[]', 'a'), 'c': variable(c, 'int[]', 'c'),
+              'k': variable(2 ** 31 - 1, 'int', 'k')}]
+    handled = vectorize.lower_for_loop('int i = 0', 'i < a.length', 'i++',
+                                       'c[i] = a[i] * a[i] + k;', {}, stack, evaluate)
+    assert_equal(handled, True)
+    assert_equal(c.items, [narrow(x * x + 2 ** 31 - 1, 'int') for x in [1, 2, 3]])
+
+    print("  --- reductions ---")
+    stack[-1]['sum'] = variable(0, 'long', 'sum')
+    handled = vectorize.lower_for_loop('int i = 0', 'i < 3', 'i++',
+                                       'sum += a[i];', {}, stack, evaluate)
+    assert_equal(handled, True)
+    assert_equal(stack[-1]['sum'].get_value(), 6)
+    stack[-1]['m'] = variable(0, 'int', 'm')
+    handled = vectorize.lower_for_loop('int i = 0', 'i < 3', 'i++',
+                                       'm = Math.max(m, a[i]);', {}, stack, evaluate)
+    assert_equal(stack[-1]['m'].get_value(), 3)
+
+    print("  --- fallback ---")
+    assert_equal(vectorize.lower_for_loop('int i = 0', 'i <= a.length', 'i++',
+                                          'c[i] = a[i];', {}, stack, evaluate), False)
+    assert_equal(vectorize.lower_for_loop('int i = 0', 'i < 3', 'i++',
+                                          'c[i] = a[i] / 2;', {}, stack, evaluate), False)
+    assert_equal(vectorize.lower_for_loop('int i = 0', 'i < 2', 'i++',
+                                          'c[i] = a[i + 1];', {}, stack, evaluate), False)
+    assert_equal(vectorize.lower_for_loop('int i = 0', 'i < 3', 'i++',
+                                          'sum += sum * a[i];', {}, stack, evaluate), False)
+
+    print("  --- bounds are not evaluated for a loop left to the interpreter ---")
+    evaluated = []
+    def counting(exp_str, instance_vars, stack):
+        evaluated.append(exp_str)
+        return evaluate(exp_str, instance_vars, stack)
+    assert_equal(vectorize.lower_for_loop('int i = 0', 'i < 3', 'i++',
+                                          'c[i] = a[i] / 2;', {}, stack, counting), False)
+    assert_equal(vectorize.lower_for_loop('int i = 0', 'i < n()', 'i++',
+                                          'c[i] = a[i];', {}, stack, counting), False)
+    assert_equal(vectorize.lower_for_loop('int i = start()', 'i < 3', 'i++',
+                                          'c[i] = a[i];', {}, stack, counting), False)
+    assert_equal(evaluated, [])
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    array_test()
+    vectorize_test()
@@ -0,0 +1,74 @@
+'''
+arrays.py
+Fixed-length, typed Java arrays.  Elements are kept in a plain Python list (the array's buffer) and
+are narrowed to the element datatype whenever they are written.
+'''
+from constants import *
+from exceptions import ArrayIndexOutOfBoundsException, NegativeArraySizeException
+from util import narrow
+import limits
+
+class Array(object):
+    def __init__(self, type, size, items=None):
+        if size < 0:
+            raise NegativeArraySizeException(str(size))
+        limits.allocate(self, limits.array_size(type, size))
+        self.type = type
+        self.size = size
+        if items is None:
+            self.items = [INITIALIZE_VALS.get(type)] * size
+        else:
+            self.items = [narrow(item, type) for item in items]
+
+    def __getitem__(self, index):
+        self.check_index(index)
+        return self.items[index]
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return '[Array] {0}[{1}] {2}'.format(self.type, self.size, self.items)
+
+    def change_item(self, index, newvalue):
+        self.check_index(index)
+        self.items[index] = narrow(newvalue, self.type)
+
+    def get_unchecked(self, index):
+        """Reads an element whose index has already been proven to be in bounds."""
+        return self.items[index]
+
+    def set_unchecked(self, index, newvalue):
+        """Writes an element whose index has already been proven to be in bounds."""
+        self.items[index] = narrow(newvalue, self.type)
+
+    def getLen(self):
+        return self.size
+
+    def get_datatype(self):
+        return self.type + ARRAY_SUFFIX
+
+    def check_index(self, index):
+        if type(index) is not int or index < 0 or index >= self.size:
+            raise ArrayIndexOutOfBoundsException("Index " + str(index) + " out of bounds for length " + str(self.size))
+
+"""
+is_array_type() returns True if the datatype names an array of one of the supported element types.
+
+Arguments:
+datatype -- STRING representation of the datatype, e.g. "int[]"
+"""
+def is_array_type(datatype):
+    return datatype is not None and datatype.endswith(ARRAY_SUFFIX) and element_type(datatype) in TYPES
+
+"""
+element_type() strips the array suffix off of an array datatype.
+
+Arguments:
+datatype -- STRING representation of the array datatype, e.g. "int[]"
+
+Returns:
+The element datatype, e.g. "int"
+"""
+def element_type(datatype):
+    return datatype[:-len(ARRAY_SUFFIX)].strip()
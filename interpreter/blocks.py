@@ -0,0 +1,177 @@
+'''
+blocks.py
+Brace-aware splitting of statement text.  Block statements (if, for, while, try, ...) are matched by
+their braces rather than split at the first "}", so blocks may be nested inside one another.
+'''
+import re
+from exceptions import InvalidIfElseBlockException
+import natives
+
+# Statements that end with the "}" of their last block rather than with a semicolon
+BLOCK_STATEMENT = r'\s*(?:[a-zA-Z_]\w*\s*:\s*)?(?:if|for|while|try|class|do|switch|synchronized)\b|\s*\{'
+# Words that continue a block statement after one of its blocks has closed
+CONTINUATIONS = r'\s*(?:else|catch|finally)\b'
+
+"""
+find_matching() returns the index of the bracket that closes the one at index start.  The brackets
+(), [] and {} are all counted, and the contents of string and char literals are skipped.
+
+Exceptions:
+SyntaxError -- raised if the bracket is never closed
+"""
+def find_matching(text, start):
+    blanked, depth = natives.blank_literals(text), 0
+    for index in range(start, len(blanked)):
+        if blanked[index] in "([{":
+            depth += 1
+        elif blanked[index] in ")]}":
+            depth -= 1
+            if depth == 0:
+                return index
+    raise SyntaxError("'" + text[start] + "' was never closed: " + text)
+
+"""
+split_statements() splits the text of a block into its statements.  A statement ends at a semicolon
+outside of any brackets, or, for a block statement, at the "}" closing its last block.  Semicolons are
+dropped; empty statements are left out.
+
+>>> split_statements('x = 1; while (x < 3) { if (x > 1) { y = 2; } x++; } z = "a;b";')
+['x = 1', 'while (x < 3) { if (x > 1) { y = 2; } x++; }', 'z = "a;b"']
+"""
+def split_statements(text):
+    blanked, depth, statements, start = natives.blank_literals(text), 0, [], 0
+    for index, char in enumerate(blanked):
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+            if char == "}" and depth == 0 and re.match(BLOCK_STATEMENT, blanked[start:index]) and \
+                    not re.match(CONTINUATIONS, blanked[index + 1:]):
+                statements.append(text[start:index + 1])
+                start = index + 1
+        elif char == ";" and depth == 0:
+            statements.append(text[start:index])
+            start = index + 1
+    statements.append(text[start:])
+    return [statement.strip() for statement in statements if statement.strip()]
+
+"""
+block_after() finds the block starting at or after index start, i.e. the text between a "{" and its
+matching "}".  A single statement without braces is accepted as a block too, as in Java.
+
+Returns:
+A tuple (text of the block, index just past its end)
+"""
+def block_after(text, start):
+    opening = len(text) - len(text[start:].lstrip())
+    if text[opening:opening + 1] == "{":
+        closing = find_matching(text, opening)
+        return text[opening + 1:closing], closing + 1
+    statement = split_statements(text[opening:])[:1]
+    if not statement:
+        raise SyntaxError("missing statement: " + text)
+    end = text.index(statement[0], opening) + len(statement[0])
+    if text[end:].lstrip().startswith(";"):
+        end = text.index(";", end) + 1
+    return statement[0], end
+
+"""
+header_and_block() splits a statement of the form "keyword (header) { block }", such as a loop, into its
+parts.
+
+Returns:
+A tuple (header, block, index just past the end of the block)
+
+Exceptions:
+SyntaxError -- raised if the statement does not have that form
+"""
+def header_and_block(statement, keyword):
+    match = re.match(r'\s*' + keyword + r'\s*\(', statement)
+    if not match:
+        raise SyntaxError("expected '" + keyword + " (': " + statement)
+    closing = find_matching(statement, match.end() - 1)
+    block, end = block_after(statement, closing + 1)
+    return statement[match.end():closing], block, end
+
+"""
+if_chain() splits an if statement, with its else if and else clauses, into its branches.
+
+Returns:
+A list of (condition, block) pairs, in order; the condition of an else clause is None.
+
+Exceptions:
+InvalidIfElseBlockException -- raised if the statement is not a well-formed if statement
+"""
+def if_chain(statement):
+    branches, position = [], 0
+    try:
+        while True:
+            condition, block, end = header_and_block(statement[position:], "if")
+            branches.append((condition, block))
+            position += end
+            rest = re.match(r'\s*else\b', statement[position:])
+            if not rest:
+                break
+            position += rest.end()
+            if not re.match(r'\s*if\b', statement[position:]):
+                block, end = block_after(statement, position)
+                branches.append((None, block))
+                position = end
+                break
+    except SyntaxError as error:
+        raise InvalidIfElseBlockException(str(error))
+    if statement[position:].strip():
+        raise InvalidIfElseBlockException("unexpected text after if statement: " + statement[position:])
+    return branches
+
+"""
+try_clauses() splits a try statement into its block, its catch clauses and its finally block.
+
+>>> try_clauses('try { a(); } catch (IOException | RuntimeException e) { b(); } finally { c(); }')
+(' a(); ', [(['IOException', 'RuntimeException'], 'e', ' b(); ')], ' c(); ')
+
+Returns:
+A tuple (block, catch clauses, finally block or None).  Each catch clause is a tuple (list of exception
+class names, variable name, block).
+
+Exceptions:
+SyntaxError -- raised if the statement is not a well-formed try statement
+"""
+def try_clauses(statement):
+    match = re.match(r'\s*try\s*\{', statement)
+    if not match:
+        raise SyntaxError("expected 'try {': " + statement)
+    block, position = block_after(statement, match.end() - 1)
+    catches, final = [], None
+    while True:
+        clause = re.match(r'\s*catch\s*\(', statement[position:])
+        if not clause:
+            break
+        opening = position + clause.end() - 1
+        closing = find_matching(statement, opening)
+        parameter = re.match(r'\s*(?:final\s+)?([\w.]+(?:\s*\|\s*[\w.]+)*)\s+([a-zA-Z_]\w*)\s*$',
+                             statement[opening + 1:closing])
+        if not parameter:
+            raise SyntaxError("invalid catch parameter: " + statement[opening + 1:closing])
+        handler, position = block_after(statement, closing + 1)
+        catches.append(([name.strip() for name in parameter.group(1).split("|")], parameter.group(2), handler))
+    clause = re.match(r'\s*finally\s*\{', statement[position:])
+    if clause:
+        final, position = block_after(statement, position + clause.end() - 1)
+    if statement[position:].strip():
+        raise SyntaxError("unexpected text after try statement: " + statement[position:])
+    if not catches and final is None:
+        raise SyntaxError("'try' without 'catch' or 'finally'")
+    return block, catches, final
+
+"""
+respace() puts back together the tokens the compiler separates in a method body, which it stores with
+a space around every "(", ")", "=", ".", ";" and ",".  String and char literals are left alone.
+
+>>> respace('x + = a . length ( ) ; if ( x = = 2 ) { s = "a . b" ; }')
+'x += a.length(); if(x == 2) { s = "a . b"; }'
+"""
+def respace(body):
+    join = lambda match: match.group(0) if match.group(0)[0] in "\"'" else re.sub(r'\s+', '', match.group(0))
+    return re.sub(natives.STRING_LITERAL + r'|\s*\.\s*(?=[\w$])|(?<=[-+*/%&|^!<>=])\s+=|\s+(?=[;,)])|' +
+                  r'(?<=[\w\]])\s+(?=\()|(?<=\()\s+', join, body)
@@ -0,0 +1,85 @@
+'''
+calls.py
+Compilation of the method calls and static field reads in an expression.  An expression's text is
+scanned once: every call chain ("s.substring(1).length()", "Math.max(a, b)") becomes a CallSite whose
+library methods are already bound to the Python functions implementing them, and library constants
+("Integer.MAX_VALUE") are replaced by their values.  Compiled expressions are cached by their text, so
+a loop body is only scanned on its first iteration.
+'''
+import re
+from collections import namedtuple
+from functools import lru_cache
+from exceptions import JavaNameError
+import natives
+import stdlib
+
+MEMBER_PATTERN = re.compile(r'(?<![\w.$])(?:(?:([a-zA-Z_]\w*)|("[^"]*"))\s*\.\s*)?([a-zA-Z_]\w*)\s*(\()?')
+CHAINED_PATTERN = re.compile(r'\s*\.\s*([a-zA-Z_]\w*)\s*\(')
+# Words followed by a parenthesis that are not the names of methods
+NOT_METHODS = ['if', 'for', 'while', 'switch', 'catch', 'synchronized', 'return', 'throw', 'new', 'this', 'super']
+
+# kind is 'static' (receiver is a library class), 'variable' or 'literal' (receiver is the text of a
+# variable name or a string literal), 'local' (an unqualified call of a method of the class being run;
+# receiver is None), or 'constant' (a static field; value holds its value).
+CallSite = namedtuple('CallSite', ['start', 'end', 'kind', 'receiver', 'chain', 'value', 'whole'])
+# function is the Python function bound at compile time, or None if it can only be found at run time.
+Call = namedtuple('Call', ['name', 'arguments', 'function'])
+
+"""
+compile_calls() finds the call chains and static field reads in an expression.  Receivers that are
+library classes are resolved here; so are String methods, which are bound speculatively, since whether
+a variable holds a String is only known when the expression runs.
+
+Arguments:
+exp_str -- the expression to be compiled
+
+Returns:
+A tuple of CallSites, in left-to-right order
+
+Exceptions:
+JavaNameError -- raised if a static method or field is not part of the library
+"""
+@lru_cache(maxsize=4096)
+def compile_calls(exp_str):
+    blanked, sites, position = natives.blank_literals(exp_str), [], 0
+    whole = lambda start, end: not exp_str[:start].strip() and not exp_str[end:].strip()
+    while True:
+        match = MEMBER_PATTERN.search(blanked, position)
+        if not match:
+            return tuple(sites)
+        receiver, member = match.group(1), match.group(3)
+        static = receiver in stdlib.STATIC_METHODS or receiver in stdlib.STATIC_FIELDS
+        unqualified = receiver is None and match.group(2) is None
+        if unqualified and (not match.group(4) or member in NOT_METHODS or
+                            re.search(r'\bnew\s+$', blanked[:match.start()])):
+            position = match.end()      # A variable, a keyword or a constructor
+            continue
+        if not match.group(4):
+            position = match.end()
+            if static:
+                if member not in stdlib.STATIC_FIELDS.get(receiver, {}):
+                    raise JavaNameError("cannot find symbol: variable {0} in {1}".format(member, receiver))
+                value = stdlib.STATIC_FIELDS[receiver][member]
+                sites.append(CallSite(match.start(), match.end(), 'constant', receiver, (), value,
+                                      whole(match.start(), match.end())))
+            continue
+
+        if static:
+            kind, function = 'static', stdlib.resolve_static(receiver, member)
+        elif unqualified:
+            kind, function = 'local', None
+        else:
+            kind, function = 'variable' if receiver else 'literal', stdlib.resolve_string_method(member)
+            receiver = receiver or exp_str[match.start(2):match.end(2)]
+        chain, opening = [], match.end() - 1
+        while True:
+            closing = natives.find_closing(exp_str, opening)
+            chain.append(Call(member, tuple(natives.split_arguments(exp_str[opening + 1:closing])), function))
+            chained = CHAINED_PATTERN.match(blanked, closing + 1)
+            if not chained:
+                break
+            member, opening = chained.group(1), chained.end() - 1
+            function = stdlib.resolve_string_method(member)
+        sites.append(CallSite(match.start(), closing + 1, kind, receiver, tuple(chain), None,
+                              whole(match.start(), closing + 1)))
+        position = closing + 1
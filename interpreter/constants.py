@@ -1,11 +1,10 @@
 """constants"""
 DELIMITERS = {'(': ')', '{': '}'}
 SPACE = ['+','-','/','//','*', '<', '>', '=']
-JAVA_TO_PYTHON = {'||': 'or', '&&': 'and', 'true': 'True', 'false': 'False'}
+JAVA_TO_PYTHON = {'||': 'or', '&&': 'and', 'true': 'True', 'false': 'False', 'null': 'None'}
 PYTHON_TO_JAVA = {val: key for key, val in JAVA_TO_PYTHON.items()}
 THING_TO_REPLACE = 'SIEHRIESHRESIHRESIRHES'
-INITIALIZE_VALS = {'int': 0, }
-CONTINUE_KEYWORDS = ['for', 'while', 'if']
+CONTINUE_KEYWORDS = ['for', 'while', 'if', 'try', 'class', 'synchronized']
 
 INT = 'int'
 FLOAT = 'float'
@@ -20,6 +19,22 @@ TYPES = [INT, FLOAT, DOUBLE, STRING, BOOLEAN, CHAR, SHORT, LONG]
 INT_TYPES = [INT, SHORT, LONG]
 FLOAT_TYPES = [FLOAT, DOUBLE]
 STRING_TYPES = [CHAR, STRING]
+INITIALIZE_VALS = {INT: 0, SHORT: 0, LONG: 0, FLOAT: 0.0, DOUBLE: 0.0, BOOLEAN: False, CHAR: '\u0000', STRING: None}
+INT_BITS = {SHORT: 16, INT: 32, LONG: 64}
+ARRAY_SUFFIX = '[]'
+ARRAY_CREATION = r'new\s+([a-zA-Z]\w*)\s*\[(.+)\]$'
+ARRAY_ACCESS = r'([a-zA-Z_]\w*)\s*\[([^\[\]]+)\]'
+ARRAY_LENGTH = r'([a-zA-Z_]\w*)\.length\b(?!\s*\()'
+ARRAY_ASSIGNMENT = r'([a-zA-Z_]\w*)\s*\[(.+)\]\s*=([^=].*)$'
+COMPOUND_ASSIGNMENT = r'([a-zA-Z_]\w*)\s*(?:\[(.+)\])?\s*(>>>|<<|>>|[-+*/%&|^])=(?!=)(.+)$'
+INCREMENT = r'(\+\+|--)\s*([a-zA-Z_]\w*)\s*(?:\[(.+)\])?$|([a-zA-Z_]\w*)\s*(?:\[(.+)\])?\s*(\+\+|--)$'
+SELF_CONCATENATION = r'([a-zA-Z_]\w*)\s*=\s*\1\s*\+(?![+=])(.+)$'
+METHOD_CALL = r'[a-zA-Z_]\w*(?:\s*\.\s*[a-zA-Z_]\w*\s*\(.*\))+$'
+JUMP = r'(?:(break|continue)(?:\s+([a-zA-Z_]\w*))?|return(?![\w$])\s*(.*))$'
+LABEL = r'\s*([a-zA-Z_]\w*)\s*:\s*(?=(?:for|while|do)\b)'
+THROW = r'throw\s+(.+)$'
+CLASS_DECLARATION = r'\s*(?:(?:public|private|final|abstract|static)\s+)*class\s'
+FOR_EACH = r'\s*(?:final\s+)?([a-zA-Z_][\w.]*(?:\s*\[\s*\])*)\s+([a-zA-Z_]\w*)\s*:(.+)$'
 KEYWORDS = TYPES + ['return', 'new'] + [key for key in JAVA_TO_PYTHON]+ [val for val in JAVA_TO_PYTHON.values()] \
                     + CONTINUE_KEYWORDS
 
@@ -0,0 +1,577 @@
+'''
+containers.py
+The java.util collections ArrayList, HashMap, HashSet and ArrayDeque, implemented natively on Python's
+list, dict and collections.deque, so every operation has the amortized cost it has in the JDK: O(1) for
+get/set/add at the end of an ArrayList, for the hashed operations of HashMap and HashSet, and at both
+ends of an ArrayDeque; O(n) for inserting into or removing from the middle of an ArrayList.
+
+Elements are stored as the evaluator's values: ints, floats, bools, unquoted strings, None for null, and
+objects.  Keys and elements are compared with Java's equals(), through the objects' __eq__ and __hash__
+(see natives.NativeObject).
+'''
+from collections import deque
+from exceptions import IndexOutOfBoundsException, NoSuchElementException, IllegalStateException, \
+    ConcurrentModificationException, NullPointerException
+from constants import INT
+from operators import java_string
+from util import narrow
+import natives
+import limits
+
+# Methods that only read the collection they are called on
+READ_ONLY_METHODS = ['size', 'isEmpty', 'contains', 'get', 'getOrDefault', 'containsKey', 'containsValue', 'indexOf',
+                     'lastIndexOf', 'peek', 'peekFirst', 'peekLast']
+
+"""
+key() returns the dictionary key a value is stored under.  Python takes 1, 1.0 and True for the same
+key, but Java's Integer, Double and Boolean are never equal to one another, so floats and booleans are
+tagged with their type.  Every other value is its own key.
+
+>>> key(1) == key(1.0)
+False
+"""
+def key(value):
+    if type(value) in (bool, float):
+        return (type(value), value)
+    return value
+
+"""
+value_of() undoes key().
+"""
+def value_of(key):
+    return key[1] if type(key) is tuple else key
+
+"""
+java_equals() compares two values the way a.equals(b) does for elements of a collection.
+"""
+def java_equals(left, right):
+    return key(left) == key(right)
+
+def check_index(index, size):
+    if type(index) is not int or index < 0 or index >= size:
+        raise IndexOutOfBoundsException("Index {0} out of bounds for length {1}".format(index, size))
+
+def check_not_null(value):
+    if value is None:
+        raise NullPointerException("null elements are not permitted")
+
+class Collection(natives.NativeObject):
+    """Base class of the collections.  Subclasses hold their elements in self.elements, and count the
+    changes to their structure in self.modifications, so that an iterator can fail fast when the
+    collection is changed under it, as the JDK's iterators do.  Elements are charged to the heap as
+    they are added (see reserve()).
+    """
+    methods = natives.NativeObject.methods + ['size', 'isEmpty', 'contains', 'clear', 'iterator', 'addAll']
+    interfaces = ('Collection', 'Iterable')
+    element_size = limits.REFERENCE     # Bytes an element takes
+    capacity = 0    # Bytes charged to the heap for the elements
+
+    def __init__(self, elements):
+        self.elements, self.modifications = elements, 0
+        self.reserve(0)
+
+    def reserve(self, count):
+        """Charges the heap for count more elements, before they are added."""
+        needed = (len(self.elements) + count) * self.element_size
+        if needed > self.capacity:
+            self.capacity = limits.grow(self, self.capacity, needed)
+
+    def contents(self):
+        """Returns the elements, in iteration order."""
+        return self.elements
+
+    def size(self):
+        return len(self.elements)
+
+    def isEmpty(self):
+        return len(self.elements) == 0
+
+    def contains(self, value):
+        target = key(value)
+        return any(key(element) == target for element in self.contents())
+
+    def clear(self):
+        self.elements.clear()
+        self.modifications += 1
+
+    def addAll(self, other):
+        changed = False
+        for element in list(other.contents()):
+            changed = self.add(element) or changed
+        return changed
+
+    def iterator(self):
+        return Iterator(self)
+
+    def toString(self):
+        return "[" + ", ".join(java_string(element) for element in self.contents()) + "]"
+
+    def __iter__(self):
+        return self.iterator()
+
+class Iterator(natives.NativeObject):
+    """An iterator over a collection.  Lists are walked in place, by index; the elements of the other
+    collections are copied when the iterator is created, which costs no more than walking them.
+    """
+    methods = natives.NativeObject.methods + ['hasNext', 'next', 'remove']
+    interfaces = ('Iterator',)
+
+    def __init__(self, collection):
+        self.collection, self.position, self.removable = collection, 0, False
+        self.items = collection.elements if type(collection.elements) is list else list(collection.contents())
+        self.expected = collection.modifications
+
+    def check_modifications(self):
+        if self.collection.modifications != self.expected:
+            raise ConcurrentModificationException()
+
+    def hasNext(self):
+        return self.position < len(self.items)
+
+    def next(self):
+        self.check_modifications()
+        if self.position >= len(self.items):
+            raise NoSuchElementException()
+        self.position += 1
+        self.removable = True
+        return self.items[self.position - 1]
+
+    def remove(self):
+        if not self.removable:
+            raise IllegalStateException()
+        self.check_modifications()
+        self.position -= 1
+        if self.items is self.collection.elements:
+            del self.items[self.position]
+        else:
+            self.collection.discard(self.items.pop(self.position))
+        self.collection.modifications += 1
+        self.expected, self.removable = self.collection.modifications, False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.hasNext():
+            raise StopIteration
+        return self.next()
+
+# Iterators are not created with new, but may be the declared type of a variable.
+natives.INTERFACES.update(Iterator.interfaces)
+
+@natives.register
+class ArrayList(Collection):
+    methods = Collection.methods + ['add', 'get', 'set', 'remove', 'indexOf', 'lastIndexOf']
+    interfaces = ('List',) + Collection.interfaces
+
+    def __init__(self, initial=None):
+        # new ArrayList<>(10) gives a capacity, which a Python list has no use for.
+        Collection.__init__(self, list(initial.contents()) if isinstance(initial, Collection) else [])
+
+    def add(self, *args):
+        self.reserve(1)
+        if len(args) == 1:
+            self.elements.append(args[0])
+        else:
+            index, value = args
+            if type(index) is not int or index < 0 or index > len(self.elements):
+                raise IndexOutOfBoundsException("Index: {0}, Size: {1}".format(index, len(self.elements)))
+            self.elements.insert(index, value)
+        self.modifications += 1
+        return True if len(args) == 1 else None
+
+    def get(self, index):
+        check_index(index, len(self.elements))
+        return self.elements[index]
+
+    def set(self, index, value):
+        check_index(index, len(self.elements))
+        previous, self.elements[index] = self.elements[index], value
+        return previous
+
+    def remove(self, value):
+        """remove(int index) removes the element at an index and returns it; remove(Object o) removes the
+        first element equal to o and returns whether there was one."""
+        if type(value) is int:
+            check_index(value, len(self.elements))
+            self.modifications += 1
+            return self.elements.pop(value)
+        index = self.indexOf(value)
+        if index < 0:
+            return False
+        del self.elements[index]
+        self.modifications += 1
+        return True
+
+    def indexOf(self, value):
+        target = key(value)
+        for index, element in enumerate(self.elements):
+            if key(element) == target:
+                return index
+        return -1
+
+    def lastIndexOf(self, value):
+        target = key(value)
+        for index in range(len(self.elements) - 1, -1, -1):
+            if key(self.elements[index]) == target:
+                return index
+        return -1
+
+    def equals(self, other):
+        return isinstance(other, ArrayList) and len(other.elements) == len(self.elements) and \
+            all(java_equals(left, right) for left, right in zip(self.elements, other.elements))
+
+    def hashCode(self):
+        code = 1
+        for element in self.elements:
+            code = narrow(31 * code + natives.java_hash(element), INT)
+        return code
+
+@natives.register
+class HashSet(Collection):
+    """A set, held as a dictionary from each element's key() to the element.  Python's dictionaries keep
+    their insertion order, so a HashSet iterates in the order its elements were added.
+    """
+    methods = Collection.methods + ['add', 'remove']
+    interfaces = ('Set',) + Collection.interfaces
+    element_size = limits.ENTRY
+
+    def __init__(self, initial=None):
+        Collection.__init__(self, {})
+        if isinstance(initial, Collection):
+            self.addAll(initial)
+
+    def contents(self):
+        return self.elements.values()
+
+    def add(self, value):
+        element_key = key(value)
+        if element_key in self.elements:
+            return False
+        self.reserve(1)
+        self.elements[element_key] = value
+        self.modifications += 1
+        return True
+
+    def remove(self, value):
+        if self.elements.pop(key(value), self) is self:
+            return False
+        self.modifications += 1
+        return True
+
+    def discard(self, value):
+        self.elements.pop(key(value), None)
+
+    def contains(self, value):
+        return key(value) in self.elements
+
+    def equals(self, other):
+        return isinstance(other, (HashSet, KeySet)) and len(other.elements) == len(self.elements) and \
+            all(element_key in other.elements for element_key in self.elements)
+
+    def hashCode(self):
+        return narrow(sum(natives.java_hash(element) for element in self.elements.values()), INT)
+
+@natives.register
+class ArrayDeque(Collection):
+    """A double-ended queue.  As in Java, it cannot hold null, and its equals() is identity."""
+    methods = Collection.methods + ['add', 'addFirst', 'addLast', 'offer', 'offerFirst', 'offerLast', 'push',
+                                    'pop', 'poll', 'pollFirst', 'pollLast', 'peek', 'peekFirst', 'peekLast',
+                                    'remove', 'removeFirst', 'removeLast', 'element', 'getFirst', 'getLast']
+    interfaces = ('Deque', 'Queue') + Collection.interfaces
+
+    def __init__(self, initial=None):
+        Collection.__init__(self, deque())
+        if isinstance(initial, Collection):
+            self.addAll(initial)
+
+    def addFirst(self, value):
+        check_not_null(value)
+        self.reserve(1)
+        self.elements.appendleft(value)
+        self.modifications += 1
+
+    def addLast(self, value):
+        check_not_null(value)
+        self.reserve(1)
+        self.elements.append(value)
+        self.modifications += 1
+
+    def add(self, value):
+        self.addLast(value)
+        return True
+
+    def offerFirst(self, value):
+        self.addFirst(value)
+        return True
+
+    def offerLast(self, value):
+        self.addLast(value)
+        return True
+
+    def pollFirst(self):
+        if not self.elements:
+            return None
+        self.modifications += 1
+        return self.elements.popleft()
+
+    def pollLast(self):
+        if not self.elements:
+            return None
+        self.modifications += 1
+        return self.elements.pop()
+
+    def removeFirst(self):
+        if not self.elements:
+            raise NoSuchElementException()
+        return self.pollFirst()
+
+    def removeLast(self):
+        if not self.elements:
+            raise NoSuchElementException()
+        return self.pollLast()
+
+    def peekFirst(self):
+        return self.elements[0] if self.elements else None
+
+    def peekLast(self):
+        return self.elements[-1] if self.elements else None
+
+    def getFirst(self):
+        if not self.elements:
+            raise NoSuchElementException()
+        return self.elements[0]
+
+    def getLast(self):
+        if not self.elements:
+            raise NoSuchElementException()
+        return self.elements[-1]
+
+    def remove(self, *args):
+        """remove() removes the first element; remove(Object o) removes the first occurrence of o."""
+        if not args:
+            return self.removeFirst()
+        target = key(args[0])
+        for index, element in enumerate(self.elements):
+            if key(element) == target:
+                del self.elements[index]
+                self.modifications += 1
+                return True
+        return False
+
+    def discard(self, value):
+        self.remove(value)
+
+    # The Queue and stack methods, in terms of the ones above
+    offer, push = offerLast, addFirst
+    poll, pop, peek, element = pollFirst, removeFirst, peekFirst, getFirst
+
+class Entry(natives.NativeObject):
+    """A key-value mapping of a HashMap, as returned by entrySet()."""
+    methods = natives.NativeObject.methods + ['getKey', 'getValue']
+    interfaces = ('Map.Entry', 'Entry')
+
+    def __init__(self, key, value):
+        self.key, self.value = key, value
+
+    def get_datatype(self):
+        return 'Map.Entry'
+
+    def getKey(self):
+        return self.key
+
+    def getValue(self):
+        return self.value
+
+    def toString(self):
+        return java_string(self.key) + "=" + java_string(self.value)
+
+    def equals(self, other):
+        return isinstance(other, Entry) and java_equals(self.key, other.key) and java_equals(self.value, other.value)
+
+    def hashCode(self):
+        return natives.java_hash(self.key) ^ natives.java_hash(self.value)
+
+# Neither are entries.
+natives.INTERFACES.update(Entry.interfaces)
+
+class MapView(Collection):
+    """A live view of the keys, values or entries of a HashMap, as keySet(), values() and entrySet() return:
+    it reads the map's dictionary as it is, and removing an element of the view removes its mapping from
+    the map.  Views cannot be added to.  Subclasses make an element of each mapping with item().
+    """
+    methods = natives.NativeObject.methods + ['size', 'isEmpty', 'contains', 'clear', 'iterator', 'remove']
+
+    def __init__(self, owner):
+        self.map = owner
+
+    # The map's entries and modification count are the view's.
+    elements = property(lambda self: self.map.entries)
+    modifications = property(lambda self: self.map.modifications,
+                             lambda self, count: setattr(self.map, 'modifications', count))
+
+    def contents(self):
+        return [self.item(map_key) for map_key in self.map.entries]
+
+    def remove(self, value):
+        map_key = self.find(value)
+        if map_key is None:
+            return False
+        self.discard(map_key)
+        self.map.modifications += 1
+        return True
+
+    def discard(self, map_key):
+        """Removes the mapping of a key, as the iterator's remove() does."""
+        del self.map.entries[map_key]
+
+    def iterator(self):
+        return MapIterator(self)
+
+class KeySet(MapView):
+    interfaces = ('Set',) + Collection.interfaces
+
+    def item(self, map_key):
+        return value_of(map_key)
+
+    def find(self, value):
+        return key(value) if key(value) in self.map.entries else None
+
+    def contains(self, value):
+        return key(value) in self.map.entries
+
+    # Keyed by key(), as a HashSet is.
+    equals, hashCode = HashSet.equals, HashSet.hashCode
+
+class Values(MapView):
+    def item(self, map_key):
+        return self.map.entries[map_key]
+
+    def find(self, value):
+        target = key(value)
+        return next((map_key for map_key, element in self.map.entries.items() if key(element) == target), None)
+
+class EntrySet(MapView):
+    interfaces = ('Set',) + Collection.interfaces
+
+    def item(self, map_key):
+        return Entry(value_of(map_key), self.map.entries[map_key])
+
+    def find(self, entry):
+        if not isinstance(entry, Entry) or key(entry.key) not in self.map.entries or \
+                not java_equals(self.map.entries[key(entry.key)], entry.value):
+            return None
+        return key(entry.key)
+
+    def contains(self, entry):
+        return self.find(entry) is not None
+
+    def equals(self, other):
+        return isinstance(other, EntrySet) and other.size() == self.size() and \
+            all(self.contains(entry) for entry in other.contents())
+
+    def hashCode(self):
+        return self.map.hashCode()
+
+class MapIterator(Iterator):
+    """An iterator over a view of a HashMap.  It walks the map's keys, so that remove() removes the mapping
+    it last returned, even from a view of values, where equal values may belong to different keys."""
+    def __init__(self, view):
+        self.collection, self.position, self.removable = view, 0, False
+        self.items = list(view.map.entries)
+        self.expected = view.modifications
+
+    def next(self):
+        return self.collection.item(Iterator.next(self))
+
+@natives.register
+class HashMap(natives.NativeObject):
+    """A map, held as a dictionary from each key's key() to its value.  keySet(), values() and entrySet()
+    return views of the map (see MapView), made in O(1).  Changes to the map's keys are counted in
+    modifications, so that iterators over the views fail fast.
+    """
+    methods = natives.NativeObject.methods + ['put', 'get', 'getOrDefault', 'containsKey', 'containsValue',
+                                              'remove', 'size', 'isEmpty', 'clear', 'putIfAbsent', 'keySet',
+                                              'values', 'entrySet']
+    interfaces = ('Map',)
+    capacity = 0    # Bytes charged to the heap for the entries
+
+    def __init__(self, initial=None):
+        self.entries = dict(initial.entries) if isinstance(initial, HashMap) else {}
+        self.modifications = 0
+        self.reserve(0)
+
+    def reserve(self, count):
+        """Charges the heap for count more entries, before they are added."""
+        needed = (len(self.entries) + count) * limits.ENTRY
+        if needed > self.capacity:
+            self.capacity = limits.grow(self, self.capacity, needed)
+
+    def put(self, map_key, value):
+        map_key = key(map_key)
+        previous = self.entries.get(map_key)
+        if map_key not in self.entries:
+            self.reserve(1)
+            self.modifications += 1
+        self.entries[map_key] = value
+        return previous
+
+    def get(self, map_key):
+        return self.entries.get(key(map_key))
+
+    def getOrDefault(self, map_key, default):
+        return self.entries.get(key(map_key), default)
+
+    def putIfAbsent(self, map_key, value):
+        previous = self.entries.get(key(map_key))
+        if previous is None:
+            if key(map_key) not in self.entries:
+                self.reserve(1)
+                self.modifications += 1
+            self.entries[key(map_key)] = value
+        return previous
+
+    def containsKey(self, map_key):
+        return key(map_key) in self.entries
+
+    def containsValue(self, value):
+        target = key(value)
+        return any(key(element) == target for element in self.entries.values())
+
+    def remove(self, map_key):
+        if key(map_key) not in self.entries:
+            return None
+        self.modifications += 1
+        return self.entries.pop(key(map_key))
+
+    def size(self):
+        return len(self.entries)
+
+    def isEmpty(self):
+        return len(self.entries) == 0
+
+    def clear(self):
+        self.entries.clear()
+        self.modifications += 1
+
+    def keySet(self):
+        return KeySet(self)
+
+    def values(self):
+        return Values(self)
+
+    def entrySet(self):
+        return EntrySet(self)
+
+    def toString(self):
+        return "{" + ", ".join(java_string(value_of(map_key)) + "=" + java_string(value)
+                               for map_key, value in self.entries.items()) + "}"
+
+    def equals(self, other):
+        return isinstance(other, HashMap) and len(other.entries) == len(self.entries) and \
+            all(map_key in other.entries and java_equals(value, other.entries[map_key])
+                for map_key, value in self.entries.items())
+
+    def hashCode(self):
+        return narrow(sum(natives.java_hash(value_of(map_key)) ^ natives.java_hash(value)
+                                  for map_key, value in self.entries.items()), INT)
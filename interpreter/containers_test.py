@@ -0,0 +1,128 @@
+"""
+containers_test.py
+
+Testing harness for containers.py. Run with
+
+    python3 containers_test.py
+
+This file is designed to run on python3
+"""
+
+from containers import *
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+def containers_test():
+    print("*---- containers Test ----*")
+    global xs, it, dq, keys
+
+    print("  --- ArrayList ---")
+    xs = ArrayList()
+    xs.call('add', [3])
+    xs.call('add', [1.0])
+    xs.call('add', [0, 'a'])
+    assert_equal(xs.toString(), '[a, 3, 1.0]')
+    assert_equal(xs.call('get', [1]), 3)
+    assert_equal(xs.call('contains', [1]), False)
+    assert_equal(xs.call('indexOf', [1.0]), 2)
+    assert_equal(xs.call('remove', [0]), 'a')
+    assert_equal(xs.call('remove', ['b']), False)
+    assert_equal(xs.call('set', [0, True]), 3)
+    assert_equal(xs.call('size', []), 2)
+    assert_error("xs.call('get', [2])", IndexOutOfBoundsException)
+    assert_error("xs.call('add', [3, 0])", IndexOutOfBoundsException)
+    assert_equal(ArrayList(xs), xs)
+    assert_equal(ArrayList().hashCode(), 1)
+    numbers = ArrayList()
+    numbers.addAll(xs)
+    numbers.elements = [1, 2, 3]
+    assert_equal(numbers.hashCode(), 30817)
+
+    print("  --- Iterator ---")
+    it = xs.iterator()
+    assert_equal(it.call('next', []), True)
+    it.call('remove', [])
+    assert_equal(xs.toString(), '[1.0]')
+    assert_error("it.call('remove', [])", IllegalStateException)
+    assert_equal(list(xs), [1.0])
+    xs.call('add', [2])
+    assert_error("it.call('next', [])", ConcurrentModificationException)
+
+    print("  --- HashMap ---")
+    counts = HashMap()
+    assert_equal(counts.call('put', ['a', 1]), None)
+    assert_equal(counts.call('put', ['a', 2]), 1)
+    counts.call('put', [1, 'int'])
+    counts.call('put', [1.0, 'double'])
+    counts.call('put', [True, 'boolean'])
+    assert_equal(counts.call('size', []), 4)
+    assert_equal(counts.call('get', [1]), 'int')
+    assert_equal(counts.call('getOrDefault', ['b', 0]), 0)
+    assert_equal(counts.call('remove', ['a']), 2)
+    assert_equal(counts.toString(), '{1=int, 1.0=double, true=boolean}')
+    assert_equal(list(counts.keySet()), [1, 1.0, True])
+    keys, values, entries = counts.keySet(), counts.values(), counts.entrySet()
+    counts.put('b', 3)
+    assert_equal(keys.call('contains', ['b']), True)
+    assert_equal(values.call('size', []), 4)
+    assert_equal(keys.call('remove', [1.0]), True)
+    assert_equal(counts.containsKey(1.0), False)
+    it = entries.call('iterator', [])
+    assert_equal(java_string(it.call('next', [])), '1=int')
+    it.call('remove', [])
+    assert_equal(counts.toString(), '{true=boolean, b=3}')
+    assert_equal(entries.call('contains', [Entry('b', 3)]), True)
+    assert_equal(values.call('remove', [3]), True)
+    assert_equal(list(values), ['boolean'])
+    assert_equal(keys.equals(HashSet(keys)), True)
+    it = keys.iterator()
+    counts.put('c', 4)
+    assert_error("it.call('next', [])", ConcurrentModificationException)
+    by_list = HashMap()
+    by_list.put(ArrayList(xs), 'list')
+    assert_equal(by_list.get(ArrayList(xs)), 'list')
+
+    print("  --- HashSet ---")
+    seen = HashSet()
+    assert_equal(seen.call('add', ['x']), True)
+    assert_equal(seen.call('add', ['x']), False)
+    assert_equal(seen.call('contains', ['x']), True)
+    assert_equal(seen.call('remove', ['y']), False)
+    assert_equal(seen.hashCode(), 120)
+
+    print("  --- ArrayDeque ---")
+    dq = ArrayDeque()
+    dq.call('push', [1])
+    dq.call('offer', [2])
+    dq.call('addFirst', [0])
+    assert_equal(dq.toString(), '[0, 1, 2]')
+    assert_equal(dq.call('pop', []), 0)
+    assert_equal(dq.call('pollLast', []), 2)
+    assert_equal(dq.call('peek', []), 1)
+    assert_error("dq.call('add', [None])", NullPointerException)
+    dq.clear()
+    assert_equal(dq.call('poll', []), None)
+    assert_error("dq.call('pop', [])", NoSuchElementException)
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    containers_test()
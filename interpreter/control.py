@@ -0,0 +1,59 @@
+'''
+control.py
+break, continue and return.  A jump statement does not raise: its command returns a Jump, and
+eval_commands() stops running the block and returns the Jump to its caller.  Loops check the Jump they
+get back after each pass through the body, so leaving a loop early costs one comparison.  A Jump not
+aimed at a loop keeps going up, through the enclosing blocks, until one handles it.
+'''
+
+BREAK = 'break'
+CONTINUE = 'continue'
+RETURN = 'return'
+
+class Jump(object):
+    """The status a block ends with when a jump statement runs.  label is the label of the loop a break or
+    continue is aimed at, or None for the innermost loop; value is the value a return statement returns.
+    """
+    __slots__ = ('kind', 'label', 'value')
+
+    def __init__(self, kind, label=None, value=None):
+        self.kind, self.label, self.value = kind, label, value
+
+    def __repr__(self):
+        return 'Jump({0}, {1}, {2})'.format(self.kind, self.label, self.value)
+
+"""
+continues() returns True if a loop with the given label should go on to its next iteration after its
+body ended with signal.
+
+>>> continues(Jump(CONTINUE), 'outer'), continues(Jump(CONTINUE, 'outer'), None)
+(True, False)
+"""
+def continues(signal, label):
+    return signal.kind == CONTINUE and (signal.label is None or signal.label == label)
+
+"""
+after_loop() returns what a loop with the given label that stopped on signal passes on to the enclosing
+block: nothing for a break aimed at the loop, and the signal itself otherwise.
+
+>>> after_loop(Jump(BREAK), None), after_loop(Jump(BREAK, "outer"), None)
+(None, Jump(break, outer, None))
+"""
+def after_loop(signal, label):
+    if signal.kind == BREAK and (signal.label is None or signal.label == label):
+        return None
+    return signal
+
+"""
+check_top_level() checks the signal a top-level statement ended with.  A return ends the statement;
+a break or continue that no loop handled is an error.
+
+Exceptions:
+SyntaxError -- raised for a break or continue outside of a loop, or aimed at a label no loop has
+"""
+def check_top_level(signal):
+    if signal is None or signal.kind == RETURN:
+        return
+    if signal.label is not None:
+        raise SyntaxError("undefined label: " + signal.label)
+    raise SyntaxError(signal.kind + " outside of loop")
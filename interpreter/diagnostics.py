@@ -0,0 +1,33 @@
+'''
+diagnostics.py
+Optional log of the decisions the interpreter's optimization passes make (which expressions were hoisted,
+and so on).  Nothing is recorded unless the REPL is started with --diagnostics, in which case the log is
+dumped after every statement that produced entries.
+'''
+import sys
+
+enabled = False
+entries = []
+
+"""
+note() records one diagnostic message under the name of the pass that produced it.
+
+Arguments:
+category -- short name of the optimization pass, e.g. "licm"
+message -- description of the decision
+"""
+def note(category, message):
+    if enabled:
+        entries.append((category, message))
+
+"""
+dump() prints every recorded diagnostic and clears the log.
+
+Arguments:
+out -- the file to print to (standard error by default)
+"""
+def dump(out=None):
+    out = out if out is not None else sys.stderr
+    for category, message in entries:
+        print("[{0}] {1}".format(category, message), file=out)
+    del entries[:]
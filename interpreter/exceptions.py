@@ -5,7 +5,7 @@ Stores the exceptions that are used in interpreter.
 '''
 
 class JavaException(Exception):
-    pass
+    catchable = True    # False for errors a catch clause of the Java program must not handle
 
 class InvalidAssignmentException(JavaException):
     pass
@@ -30,3 +30,42 @@ class InvalidConstructorException(JavaException):
 
 class WhatTheHeckHappenedException(JavaException):
     pass
+
+class ArrayIndexOutOfBoundsException(JavaException):
+    pass
+
+class NegativeArraySizeException(JavaException):
+    pass
+
+class StringIndexOutOfBoundsException(JavaException):
+    pass
+
+class NumberFormatException(JavaException):
+    pass
+
+class NullPointerException(JavaException):
+    pass
+
+class IndexOutOfBoundsException(JavaException):
+    pass
+
+class NoSuchElementException(JavaException):
+    pass
+
+class IllegalStateException(JavaException):
+    pass
+
+class ConcurrentModificationException(JavaException):
+    pass
+
+class IllegalMonitorStateException(JavaException):
+    pass
+
+class IllegalThreadStateException(JavaException):
+    pass
+
+class ThrownException(JavaException):
+    """Carries the Throwable of a Java throw statement up to the catch clause that handles it."""
+    def __init__(self, throwable):
+        JavaException.__init__(self, throwable.toString())
+        self.throwable = throwable
@@ -0,0 +1,491 @@
+'''
+greenthreads.py
+Java threads, run as green threads inside one interpreter session.  "new Thread(() -> { ... }).start()",
+join(), sleep(), synchronized blocks and methods, and wait()/notify() behave as in Java, but only one
+Java thread runs at a time, and they take turns in a fixed order: a thread runs for limits.quantum
+instructions (counted at the same safepoints as the instruction budget), then the next runnable thread
+has a turn.  The same program therefore always interleaves the same way.  With schedule_seed set, the
+next thread is chosen at random instead, from a generator seeded with it, so that other interleavings
+can be tried, and any one of them reproduced from its seed.
+
+The interpreter keeps a Java thread's state on the Python stack, so each Java thread runs on a Python
+thread of its own; the scheduler hands control from one to the next, and every Python thread but the
+running one is parked.  These are green threads in their scheduling only: each is an OS thread, with a
+stack of its own (a few dozen KB resident, the platform's default stack size reserved), and a parked
+thread is woken through the OS.  A few thousand live Java threads are cheap enough (5000, each sleeping,
+take about 150MB); far more than that are not, and would need the interpreter's frames to be resumable
+on one Python stack instead.  Time is virtual: Thread.sleep() and wait(millis) count milliseconds on a clock
+that moves one millisecond per turn, and jumps ahead when every thread is asleep, so a program never
+really waits.  If every thread is blocked and none is asleep, the program is deadlocked, and a
+DeadlockException naming the threads and the locks they are waiting for is raised in the main thread.
+
+A program's threads live as long as the program: when it ends (a REPL line, or a session's execute()),
+its main thread waits for the others to finish, as a JVM does before it exits.  If it ends with an
+error, the threads still running are stopped.
+'''
+import random
+import threading
+import itertools
+import contextlib
+import collections
+import limits
+import natives
+import throwables
+from exceptions import JavaException, IllegalMonitorStateException, IllegalThreadStateException, \
+    InvalidDatatypeException, NullPointerException
+
+schedule_seed = None    # Seed of a random schedule, or None to take turns in order
+
+scheduler = None    # The Scheduler of the running program, once it uses threads
+numbers = itertools.count()     # Numbers for the names of new threads ("Thread-0", ...)
+
+# Python thread id of a Java thread -> id of the Python thread running the program it belongs to.  The
+# sessions' engine lock is held by the program's thread on behalf of all its Java threads.
+acting_for = {}
+
+# The interpreter's per-thread state, as a function returning its lists: the stack of frames, the
+# classes being run and the method names for stack traces; and the set of array accesses proven in
+# bounds.  It is set by javarepl.py.
+thread_state = None
+
+NEW, RUNNABLE, BLOCKED, WAITING, TIMED_WAITING, TERMINATED = \
+    'NEW', 'RUNNABLE', 'BLOCKED', 'WAITING', 'TIMED_WAITING', 'TERMINATED'
+
+class DeadlockException(JavaException):
+    """Raised in the main thread when every thread of the program is blocked.  Java code cannot catch it."""
+    catchable = False
+
+class ThreadDeath(BaseException):
+    """Raised in a Java thread stopped because its program ended with an error.  It is not an Exception,
+    so that nothing on the way up handles it."""
+
+@natives.register
+class Thread(natives.NativeObject):
+    methods = natives.NativeObject.methods + ['start', 'run', 'join', 'getName', 'setName', 'isAlive',
+                                              'getState', 'isDaemon', 'setDaemon']
+    interfaces = ('Runnable',)
+
+    def __init__(self, target=None, name=None):
+        if type(target) is str and name is None:
+            target, name = None, target     # new Thread(name)
+        if target is not None and 'run' not in getattr(target, 'methods', ()):
+            raise InvalidDatatypeException("incompatible types: " + str(target) + " cannot be converted to Runnable")
+        self.target, self.name = target, name if name is not None else "Thread-" + str(next(numbers))
+        self.state, self.daemon = NEW, False
+        self.turn = threading.Event()   # Set when the thread may run
+        self.saved = [[], [], ['java.lang.Thread.run'], set()]     # Its interpreter state, while it is not running
+        self.wake_at = None     # The time it wakes up at, while it sleeps or waits with a timeout
+        self.waiting_for = None     # The Monitor or Thread it is blocked on, for deadlock reports
+
+    def start(self):
+        if self.state != NEW:
+            raise IllegalThreadStateException(self.name + " has already been started")
+        current_scheduler().start(self)
+
+    def run(self):
+        if self.target is not None:
+            self.target.call('run', [])
+
+    def join(self, millis=None):
+        current_scheduler().join(self, millis)
+
+    def getName(self):
+        return self.name
+
+    def setName(self, name):
+        self.name = name
+
+    def isAlive(self):
+        return self.state not in (NEW, TERMINATED)
+
+    def getState(self):
+        return self.state
+
+    def isDaemon(self):
+        return self.daemon
+
+    def setDaemon(self, daemon):
+        self.daemon = daemon
+
+    def toString(self):
+        return "Thread[" + self.name + "]"
+
+class Monitor(object):
+    """The lock and wait set of an object used by synchronized, wait() and notify()."""
+    def __init__(self, obj):
+        self.obj = obj
+        self.owner = None   # The Thread holding the lock
+        self.count = 0      # How many times the owner has entered it
+        self.entrants = []  # Threads blocked until the lock is free
+        self.waiters = []   # Threads in wait(), in the order they called it
+
+class Scheduler(object):
+    """The Java threads of a running program.  current is the thread running; ready holds the others that
+    can run, in the order they will.
+    """
+    def __init__(self):
+        self.main = Thread(None, 'main')
+        self.main.state = RUNNABLE
+        self.current = self.main
+        self.ready = collections.deque()
+        self.threads = [self.main]
+        self.sleepers = []  # Threads with a wake_at
+        self.monitors = {}  # Key of an object (see key()) -> its Monitor
+        self.clock = 0      # Virtual milliseconds
+        self.random = random.Random(schedule_seed) if schedule_seed is not None else None
+        self.principal = threading.get_ident()
+        self.failure = None     # The error a Java thread ended the program with, to be raised in main
+        self.stopping = False
+
+    def start(self, thread):
+        thread.state = RUNNABLE
+        self.threads.append(thread)
+        self.ready.append(thread)
+        threading.Thread(target=self.bootstrap, args=(thread,), daemon=True).start()
+
+    """
+    switch() ends the running thread's turn; it is called by limits.safepoint() every quantum instructions.
+    """
+    def switch(self):
+        if self.stopping:
+            return
+        self.clock += 1
+        self.wake_sleepers()
+        if self.ready:
+            self.ready.append(self.current)
+            self.transfer(self.pick())
+
+    def yield_turn(self):
+        if self.ready:
+            self.ready.append(self.current)
+            self.transfer(self.pick())
+
+    """
+    block() gives the turn away while the running thread cannot go on, and returns when it has the turn
+    again; the caller checks whether it can go on.  Threads asleep are woken early if nothing else can
+    run.
+
+    Exceptions:
+    DeadlockException -- raised in the main thread if no thread can run
+    """
+    def block(self):
+        if self.stopping:
+            raise ThreadDeath()
+        following = self.following()
+        if following is None:
+            self.deadlock()
+        else:
+            self.transfer(following)
+
+    def following(self):
+        """The thread to run next, moving the clock on to the first thread to wake up if none can run;
+        None if every thread is blocked."""
+        if not self.ready and self.sleepers:
+            self.clock = max(self.clock, min(thread.wake_at for thread in self.sleepers))
+            self.wake_sleepers()
+        return self.pick() if self.ready else None
+
+    def pick(self):
+        if self.random is None:
+            return self.ready.popleft()
+        index = self.random.randrange(len(self.ready))
+        thread = self.ready[index]
+        del self.ready[index]
+        return thread
+
+    def wake_sleepers(self):
+        for thread in [thread for thread in self.sleepers if thread.wake_at <= self.clock]:
+            self.wake(thread)
+
+    def wake(self, thread):
+        if thread in self.sleepers:
+            self.sleepers.remove(thread)
+        thread.wake_at, thread.waiting_for = None, None
+        thread.state = RUNNABLE
+        self.ready.append(thread)
+
+    """
+    transfer() parks the running thread, and hands the turn to another; it returns when the running
+    thread has the turn again.  The interpreter's per-thread state is swapped in place, since the
+    interpreter's commands hold on to its lists.
+    """
+    def transfer(self, thread):
+        me = self.current
+        if thread is me:
+            return
+        me.saved = save_state()
+        self.current = thread
+        thread.turn.set()
+        me.turn.wait()
+        me.turn.clear()
+        self.resume(me)
+
+    def resume(self, me):
+        restore_state(me.saved)
+        if me is self.main and self.failure is not None:
+            failure, self.failure = self.failure, None
+            raise failure
+        if me is not self.main and self.stopping:
+            raise ThreadDeath()
+
+    """
+    bootstrap() runs a Java thread, on its own Python thread, from its first turn to its end.  An
+    exception it does not catch is reported as Java reports it; an error no Java code may catch (an
+    exceeded limit, a deadlock) ends the program.
+    """
+    def bootstrap(self, thread):
+        acting_for[threading.get_ident()] = self.principal
+        thread.turn.wait()
+        thread.turn.clear()
+        try:
+            self.resume(thread)
+            thread.run()
+        except ThreadDeath:
+            pass
+        except Exception as error:
+            throwable = throwables.as_throwable(error)
+            if throwable is not None:
+                print('Exception in thread "' + thread.name + '" ' + throwables.stack_trace(throwable), file=natives.out)
+            else:
+                self.failure = error
+        finally:
+            del acting_for[threading.get_ident()]
+            self.exit(thread)
+
+    def exit(self, thread):
+        thread.state = TERMINATED
+        for other in self.threads:
+            if other.waiting_for is thread:
+                self.wake(other)
+        following = None if self.stopping or self.failure is not None else self.following()
+        if following is None:
+            if self.failure is None and not self.stopping:
+                self.failure = DeadlockException(self.describe_deadlock())
+            following = self.main
+            if following in self.ready:
+                self.ready.remove(following)
+        self.current = following
+        following.turn.set()
+
+    def deadlock(self):
+        error = DeadlockException(self.describe_deadlock())
+        if self.current is self.main:
+            raise error
+        self.failure = error
+        self.transfer(self.main)
+
+    def describe_deadlock(self):
+        lines = []
+        for thread in self.threads:
+            if isinstance(thread.waiting_for, Monitor):
+                monitor = thread.waiting_for
+                if thread in monitor.waiters:
+                    lines.append('"{0}" is waiting on {1}'.format(thread.name, describe(monitor.obj)))
+                else:
+                    lines.append('"{0}" is waiting to lock {1}, held by "{2}"'.format(
+                        thread.name, describe(monitor.obj), monitor.owner.name))
+            elif isinstance(thread.waiting_for, Thread):
+                lines.append('"{0}" is waiting for "{1}" to finish'.format(thread.name, thread.waiting_for.name))
+        return "no thread can run: " + "; ".join(lines)
+
+    def join(self, thread, millis=None):
+        me = self.current
+        deadline = self.clock + millis if millis else None
+        while thread.state not in (NEW, TERMINATED) and (deadline is None or self.clock < deadline):
+            if thread is me:
+                raise DeadlockException('"' + me.name + '" is waiting for itself to finish')
+            self.wait_for(thread, deadline)
+
+    def wait_for(self, thing, wake_at=None):
+        me = self.current
+        me.waiting_for, me.wake_at = thing, wake_at
+        if wake_at is not None:
+            me.state = TIMED_WAITING
+            self.sleepers.append(me)
+        else:
+            me.state = BLOCKED if isinstance(thing, Monitor) and me not in thing.waiters else WAITING
+        try:
+            self.block()
+        finally:
+            if me.state != RUNNABLE:    # Stopped while it waited
+                if me in self.sleepers:
+                    self.sleepers.remove(me)
+                me.state, me.waiting_for, me.wake_at = RUNNABLE, None, None
+
+    def sleep(self, millis):
+        if millis < 0:
+            raise natives.CLASSES['IllegalArgumentException']("timeout value is negative")
+        me = self.current
+        me.wake_at, me.state = self.clock + millis, TIMED_WAITING
+        self.sleepers.append(me)
+        self.block()
+
+    def monitor(self, obj):
+        monitor = self.monitors.get(key(obj))
+        if monitor is None:
+            monitor = self.monitors[key(obj)] = Monitor(obj)
+        return monitor
+
+    def enter(self, obj):
+        monitor, me = self.monitor(obj), self.current
+        while monitor.owner is not None and monitor.owner is not me:
+            monitor.entrants.append(me)
+            try:
+                self.wait_for(monitor)
+            finally:
+                if me in monitor.entrants:
+                    monitor.entrants.remove(me)
+        monitor.owner = me
+        monitor.count += 1
+
+    def exit_monitor(self, obj):
+        monitor = self.monitor(obj)
+        if monitor.owner is not self.current:
+            raise IllegalMonitorStateException("current thread is not owner")
+        monitor.count -= 1
+        if monitor.count == 0:
+            self.release(monitor)
+
+    def release(self, monitor):
+        monitor.owner = None
+        for thread in monitor.entrants:
+            if thread.state == BLOCKED:
+                self.wake(thread)
+
+    def wait(self, obj, millis=0):
+        monitor, me = self.monitor(obj), self.current
+        if monitor.owner is not me:
+            raise IllegalMonitorStateException("current thread is not owner")
+        count, monitor.count = monitor.count, 0
+        self.release(monitor)
+        monitor.waiters.append(me)
+        try:
+            self.wait_for(monitor, self.clock + millis if millis else None)
+        finally:
+            if me in monitor.waiters:
+                monitor.waiters.remove(me)
+        while monitor.owner is not None:
+            monitor.entrants.append(me)
+            try:
+                self.wait_for(monitor)
+            finally:
+                monitor.entrants.remove(me)
+        monitor.owner, monitor.count = me, count
+
+    def notify(self, obj, everyone=False):
+        monitor = self.monitor(obj)
+        if monitor.owner is not self.current:
+            raise IllegalMonitorStateException("current thread is not owner")
+        for thread in list(monitor.waiters) if everyone else monitor.waiters[:1]:
+            monitor.waiters.remove(thread)
+            self.wake(thread)
+
+    """
+    join_all() waits, in the main thread, for every other thread to finish.
+    """
+    def join_all(self):
+        while True:
+            alive = [thread for thread in self.threads if thread is not self.main and thread.state != TERMINATED]
+            if not alive:
+                return
+            self.join(alive[0])
+
+    """
+    stop() stops the threads still running, in the main thread, once the program has ended with an error.
+    Each is given a turn in which it raises ThreadDeath, which runs its finally blocks.
+    """
+    def stop(self):
+        self.stopping = True
+        for thread in self.threads:
+            if thread is not self.main and thread.state != TERMINATED:
+                self.main.saved = save_state()
+                self.current = thread
+                thread.turn.set()
+                self.main.turn.wait()
+                self.main.turn.clear()
+                restore_state(self.main.saved)
+        self.failure = None
+
+def save_state():
+    return [type(state)(state) for state in thread_state()]
+
+def restore_state(saved):
+    for state, values in zip(thread_state(), saved):
+        if type(state) is set:
+            state.clear()
+            state.update(values)
+        else:
+            state[:] = values
+
+def key(obj):
+    if obj is None:
+        raise NullPointerException("Cannot enter synchronized block because the lock is null")
+    if type(obj) in (int, float, bool):
+        raise InvalidDatatypeException("unexpected type: " + type(obj).__name__ + " is not a reference type")
+    return obj if type(obj) is str else id(obj)     # Equal strings are the same interned object in Java.
+
+def describe(obj):
+    if isinstance(obj, natives.NativeObject):
+        return obj.toString()
+    return '"' + obj + '"' if type(obj) is str else str(getattr(obj, 'name', obj))
+
+"""
+current_scheduler() returns the Scheduler of the running program, creating it (and starting to count
+turns) the first time the program uses threads.
+"""
+def current_scheduler():
+    global scheduler
+    if scheduler is None:
+        scheduler = Scheduler()
+        limits.switch, limits.switch_left = scheduler.switch, limits.quantum
+        limits.refuel()
+    return scheduler
+
+"""
+program() is a context manager around the run of a program (a REPL line, a session's execute()).  When
+the program ends, its main thread waits for the other threads it started; if it ends with an error,
+they are stopped.
+"""
+@contextlib.contextmanager
+def program():
+    global scheduler
+    if scheduler is not None:
+        yield   # Inside a program already
+        return
+    try:
+        yield
+        if scheduler is not None:
+            scheduler.join_all()
+    finally:
+        if scheduler is not None:
+            scheduler.stop()
+            scheduler = None
+            limits.switch, limits.switch_left = None, None
+            limits.refuel()
+
+"""
+synchronized() runs function holding the monitor of lock, as a synchronized block or method does, and
+returns what it returns.
+"""
+def synchronized(lock, function):
+    current = current_scheduler()
+    current.enter(lock)
+    try:
+        return function()
+    finally:
+        current.exit_monitor(lock)
+
+def sleep(millis):
+    current_scheduler().sleep(millis)
+
+def current_thread():
+    return current_scheduler().current
+
+def yield_turn():
+    current_scheduler().yield_turn()
+
+def wait(obj, millis=0):
+    current_scheduler().wait(obj, millis)
+
+def notify(obj, everyone=False):
+    current_scheduler().notify(obj, everyone)
@@ -0,0 +1,139 @@
+"""
+greenthreads_test.py
+
+Testing harness for greenthreads.py. Run with
+
+    python3 greenthreads_test.py
+
+This file is designed to run on python3
+"""
+
+from session import InterpreterSession
+from exceptions import JavaException
+import greenthreads
+import limits
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+RACE = """int[] c = new int[1]; Object lock = new Object();
+Runnable r = () -> { int v = 0; for (int i = 0; i < 50; i++) { BODY } };
+Thread a = new Thread(r); Thread b = new Thread(r);
+a.start(); b.start(); a.join(); b.join(); c[0]"""
+UNSAFE = RACE.replace('BODY', 'v = c[0]; v = v + 1; c[0] = v;')
+SAFE = RACE.replace('BODY', 'synchronized (lock) { v = c[0]; v = v + 1; c[0] = v; }')
+
+def scheduling_test():
+    print("*---- Scheduling Test ----*")
+    lost = InterpreterSession(quantum=3).execute(UNSAFE)
+    assert_equal(lost < 100, True)
+    assert_equal(InterpreterSession(quantum=3).execute(UNSAFE), lost)
+    assert_equal(InterpreterSession(quantum=3).execute(SAFE), 100)
+
+    print("  --- seeded schedules are reproducible ---")
+    for seed in (1, 2, 3):
+        first = InterpreterSession(quantum=3, schedule_seed=seed).execute(UNSAFE)
+        assert_equal(InterpreterSession(quantum=3, schedule_seed=seed).execute(UNSAFE), first)
+
+    print("  --- sleeping on the virtual clock ---")
+    s = InterpreterSession()
+    s.execute("""ArrayList<Integer> order = new ArrayList<>();
+                 Thread a = new Thread(() -> { Thread.sleep(30); order.add(1); });
+                 Thread b = new Thread(() -> { Thread.sleep(10); order.add(2); });
+                 a.start(); b.start(); order.add(0); a.join(); b.join();""")
+    assert_equal(s.execute('order.toString()'), '[0, 2, 1]')
+
+    print("  --- names and states ---")
+    s.execute('Thread t = new Thread(() -> { }, "worker");')
+    assert_equal(s.execute('t.getName()'), 'worker')
+    assert_equal(s.execute('Thread.currentThread().getName()'), 'main')
+    s.execute('t.join();')
+    assert_equal(s.execute('t.getState()'), 'NEW')
+    s.execute('t.start(); t.join();')
+    assert_equal(s.execute('t.getState()'), 'TERMINATED')
+    print('All tests passed!\n')
+
+def monitor_test():
+    global s
+    print("*---- Monitor Test ----*")
+    s = InterpreterSession(quantum=7)
+    s.execute("""ArrayDeque<Integer> q = new ArrayDeque<>(); ArrayList<Integer> got = new ArrayList<>();
+                 Object lock = new Object();
+                 Thread producer = new Thread(() -> { for (int i = 0; i < 5; i++) { synchronized (lock) { while (q.size() == 2) { lock.wait(); } q.add(i); lock.notifyAll(); } } });
+                 Thread consumer = new Thread(() -> { for (int i = 0; i < 5; i++) { synchronized (lock) { while (q.isEmpty()) { lock.wait(); } got.add(q.poll()); lock.notifyAll(); } } });
+                 consumer.start(); producer.start(); producer.join(); consumer.join();""")
+    assert_equal(s.execute('got.toString()'), '[0, 1, 2, 3, 4]')
+
+    print("  --- synchronized methods ---")
+    s.load("""class Counter {
+                  static synchronized void add(int[] c) { int v = c[0]; Thread.yield(); c[0] = v + 1; }
+                  static void hello() { System.out.println(Thread.currentThread().getName()); }
+              }""")
+    s.execute("""int[] c = new int[1];
+                 Thread a = new Thread(() -> { for (int i = 0; i < 5; i++) { Counter.add(c); } });
+                 Thread b = new Thread(() -> { for (int i = 0; i < 5; i++) { Counter.add(c); } });
+                 a.start(); b.start(); a.join(); b.join();""")
+    assert_equal(s.execute('c[0]'), 10)
+
+    print("  --- method references ---")
+    s.output()
+    s.execute('Thread h = new Thread(Counter::hello, "greeter"); h.start(); h.join();')
+    assert_equal(s.output(), 'greeter\n')
+
+    print("  --- misuse ---")
+    assert_error("s.execute('Object o = new Object(); o.notify();')", JavaException)
+    assert_error("s.execute('Thread t = new Thread(() -> { }); t.start(); t.start();')", JavaException)
+    assert_error("s.execute('synchronized (null) { }')", JavaException)
+    print('All tests passed!\n')
+
+def failure_test():
+    global s
+    print("*---- Failure Test ----*")
+    s = InterpreterSession()
+    assert_error("""s.execute('Object x = new Object(); Object y = new Object();'
+                 'Thread a = new Thread(() -> { synchronized (x) { Thread.sleep(10); synchronized (y) { } } });'
+                 'Thread b = new Thread(() -> { synchronized (y) { Thread.sleep(10); synchronized (x) { } } });'
+                 'a.start(); b.start(); a.join();')""", greenthreads.DeadlockException)
+
+    print("  --- uncaught exceptions end only their thread ---")
+    s.execute('Thread t = new Thread(() -> { int[] small = new int[1]; small[2] = 1; }); t.start(); t.join();')
+    assert_equal(s.execute('t.isAlive()'), False)
+    assert_equal(s.output().startswith('Exception in thread "Thread-'), True)
+
+    print("  --- array bounds proven by one thread's loop are its own ---")
+    s = InterpreterSession(quantum=2)
+    s.load("""class W { static void scan(int[] out) { int[] a = {1, 2}; int t = 0; for (int i = 0; i < 2; i++) { for (int k = 0; k < 20; k++) { t = t + a[i]; } } out[0] = t; }
+        static void work(int[] out) { int[] a = {5, 7}; int t = 0; int i = -1; while (i < 1) { t = t + a[i]; i++; } out[0] = t; } }""")
+    s.execute('int[] x = new int[1]; int[] y = new int[1]; Thread p = new Thread(() -> W.scan(x)); Thread w = new Thread(() -> W.work(y));')
+    s.execute('p.start(); w.start(); p.join(); w.join();')
+    assert_equal(s.execute('x[0] * 100 + y[0]'), 6000)
+    assert_equal(s.output().splitlines()[0], 'Exception in thread "Thread-1" java.lang.ArrayIndexOutOfBoundsException: Index -1 out of bounds for length 2')
+
+    print("  --- limits stop every thread ---")
+    s = InterpreterSession(budget=3000)
+    assert_error("s.execute('Thread t = new Thread(() -> { while (true) { } }); t.start();')",
+                 limits.InstructionBudgetExceededException)
+    assert_equal(s.execute('1 + 1'), 2)
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    scheduling_test()
+    monitor_test()
+    failure_test()
@@ -0,0 +1,366 @@
+'''
+inline.py
+Inlining of small methods.  When a method is compiled, each call in its body to a method that cannot be
+overridden (a static, private or final one) and whose body is a single small "return <expression>;" is
+replaced by that expression, with the arguments put in place of the parameters:
+
+    static int sq(int x) { return x * x; }
+    total = total + sq(i + 1);    ==>    total = total + ((i + 1) * (i + 1));
+
+The inlined call no longer sets up a stack frame or runs a separate body.  Calls whose arguments have
+side effects are left alone, since an argument may be evaluated any number of times once inlined.  So
+are calls with an argument that may throw (one that indexes an array, divides, or dereferences), unless
+its parameter is read exactly once, unconditionally, and after nothing else that may throw: a call
+evaluates every argument, once, before it runs the body.
+
+A call converts its arguments to the types of the parameters, and the result to the method's type
+("static double half(double x)" called with an int divides a double); the text put in its place does
+not.  So a call is only inlined if the types of its arguments can be told from the text (from the
+caller's declarations) and need no converting, and a method only if the same holds of its result.
+'''
+import re
+import diagnostics
+from constants import INT, SHORT, LONG, FLOAT, DOUBLE, CHAR, BOOLEAN, STRING, TYPES
+import natives
+import blocks
+import stdlib
+from calls import NOT_METHODS
+from memoize import ANNOTATION
+
+max_size = 16   # The most tokens an inlined expression may have
+MAX_ROUNDS = 3  # Inlined expressions may hold calls to inline in turn, this many levels deep
+
+CALL_PATTERN = re.compile(r'(?<![\w$.])(?:([a-zA-Z_]\w*)\s*\.\s*)?([a-zA-Z_]\w*)\s*\(')
+NAME_PATTERN = re.compile(r'(?<![\w$.])[a-zA-Z_$][\w$]*')
+TOKEN_PATTERN = re.compile(r'[\w$.]+|[^\w\s]')
+SIMPLE_ARGUMENT = re.compile(r'(?:[a-zA-Z_$][\w$]*|\d[\w.]*|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')$')
+SIDE_EFFECTS = re.compile(r'[\w$\]]\s*\(|\+\+|--|(?<![=!<>])=(?!=)|\bnew\b')
+# Array indexing, division, dereferences and calls, any of which may throw
+TRAPS = re.compile(r'[/%\[]|[a-zA-Z_$\])]\s*\.\s*[a-zA-Z_$]|[\w$\]]\s*\(')
+CONDITIONAL = re.compile(r'&&|\|\||\?')
+CONSTANTS = ['true', 'false', 'null']
+
+# Parameter type -> the types of the arguments it takes without converting them
+ARGUMENT_TYPES = {INT: [INT, SHORT], SHORT: [SHORT], LONG: [LONG], FLOAT: [FLOAT], DOUBLE: [DOUBLE], CHAR: [CHAR]}
+# Method type -> the types of results it returns as they are (an int is a long as it is; a char is not)
+RESULT_TYPES = {INT: [INT, SHORT], SHORT: [SHORT], LONG: [LONG, INT, SHORT], FLOAT: [FLOAT],
+                DOUBLE: [DOUBLE, FLOAT], CHAR: [CHAR]}
+NUMERIC_ORDER = [SHORT, CHAR, INT, LONG, FLOAT, DOUBLE]   # Narrowest first, as binary promotion goes
+TYPE_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[\w$.]+|>>>|<<|>>|<=|>=|==|!=|&&|\|\||[^\w\s]')
+DECLARATION = re.compile(r'(?<![\w$.])(' + '|'.join(TYPES) + r')((?:\s*\[\s*\])*)\s+([a-zA-Z_$][\w$]*)\s*(?=[=;,):])')
+COMPARISONS = ['<', '>', '<=', '>=', '==', '!=', '&&', '||', '!']
+# The types of library results: 'widest' for the widest type of the arguments
+STATIC_RESULTS = {'Math.abs': 'widest', 'Math.max': 'widest', 'Math.min': 'widest', 'Math.floorDiv': 'widest',
+                  'Math.floorMod': 'widest', 'Math.round': LONG, 'Math.random': DOUBLE,
+                  'Integer.parseInt': INT, 'Integer.valueOf': INT, 'Integer.max': INT, 'Integer.min': INT,
+                  'Integer.compare': INT, 'Integer.toString': STRING, 'Integer.toBinaryString': STRING,
+                  'Character.toUpperCase': CHAR, 'Character.toLowerCase': CHAR, 'Character.isDigit': BOOLEAN,
+                  'Character.isLetter': BOOLEAN, 'Character.isLetterOrDigit': BOOLEAN,
+                  'Character.isWhitespace': BOOLEAN, 'Character.isUpperCase': BOOLEAN,
+                  'Character.isLowerCase': BOOLEAN,
+                  'Character.getNumericValue': INT, 'String.valueOf': STRING}
+MEMBER_RESULTS = {'length': INT, 'charAt': CHAR, 'indexOf': INT, 'compareTo': INT, 'hashCode': INT, 'size': INT,
+                  'equals': BOOLEAN, 'isEmpty': BOOLEAN, 'contains': BOOLEAN, 'startsWith': BOOLEAN,
+                  'endsWith': BOOLEAN, 'trim': STRING, 'substring': STRING, 'toUpperCase': STRING,
+                  'toLowerCase': STRING, 'toString': STRING}
+
+decisions = {}  # Method -> (expression, None) if its calls may be inlined, (None, reason) otherwise
+
+"""
+inline_calls() inlines the calls in a method body that can be inlined.  Each decision is reported to the
+diagnostics, once per callee.
+
+Arguments:
+body -- the text of the body, as blocks.respace() returns it
+cls -- the ClassObj of the method the body belongs to; unqualified calls are calls of its methods
+classes -- the classes declared in the REPL, by name
+caller -- the name of the method the body belongs to, for the diagnostics
+parameters -- the types of the method's parameters, by name
+
+Returns:
+The body, with the calls replaced by the inlined expressions
+"""
+def inline_calls(body, cls, classes, caller, parameters=None):
+    declared = declared_types(body, cls, parameters or {})
+    notes = []
+    for _ in range(MAX_ROUNDS):
+        rewritten = rewrite_calls(body, cls, classes, caller, notes, declared)
+        if rewritten == body:
+            break
+        body = rewritten
+    for message in sorted(set(notes), key=notes.index):
+        diagnostics.note("inline", message)
+    return body
+
+"""
+rewrite_calls() makes one pass of inlining over a body, and appends its decisions to notes; see
+inline_calls().
+"""
+def rewrite_calls(body, cls, classes, caller, notes, declared):
+    blanked, pieces, position = natives.blank_literals(body), [], 0
+    for match in CALL_PATTERN.finditer(blanked):
+        receiver, name = match.group(1), match.group(2)
+        target = cls if receiver is None else classes.get(receiver)
+        if match.start() < position or target is None or name in NOT_METHODS or \
+                re.search(r'\bnew\s+$', blanked[:match.start()]):
+            continue
+        closing = natives.find_closing(body, match.end() - 1)
+        arguments = natives.split_arguments(body[match.end():closing])
+        method = target.methods.get((name, len(arguments)))
+        if method is None:
+            continue
+        callee = target.name + "." + name
+        expression, reason = decide(target, method, classes)
+        if expression is not None:
+            expression, reason = substitute(target, method, expression, arguments, declared, cls, classes)
+        if expression is None:
+            notes.append("not inlining {0} into {1}: {2}".format(callee, caller, reason))
+            continue
+        notes.append("inlined {0} into {1}".format(callee, caller))
+        pieces += [body[position:match.start()], expression]
+        position = closing + 1
+    return "".join(pieces) + body[position:]
+
+"""
+decide() decides whether the calls of a method can be inlined, and remembers the decision.  They can be
+if the method cannot be overridden, is not memoized, and its body is a single return statement whose
+expression has at most max_size tokens, does not call the method itself, reads no names but the
+method's parameters and static members of classes, and has a type the method returns as it is.
+
+Returns:
+A tuple (expression, None) if the calls can be inlined, and (None, reason) otherwise
+"""
+def decide(cls, method, classes):
+    if method not in decisions:
+        decisions[method] = inlinable_expression(cls, method, classes)
+    return decisions[method]
+
+def inlinable_expression(cls, method, classes):
+    if not (method.static or method.private or method.final):
+        return None, "may be overridden"
+    if ANNOTATION in method.annotations:
+        return None, "memoized"
+    if method.synchronized:
+        return None, "synchronized"
+    statements = blocks.split_statements(blocks.respace(method.body))
+    match = re.match(r'return(?![\w$])\s*(.+)$', statements[0], re.DOTALL) if len(statements) == 1 else None
+    if not match:
+        return None, "body is not a single return statement"
+    expression = match.group(1).strip()
+    blanked = natives.blank_literals(expression)
+    if len(TOKEN_PATTERN.findall(blanked)) > max_size:
+        return None, "larger than {0} tokens".format(max_size)
+    if re.search(r'(?<![\w$.])(?:' + cls.name + r'\s*\.\s*)?' + method.name + r'\s*\(', blanked):
+        return None, "recursive"
+    parameters = [arg.name for arg in method.args]
+    for name in NAME_PATTERN.finditer(blanked):
+        following = blanked[name.end():].lstrip()[:1]
+        if name.group(0) in parameters or name.group(0) in CONSTANTS or following == '(':
+            continue
+        if following == '.' and (name.group(0) in stdlib.STATIC_METHODS or name.group(0) in stdlib.STATIC_FIELDS or
+                                 name.group(0) in classes):
+            continue
+        return None, "reads " + name.group(0)
+    if method.type in RESULT_TYPES:
+        result = expression_type(expression, {arg.name: arg.type for arg in method.args}, cls, classes)
+        if result not in RESULT_TYPES[method.type]:
+            return None, "result may need converting to " + method.type
+    return expression, None
+
+"""
+substitute() puts the arguments of a call in place of the parameters in an inlined expression, and
+qualifies the expression's unqualified calls with the name of the method's class, since they may be
+inlined into a method of another class.
+
+Arguments:
+declared, caller, classes -- the types of the names the arguments may read, the class of the method
+they are in, and the classes declared in the REPL (see expression_type())
+
+Returns:
+A tuple (parenthesized expression, None), or (None, reason) if the arguments cannot be substituted
+"""
+def substitute(cls, method, expression, arguments, declared=None, caller=None, classes=None):
+    values, evaluated = {}, 0
+    for arg, argument in zip(method.args, arguments):
+        if SIDE_EFFECTS.search(natives.blank_literals(argument)):
+            return None, "argument '{0}' may have side effects".format(argument)
+        if TRAPS.search(natives.blank_literals(argument)):
+            use = single_use(expression, arg.name, evaluated)
+            if use is None:
+                return None, "argument '{0}' may throw, and would not be evaluated once, in order".format(argument)
+            evaluated = use
+        if arg.type in ARGUMENT_TYPES and \
+                expression_type(argument, declared or {}, caller, classes or {}) not in ARGUMENT_TYPES[arg.type]:
+            return None, "argument '{0}' may need converting to {1}".format(argument, arg.type)
+        values[arg.name] = argument if SIMPLE_ARGUMENT.match(argument) else "(" + argument + ")"
+    blanked, pieces, position = natives.blank_literals(expression), [], 0
+    for name in NAME_PATTERN.finditer(blanked):
+        following = blanked[name.end():].lstrip()[:1]
+        if name.group(0) in values:
+            if following == '.' and values[name.group(0)][0] == '(':
+                return None, "argument '{0}' is the receiver of a call".format(values[name.group(0)][1:-1])
+            replacement = values[name.group(0)]
+        elif following == '(' and name.group(0) not in NOT_METHODS:
+            replacement = cls.name + "." + name.group(0)
+        else:
+            continue
+        pieces += [expression[position:name.start()], replacement]
+        position = name.end()
+    return "(" + "".join(pieces) + expression[position:] + ")", None
+
+"""
+single_use() returns where an inlined expression reads a parameter, if it reads it exactly once, outside
+any conditional (&&, || and ?:), and after nothing but the arguments evaluated before it (up to start)
+that may throw; and None otherwise.
+"""
+def single_use(expression, name, start):
+    blanked = natives.blank_literals(expression)
+    uses = [use for use in NAME_PATTERN.finditer(blanked) if use.group(0) == name]
+    if len(uses) != 1 or CONDITIONAL.search(blanked) or uses[0].start() < start or \
+            TRAPS.search(blanked[start:uses[0].start()]):
+        return None
+    return uses[0].end()
+
+"""
+declared_types() returns the types of the names a method body may read: its local variables (declared
+with a primitive type, String, or an array of one), its parameters and the fields of its class.  A name
+declared with different types in different blocks is left out.
+"""
+def declared_types(body, cls, parameters):
+    declared = {name: variable.type for name, variable in cls.instance_attr.items()} if cls is not None else {}
+    declared.update(parameters)
+    local = {}
+    for match in DECLARATION.finditer(natives.blank_literals(body)):
+        datatype = match.group(1) + re.sub(r'\s', '', match.group(2))
+        name = match.group(3)
+        local[name] = datatype if local.get(name, datatype) == datatype else None
+    declared.update(local)
+    return declared
+
+"""
+expression_type() tells the type of an expression from its text, the way Java's rules of binary
+promotion would: from its literals, the types of the names it reads, and the types of the methods it
+calls.
+
+Arguments:
+expression -- the text of the expression
+declared -- the types of the names it may read, by name
+cls -- the class whose methods unqualified calls call, or None
+classes -- the classes declared in the REPL, by name
+
+Returns:
+The type, or None if it cannot be told
+"""
+def expression_type(expression, declared, cls, classes):
+    return tokens_type(TYPE_TOKEN.findall(expression), declared, cls, classes)
+
+def tokens_type(tokens, declared, cls, classes):
+    operands, operators, i = [], [], 0
+    while i < len(tokens):
+        token = tokens[i]
+        following = tokens[i + 1] if i + 1 < len(tokens) else ''
+        if token in ('(', ')'):
+            i += 1
+        elif not (token[0].isalnum() or token[0] in '_$"\'.'):
+            operators.append(token)
+            i += 1
+        elif following == '(':
+            end = closing(tokens, i + 1)
+            datatype = call_type(token, split(tokens[i + 2:end]), declared, cls, classes)
+            i = end + 1
+            while i < len(tokens) and tokens[i][0] == '.':    # A chain of calls, "s.trim().length()"
+                if i + 1 < len(tokens) and tokens[i + 1] == '(':
+                    datatype = MEMBER_RESULTS.get(tokens[i][1:])
+                    i = closing(tokens, i + 1) + 1
+                else:
+                    datatype, i = None, i + 1
+            operands.append(datatype)
+        elif following == '[':
+            datatype = declared.get(token) or ''
+            operands.append(datatype[:-2] if datatype.endswith('[]') else None)
+            i = closing(tokens, i + 1) + 1
+        else:
+            operands.append(operand_type(token, declared, classes))
+            i += 1
+    if '?' in operators or not operands:
+        return None
+    if any(operator in COMPARISONS for operator in operators):
+        return BOOLEAN
+    if None in operands:
+        return None
+    if STRING in operands and operators:
+        return STRING if set(operators) <= {'+'} else None
+    if not operators:
+        return operands[0] if len(operands) == 1 else None
+    if all(operand == BOOLEAN for operand in operands):
+        return BOOLEAN if set(operators) <= {'&', '|', '^'} else None
+    if not all(operand in NUMERIC_ORDER for operand in operands):
+        return None
+    return promote(operands)
+
+def promote(operands):
+    """The type of numeric operands combined by an operator: at least int."""
+    return max(operands + [INT], key=NUMERIC_ORDER.index)
+
+def operand_type(token, declared, classes):
+    if token[0] == '"':
+        return STRING
+    if token[0] == "'":
+        return CHAR
+    if token in ('true', 'false'):
+        return BOOLEAN
+    if token[0].isdigit() or token[0] == '.':
+        if token[-1] in 'lL':
+            return LONG
+        if token[-1] in 'fF' and not token.lower().startswith('0x'):
+            return FLOAT
+        if token[-1] in 'dD' or '.' in token or ('e' in token.lower() and not token.lower().startswith('0x')):
+            return DOUBLE
+        return INT
+    if '.' in token:
+        owner, field = token.rsplit('.', 1)
+        if field == 'length' and (declared.get(owner) or '').endswith('[]'):
+            return INT
+        if owner in classes and field in classes[owner].instance_attr:
+            return classes[owner].instance_attr[field].type
+        value = stdlib.STATIC_FIELDS.get(owner, {}).get(field)
+        return {int: INT, float: DOUBLE}.get(type(value))
+    datatype = declared.get(token)
+    return datatype if datatype in TYPES else None
+
+def call_type(name, arguments, declared, cls, classes):
+    owner, _, method_name = name.rpartition('.')
+    target = cls if not owner else classes.get(owner)
+    if target is not None:
+        method = target.methods.get((method_name, len(arguments)))
+        return method.type if method is not None else None
+    result = STATIC_RESULTS.get(name)
+    if result == 'widest':
+        types = [tokens_type(argument, declared, cls, classes) for argument in arguments]
+        return promote(types) if all(datatype in NUMERIC_ORDER for datatype in types) else None
+    if result is None and owner == 'Math':
+        return DOUBLE   # The rest of Math works in doubles.
+    if result is not None or owner in stdlib.STATIC_METHODS:
+        return result
+    return MEMBER_RESULTS.get(method_name)
+
+def closing(tokens, start):
+    depth = 0
+    for i in range(start, len(tokens)):
+        depth += tokens[i] in ('(', '[')
+        depth -= tokens[i] in (')', ']')
+        if depth == 0:
+            return i
+    return len(tokens) - 1
+
+def split(tokens):
+    arguments, depth, current = [], 0, []
+    for token in tokens:
+        if token == ',' and depth == 0:
+            arguments.append(current)
+            current = []
+            continue
+        depth += token in ('(', '[')
+        depth -= token in (')', ']')
+        current.append(token)
+    return arguments + [current] if current else arguments
@@ -0,0 +1,150 @@
+"""
+inline_test.py
+
+Testing harness for inline.py. Run with
+
+    python3 inline_test.py
+
+This file is designed to run on python3
+"""
+
+import sys
+sys.path.append(sys.path[0] + '/../')
+
+from compiler.compile_eval import load_str
+from session import InterpreterSession
+import exceptions
+import diagnostics
+import inline
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+SOURCE = """class G { int count;
+    static int sq(int x) { return x * x; }
+    static int norm(int a, int b) { return sq(a) + sq(b); }
+    private int twice(int n) { return n + n; }
+    final int trim(String s) { return s.trim().length(); }
+    static int clamp(int a) { return Math.max(0, Math.min(a, Integer.MAX_VALUE)); }
+    int open(int n) { return n; }
+    static int counter(int n) { return count + n; }
+    static int fact(int n) { return n < 2 ? 1 : n * fact(n - 1); }
+    static int loop(int n) { int t = 0; return t; }
+    static int big(int x) { return x + x + x + x + x + x + x + x + x + x; }
+    @Memoize static int cached(int n) { return n; }
+    static double half(double x) { return x / 2; }
+    static double doubled(int n) { return n * 2; }
+    static int code(String s) { return s.charAt(0); }
+    static long wide(long x) { return x * x; }
+    static int first(int a, int b) { return a; }
+    static int either(boolean c, int a) { return c ? a : 0; }
+    static int ratio(int a, int b) { return b / a; } }"""
+INTS = {'i': 'int', 'a': 'int', 'b': 'int'}
+
+def decide_test():
+    print("*---- decide Test ----*")
+    classes = load_str(SOURCE)
+    cls = classes['G']
+    decide = lambda name: inline.decide(cls, [m for (n, _), m in cls.methods.items() if n == name][0], classes)
+
+    print("  --- inlinable ---")
+    assert_equal(decide('sq'), ('x * x', None))
+    assert_equal(decide('norm'), ('sq(a) + sq(b)', None))
+    assert_equal(decide('twice'), ('n + n', None))
+    assert_equal(decide('trim'), ('s.trim().length()', None))
+    assert_equal(decide('clamp')[1], None)
+
+    assert_equal(decide('half'), ('x / 2', None))
+    assert_equal(decide('wide'), ('x * x', None))
+    print("  --- not inlinable ---")
+    assert_equal(decide('open'), (None, 'may be overridden'))
+    assert_equal(decide('counter'), (None, 'reads count'))
+    assert_equal(decide('fact'), (None, 'recursive'))
+    assert_equal(decide('loop'), (None, 'body is not a single return statement'))
+    assert_equal(decide('big'), (None, 'larger than 16 tokens'))
+    assert_equal(decide('cached'), (None, 'memoized'))
+    assert_equal(decide('doubled'), (None, 'result may need converting to double'))
+    assert_equal(decide('code'), (None, 'result may need converting to int'))
+
+    print('All tests passed!\n')
+
+def inline_calls_test():
+    print("*---- inline_calls Test ----*")
+    classes = load_str(SOURCE)
+    classes.update(load_str("class H { static int f(int y) { return y; } }"))
+    cls = classes['H']
+
+    print("  --- arguments ---")
+    assert_equal(inline.inline_calls('t = G.sq(i + 1);', cls, classes, 'H.run', INTS), 't = ((i + 1) * (i + 1));')
+    assert_equal(inline.inline_calls('t = G.sq(i);', cls, classes, 'H.run', INTS), 't = (i * i);')
+    assert_equal(inline.inline_calls('return G.trim(" a ");', cls, classes, 'H.run'),
+                 'return (" a ".trim().length());')
+    assert_equal(inline.inline_calls('return f(G.sq(2)) + f(3);', cls, classes, 'H.run'),
+                 'return (((2 * 2))) + (3);')
+
+    print("  --- arguments are not converted ---")
+    assert_equal(inline.inline_calls('double r = G.half(n);', cls, classes, 'H.run', {'n': 'int'}),
+                 'double r = G.half(n);')
+    assert_equal(inline.inline_calls('double d = 3.0; double r = G.half(d + 1);', cls, classes, 'H.run'),
+                 'double d = 3.0; double r = ((d + 1) / 2);')
+    assert_equal(inline.inline_calls('double r = G.half(2.0);', cls, classes, 'H.run'), 'double r = (2.0 / 2);')
+    assert_equal(inline.inline_calls('long r = G.wide(i);', cls, classes, 'H.run', INTS), 'long r = G.wide(i);')
+    assert_equal(inline.inline_calls('t = G.sq(q);', cls, classes, 'H.run'), 't = G.sq(q);')
+    assert_equal(inline.inline_calls("t = G.sq('a');", cls, classes, 'H.run'), "t = G.sq('a');")
+
+    print("  --- nested calls are qualified ---")
+    assert_equal(inline.inline_calls('return G.norm(a, b);', cls, classes, 'H.run', INTS),
+                 'return ((a * a) + (b * b));')
+
+    print("  --- left alone ---")
+    for body in ['t = G.sq(i++);', 't = G.sq(next());', 't = G.trim(s + "x");', 't = G.open(1);',
+                 't = G.sq(1, 2);', 't = Math.abs(x);', 't = new H(1);', 's = "f(1)";']:
+        assert_equal(inline.inline_calls(body, cls, classes, 'H.run'), body)
+
+    print("  --- arguments that may throw are evaluated once, in order ---")
+    for body in ['t = G.first(i, xs[5]);', 't = G.first(i, i / z);', 't = G.either(c, xs[5]);',
+                 't = G.ratio(i / z, xs[5]);', 't = G.sq(xs[i]);']:
+        assert_equal(inline.inline_calls(body, cls, classes, 'H.run', INTS), body)
+    assert_equal(inline.inline_calls('t = G.first(xs[5], i);', cls, classes, 'H.run', {'xs': 'int[]', 'i': 'int'}),
+                 't = ((xs[5]));')
+    assert_equal(inline.inline_calls('t = G.ratio(i, xs[5]);', cls, classes, 'H.run', {'xs': 'int[]', 'i': 'int'}),
+                 't = ((xs[5]) / i);')
+
+    global session
+    session = InterpreterSession()
+    session.load(SOURCE)
+    session.load("""class T { static int index(int[] xs, int x) { return G.first(x, xs[5]); }
+        static int divide(int x, int z) { return G.first(x, x / z); } }""")
+    assert_error("session.execute('T.index(new int[1], 1)')", exceptions.ArrayIndexOutOfBoundsException)
+    assert_error("session.call('T', 'divide', [1, 0])", ZeroDivisionError)
+
+    print("  --- diagnostics ---")
+    diagnostics.enabled = True
+    inline.inline_calls('t = G.sq(i) + G.fact(i);', cls, classes, 'H.run', INTS)
+    assert_equal(diagnostics.entries, [('inline', 'inlined G.sq into H.run'),
+                                       ('inline', 'not inlining G.fact into H.run: recursive')])
+    del diagnostics.entries[:]
+    diagnostics.enabled = False
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    decide_test()
+    inline_calls_test()
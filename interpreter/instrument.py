@@ -0,0 +1,36 @@
+'''
+instrument.py
+Counters recording which execution paths the interpreter took.  The REPL prints them on exit when it
+is started with --stats.
+'''
+from collections import Counter
+
+INTERPRETED_LOOP = 'interpreted loop'
+COUNTED_LOOP = 'counted loop'
+VECTORIZED_LOOP = 'vectorized loop'
+FOR_EACH_LOOP = 'for-each loop'
+BOUNDS_CHECK_ELIMINATED = 'bounds check eliminated'
+
+counts = Counter()
+enabled = False
+
+"""
+record() adds n to the counter for the given event.
+"""
+def record(event, n=1):
+    counts[event] += n
+
+"""
+reset() sets every counter back to zero.
+"""
+def reset():
+    counts.clear()
+
+"""
+report() returns the counters as a human-readable string, one event per line.
+"""
+def report():
+    lines = ["-------------Instrumentation------------"]
+    for event, count in sorted(counts.items()):
+        lines.append("{0:<32}{1:>8}".format(event, count))
+    return "\n".join(lines)
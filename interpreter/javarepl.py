@@ -4,14 +4,36 @@ import sys
 sys.path.append(sys.path[0] + '/../')
 
 import re
+import functools
 from constants import *
+from compiler.compile_eval import *
+from interface.exceptions import CompileException
+from interface.structures import ClassObj, ConstantPool
 from variable import *
 #from assign import *#assign_variable, declare_variable
 #from conditionals import *#handle_conditional_statements
 #from loops import *
-from compiler.compile_eval import *
 from exceptions import *
-from util import clean_up_list_elems, flatten_list
+from util import clean_up_list_elems, flatten_list, to_literal, narrow
+from arrays import Array, is_array_type, element_type
+from loop_analysis import match_counted_loop, is_invariant, assigned_variables, reads_variable, referenced_variables, \
+                          indexed_accesses
+import instrument
+import vectorize
+import licm
+import diagnostics
+import operators
+import natives
+import strings
+import containers
+import calls
+import blocks
+import throwables
+import control
+import memoize
+import inline
+import limits
+import greenthreads
 
 
 try:
@@ -25,6 +47,15 @@ stack = [{}]
 instance_variables = {}
 prompt_types = {False: "java> ", True: "...      "}
 continue_prompt = False
+unchecked_accesses = set()  # (array name, index text) pairs proven to be in bounds by the enclosing loops of the running method
+classes = {}    # The classes declared in the REPL, by name
+class_context = []  # The classes whose methods are being run, innermost last
+compiled_methods = {}   # Method -> the Python function running it
+constants = ConstantPool()  # The constants of the literals typed at the REPL; classes have their own
+CONSTANTS_LIMIT = 4096  # Most literals kept in constants; it is emptied (between lines) when full
+
+LAMBDA = r'\(\s*\)\s*->'
+METHOD_REFERENCE = r'([a-zA-Z_]\w*)\s*::\s*([a-zA-Z_]\w*)$'
 
 def print_vars():
     return
@@ -75,16 +106,368 @@ def handle_constructor(exp_str, instance_env, exp_stack):
     return thing['obj']
         
 
+"""
+handle_array_creation() evaluates an array creation expression such as "new int[n]" and returns a 
+new Array whose elements hold the default value of the element datatype.
+
+Arguments:
+exp_str -- the array creation expression
+instance_env -- the dictionary holding all the instance variables
+exp_stack -- the list of dictionaries representing the stack frames on the stack
+
+Returns:
+The new Array object
+
+Exceptions:
+InvalidDatatypeException -- raised if the element datatype is invalid or the size is not an int
+"""
+def handle_array_creation(exp_str, instance_env, exp_stack):
+    match = re.match(ARRAY_CREATION, exp_str.strip())
+    datatype = match.group(1)
+    if datatype not in TYPES:
+        raise InvalidDatatypeException("Invalid array datatype: " + datatype)
+    size = evaluate_expression(match.group(2), instance_env, exp_stack)
+    if type(size) is not int:
+        raise InvalidDatatypeException("Array size must be an int, not " + str(size))
+    return Array(datatype, size)
+
+"""
+handle_array_initializer() evaluates an array initializer such as "{1, 2, 3}" and returns a new Array 
+of the given element datatype holding the evaluated elements.
+
+Arguments:
+exp_str -- the array initializer, including the curly braces
+datatype -- the element datatype of the array
+instance_env -- the dictionary holding all the instance variables
+exp_stack -- the list of dictionaries representing the stack frames on the stack
+
+Returns:
+The new Array object
+"""
+def handle_array_initializer(exp_str, datatype, instance_env, exp_stack):
+    elements = clean_up_list_elems(exp_str.strip()[1:-1].split(","))
+    items = [evaluate_expression(element, instance_env, exp_stack) for element in elements]
+    for item in items:
+        verify_element_datatype(item, datatype)
+    return Array(datatype, len(items), items)
+
+"""
+lookup_array() returns the Array object stored in the variable called name.
+
+Exceptions:
+JavaNameError -- raised if the variable is not defined
+InvalidDatatypeException -- raised if the variable does not hold an array
+"""
+def lookup_array(name, instance_env, exp_stack):
+    array = variable_lookup(name, instance_env, exp_stack).get_value()
+    if not isinstance(array, Array):
+        raise InvalidDatatypeException(name + " is not an array")
+    return array
+
+"""
+substitute_array_accesses() replaces every array access ("a[i]") and array length ("a.length") in 
+the expression with the literal value it refers to, innermost accesses first, so that the rest of 
+the evaluator only ever sees plain values.
+
+Arguments:
+exp_str -- the expression to be rewritten
+instance_env -- the dictionary holding all the instance variables
+exp_stack -- the list of dictionaries representing the stack frames on the stack
+
+Returns:
+The rewritten expression
+
+Exceptions:
+ArrayIndexOutOfBoundsException -- raised if an index is outside of the array
+"""
+def substitute_array_accesses(exp_str, instance_env, exp_stack):
+    exp_str = re.sub(ARRAY_LENGTH, lambda match: str(lookup_array(match.group(1), instance_env, exp_stack).getLen()), exp_str)
+    match = re.search(ARRAY_ACCESS, exp_str)
+    while match:
+        array = lookup_array(match.group(1), instance_env, exp_stack)
+        index = evaluate_expression(match.group(2), instance_env, exp_stack)
+        if (match.group(1), match.group(2).strip()) in unchecked_accesses:
+            value = array.get_unchecked(index)
+        else:
+            value = array[index]
+        exp_str = exp_str[:match.start()] + to_literal(value) + exp_str[match.end():]
+        match = re.search(ARRAY_ACCESS, exp_str)
+    return exp_str
+
+"""
+evaluate_method_calls() carries out the method calls in the expression ("sb.append(x).length()", 
+"Math.max(a, b)", "s.charAt(i)"), left to right, and replaces each call chain, and each library 
+constant, with the literal value it evaluates to.  The expression is compiled by calls.compile_calls(), 
+which binds the library methods to the Python functions implementing them.
+
+Arguments:
+exp_str -- the expression to be rewritten
+instance_env -- the dictionary holding all the instance variables
+exp_stack -- the list of dictionaries representing the stack frames on the stack
+
+Returns:
+A tuple (rewritten expression, None), or (None, value) if the whole expression is a single call 
+chain.  In that case the value is returned as it is, so objects can be assigned to variables.
+"""
+def evaluate_method_calls(exp_str, instance_env, exp_stack):
+    sites = calls.compile_calls(exp_str)
+    pieces, position = [], 0
+    for site in sites:
+        value = evaluate_call_site(site, instance_env, exp_stack)
+        if site.whole:
+            return None, value
+        pieces.append(exp_str[position:site.start])
+        pieces.append(str(value) if isinstance(value, natives.NativeObject) else to_literal(value))
+        position = site.end
+    pieces.append(exp_str[position:])
+    return "".join(pieces), None
+
+"""
+invoke_static() calls a static method of a class declared in the REPL.  The method is compiled on its 
+first call (see compile_method()), and memoized if memoize.py decides it should be.
+
+Returns:
+The value the method returns, or None for a void method
+
+Exceptions:
+JavaNameError -- raised if the class has no static method with that name and number of arguments
+"""
+def invoke_static(cls, name, args):
+    method = cls.methods.get((name, len(args)))
+    if method is None or not method.static:
+        raise JavaNameError("cannot find symbol: static method {0}({1}) in {2}".format(name, len(args), cls.name))
+    function = compiled_methods.get(method)
+    if function is None:
+        function = compiled_methods[method] = memoize.wrap(cls, method, compile_method(cls, method), classes)
+    return function(*args)
+
+"""
+compile_method() parses the body of a method once, after inlining the small methods it calls (see
+inline.py), and returns a Python function that runs it.  Each call runs the body in a new stack frame 
+holding the arguments, converted to the types of the parameters, so the caller's local variables are out
+of reach, and pushes the method onto throwables.call_stack for stack traces.  The result is converted to
+the method's type.
+
+Exceptions:
+SyntaxError -- raised by the function if a break or continue in the body is outside of any loop
+"""
+def compile_method(cls, method):
+    frame_name = cls.name + "." + method.name
+    body = inline.inline_calls(blocks.respace(method.body), cls, classes, frame_name,
+                               {arg.name: arg.type for arg in method.args})
+    cls.constants.add_all(body)     # Literals of the methods inlined into it
+    commands = parse_block(body, instance_variables, stack)
+    def run(*args):
+        limits.tick()
+        frame = {}
+        for param, value in zip(method.args, args):
+            frame[param.name] = Variable(None, param.type, param.name)
+            if param.type in NUMERIC_TYPES:
+                value = convert(value, param.type)
+            frame[param.name].set_value('"' + value + '"' if type(value) is str else value)
+        stack.append(frame)
+        class_context.append(cls)
+        throwables.call_stack.append(frame_name)
+        outer_accesses = enter_frame()
+        try:
+            if method.synchronized:
+                signal = greenthreads.synchronized(cls, lambda: eval_commands(commands, False))
+            else:
+                signal = eval_commands(commands, False)
+        finally:
+            leave_frame(outer_accesses)
+            throwables.call_stack.pop()
+            class_context.pop()
+            stack.pop()
+        control.check_top_level(signal)
+        value = signal.value if signal is not None else None
+        return convert(value, method.type) if method.type in NUMERIC_TYPES else value
+    return run
+
+NUMERIC_TYPES = INT_TYPES + FLOAT_TYPES
+
+"""
+convert() converts an argument or a result to a numeric datatype, as a Java method call does: an int
+widens to a double (so that half(5) divides 5.0), and a char to its code (so that an int method returning
+s.charAt(0) returns 97, not 'a').
+"""
+def convert(value, datatype):
+    if type(value) is str and len(value) == 1:
+        value = ord(value)
+    return narrow(value, datatype)
+
+"""
+enter_frame() starts the array accesses proven in bounds afresh for a new frame: the accesses proven by
+the caller's loops name the caller's variables.  leave_frame() restores the caller's, as enter_frame()
+returned them (None if there were none).  The set is changed in place, as greenthreads.py swaps it.
+"""
+def enter_frame():
+    if not unchecked_accesses:
+        return None
+    outer_accesses = set(unchecked_accesses)
+    unchecked_accesses.clear()
+    return outer_accesses
+
+def leave_frame(outer_accesses):
+    unchecked_accesses.clear()
+    if outer_accesses:
+        unchecked_accesses.update(outer_accesses)
+
+class Lambda(natives.NativeObject):
+    """A lambda expression taking no arguments, "() -> { ... }" or "() -> expression", as a Runnable.  It 
+    sees the variables of the frame it was made in, as they are when it runs; variables it declares are 
+    its own.
+    """
+    methods = natives.NativeObject.methods + ['run']
+    interfaces = ('Runnable',)
+    
+    def __init__(self, body, env, s):
+        block, end = blocks.block_after(body, 0)
+        if body[end:].strip():
+            raise SyntaxError("unexpected text after lambda body: " + body[end:])
+        self.commands = parse_block(block, env, s)
+        self.frame = get_current_frame(s)
+        self.context = class_context[-1:]
+        self.frame_name = "lambda$" + throwables.call_stack[-1]
+        
+    def run(self):
+        stack.append(dict(self.frame))
+        class_context.extend(self.context)
+        throwables.call_stack.append(self.frame_name)
+        outer_accesses = enter_frame()
+        try:
+            control.check_top_level(eval_commands(self.commands, False))
+        finally:
+            leave_frame(outer_accesses)
+            throwables.call_stack.pop()
+            del class_context[len(class_context) - len(self.context):]
+            stack.pop()
+            
+    def get_datatype(self):
+        return 'Runnable'
+
+class MethodReference(natives.NativeObject):
+    """A reference to a static method taking no arguments, "Worker::work", as a Runnable."""
+    methods = natives.NativeObject.methods + ['run']
+    interfaces = ('Runnable',)
+    
+    def __init__(self, cls, name):
+        self.cls, self.name = cls, name
+        
+    def run(self):
+        invoke_static(self.cls, self.name, [])
+        
+    def get_datatype(self):
+        return 'Runnable'
+
+"""
+thread_state() returns the lists (and the set) holding the state of the running Java thread, which
+greenthreads.py swaps in and out when another thread has a turn.
+"""
+def thread_state():
+    return stack, class_context, throwables.call_stack, unchecked_accesses
+
+greenthreads.thread_state = thread_state
+
+"""
+evaluate_call_site() evaluates one call chain or library constant compiled by calls.compile_calls().
+
+Returns:
+The value of the call chain
+
+Exceptions:
+NullPointerException -- raised if a method is called on null
+JavaNameError -- raised if the receiver has no such method
+"""
+def evaluate_call_site(site, instance_env, exp_stack):
+    if site.kind == 'constant':
+        return site.value
+    if site.kind == 'variable' and site.receiver in classes and \
+            get_variable_frame(site.receiver, instance_env, exp_stack) is None:
+        receiver = classes[site.receiver]
+    elif site.kind == 'variable':
+        receiver = variable_lookup(site.receiver, instance_env, exp_stack).get_value()
+        if isinstance(receiver, (str, strings.Rope)):
+            receiver = str(receiver)[1:-1]  # Strings are stored with their quotes.
+    elif site.kind == 'local':
+        if not class_context:
+            raise JavaNameError("cannot find symbol: method " + site.chain[0].name)
+        receiver = class_context[-1]
+    elif site.kind == 'literal':
+        receiver = evaluate_expression(site.receiver, instance_env, exp_stack)
+    else:
+        receiver = None
+    for call in site.chain:
+        args = [evaluate_expression(arg, instance_env, exp_stack) for arg in call.arguments]
+        if site.kind == 'static' and call is site.chain[0]:
+            receiver = call.function(*args)
+        elif isinstance(receiver, ClassObj) and call is site.chain[0]:
+            receiver = invoke_static(receiver, call.name, args)
+        elif isinstance(receiver, natives.NativeObject):
+            receiver = receiver.call(call.name, args)
+        elif type(receiver) is str and call.function is not None:
+            receiver = call.function(receiver, *args)
+        elif receiver is None:
+            raise NullPointerException("Cannot invoke " + call.name + "() on null")
+        else:
+            raise JavaNameError("cannot find symbol: method {0} in {1}".format(call.name, type(receiver).__name__))
+    return receiver
+
 def evaluate_expression(exp_str, instance_environment, exp_stack):
     #print('here!, string is: ', exp_str)
     # replace all variables with their values
     print_vars()
     "######################################"
     
+    #handle a literal, whose value is in the constant pool of the class being run (or of the REPL)
+    pool = class_context[-1].constants if class_context else constants
+    index = pool.index_of(exp_str.strip())
+    if index is not None:
+        return pool[index]
+    
+    #handle a lambda or a method reference, which is made into a Runnable
+    if '->' in exp_str or '::' in exp_str:
+        match = re.match(LAMBDA, exp_str.strip())
+        if match:
+            return Lambda(exp_str.strip()[match.end():], instance_environment, exp_stack)
+        match = re.match(METHOD_REFERENCE, exp_str.strip())
+        if match and match.group(1) in classes:
+            return MethodReference(classes[match.group(1)], match.group(2))
+    
+    #handle array creation
+    if re.match(ARRAY_CREATION, exp_str.strip()):
+        return handle_array_creation(exp_str, instance_environment, exp_stack)
+    
+    #handle natively implemented classes
+    match = re.match(natives.CREATION_PATTERN, exp_str.strip())
+    if match and match.group(1) in natives.CLASSES:
+        args = [evaluate_expression(arg, instance_environment, exp_stack) for arg in natives.split_arguments(match.group(2))]
+        obj = natives.CLASSES[match.group(1)](*args)
+        limits.allocate(obj, limits.OBJECT_HEADER + limits.REFERENCE * len(args))
+        return obj
+    
     #handle constructor
     if re.search('new\s*[A-Z][A-Za-z]*\(', exp_str):
         return handle_constructor(exp_str, instance_environment, exp_stack)
     
+    #handle a lone variable, whose value is returned as it is instead of going through a literal; objects 
+    #are passed around this way
+    if re.match(r'[a-zA-Z_]\w*$', exp_str.strip()):
+        frame = get_variable_frame(exp_str.strip(), instance_environment, exp_stack)
+        if frame is not None:
+            value = frame[exp_str.strip()].get_value()
+            return str(value)[1:-1] if isinstance(value, (str, strings.Rope)) else value   # Strings are stored with their quotes.
+    
+    #handle method calls and library constants
+    if '.' in exp_str or ('(' in exp_str and classes):
+        exp_str, result = evaluate_method_calls(exp_str, instance_environment, exp_stack)
+        if exp_str is None:
+            return result
+    
+    #handle array accesses
+    if '[' in exp_str or '.length' in exp_str:
+        exp_str = substitute_array_accesses(exp_str, instance_environment, exp_stack)
+    
     if (re.search('[a-z]', exp_str)): # match potential variable names
         tokens = tokenize_one_expression(exp_str)
         for i, item in enumerate(tokens):
@@ -96,7 +479,10 @@ def evaluate_expression(exp_str, instance_environment, exp_stack):
         exp_str = " ".join(tokens)
     
     for java_exp, python_exp in JAVA_TO_PYTHON.items():
-        exp_str = exp_str.replace(java_exp, ' ' + python_exp + ' ')
+        # String literals are matched too, so that their contents are left alone.
+        keyword = r'(?<![\w$])' + java_exp + r'(?![\w$])' if java_exp.isalpha() else re.escape(java_exp)
+        exp_str = re.sub(natives.STRING_LITERAL + '|' + keyword,
+                         lambda match: match.group(0) if match.group(0)[0] in '"\'' else ' ' + python_exp + ' ', exp_str)
     
     floatdouble_casting = "\s*\(\s*(float|double)\s*\)\s"
     if re.search(floatdouble_casting, exp_str): # match casting
@@ -106,18 +492,27 @@ def evaluate_expression(exp_str, instance_environment, exp_stack):
     if '//' in exp_str:
         raise SyntaxError("// is invalid")
     if "/"  in exp_str and (re.search('\d+\.\d+', exp_str) is None):
-        exp_str = exp_str.replace('/', '//')  
+        exp_str = re.sub(natives.STRING_LITERAL + '|/', lambda match: match.group(0) if match.group(0)[0] in '"\'' else '//', exp_str)
     
     if exp_str.strip() == '':
         return None
     return eval(exp_str)
     
+"""
+tokenize_one_expression() splits an expression into its tokens.  Each text is only tokenized once; the 
+tokens are cached, since statements in loops and method bodies are evaluated many times.
+
+Returns:
+A new list of the tokens, which the caller may change
+"""
 def tokenize_one_expression(str):
-    match_string = '".*"'
-    replaced = ''
-    while re.search(match_string, str):
-        replaced = re.search(match_string, str)
-        str = re.sub(match_string, THING_TO_REPLACE, str)
+    return list(tokenized_expression(str))
+
+@functools.lru_cache(maxsize=4096)
+def tokenized_expression(str):
+    match_string = natives.STRING_LITERAL
+    replaced = re.findall(match_string, str)
+    str = re.sub(match_string, THING_TO_REPLACE, str)
     spaced = str
     for key, val in DELIMITERS.items():
         spaced = spaced.replace(key, ' ' + key + ' ').replace(val, ' ' + val + ' ')
@@ -127,13 +522,14 @@ def tokenize_one_expression(str):
     tokenized = spaced.strip().split()
     for i, item in enumerate(tokenized):
         if item  ==  THING_TO_REPLACE:
-            tokenized[i] = replaced.string
-    return tokenized
+            tokenized[i] = replaced.pop(0)
+    return tuple(tokenized)
 
 class Expression:
-    def __init__(self, str=None, env=None, s=None):
+    def __init__(self, str=None, env=None, s=None, label=None):
         self.str = str.strip()
         self.value = 'n/a'
+        self.label = label  # The label of a labeled loop
         self.env = env if env is not None else instance_variables
         self.stack = s if s is not None else stack
         
@@ -143,27 +539,35 @@ class Expression:
         tokens = tokenize_one_expression(self.str)
         control_statement = None
         for token in tokens:
+            if token == '{':
+                break   # The keywords of a lambda's body are the lambda's
             if token in CONTINUE_KEYWORDS:
                 control_statement = token                
                 break
         if control_statement:
             if control_statement == 'for':
-                self.value = handle_for(self.str, self.env, self.stack)
+                self.value = handle_for(self.str, self.env, self.stack, self.label)
             elif control_statement == 'while':
-                self. value = handle_while(self.str, self.env, self.stack)
+                self.value = handle_while(self.str, self.env, self.stack, self.label)
             elif control_statement == 'if':
                 result = handle_conditional_statements(self.str, self.env, self.stack)
                 if result:
-                    self.value = parse_eval(result)
+                    self.value = eval_commands(parse_block(result, self.env, self.stack), not continue_prompt)
                 else:
                     self.value = result
             else:
                 raise WhatTheHeckHappenedException("control statement: ", control_statement)
         elif 'System.out.println' in self.str:
             self.value = handle_println(self.str)
-        elif re.match('[a-zA-Z][\w\s]*[^=<>!]=[^=]', self.str):
+        elif re.match(METHOD_CALL, self.str):
+            self.value = evaluate_expression(self.str, self.env, self.stack)
+            if isinstance(self.value, natives.NativeObject):
+                self.value = None   # e.g. sb.append(x), which returns sb
+        elif re.match(ARRAY_ASSIGNMENT, self.str):
+            self.value = assign_array_element(self.str, self.env, self.stack)
+        elif re.match(r'[a-zA-Z][\w\s\[\]]*[^=<>!]=[^=]', self.str):
             self.value = assign_variable(self.str, self.env, self.stack)
-        elif len(tokens) == 2 and tokens[0] in TYPES:
+        elif len(tokens) == 2 and (tokens[0] in TYPES or natives.is_native_type(tokens[0])):
             self.value = declare_variable(self.str, self.env, self.stack)
         else:
             self.value = evaluate_expression(self.str, self.env, self.stack)            
@@ -178,6 +582,289 @@ class Expression:
         self.eval()
         return 'Exp({0})'.format(self.value)
         
+
+class SlotUpdate:
+    """A statement that reads a variable or array element, combines it with another value and writes the 
+    result back: the common part of compound assignments and increments.  The statement is matched once, 
+    when the node is built, and the slot is read and written directly instead of going through 
+    assign_variable().
+    """
+    def __init__(self, target, index, env=None, s=None):
+        self.target = target
+        self.index = index.strip() if index is not None else None
+        self.value = 'n/a'
+        self.env = env if env is not None else instance_variables
+        self.stack = s if s is not None else stack
+        
+    def update(self, operator, operand=None):
+        if self.index is not None:
+            return self.update_element(operator, operand)
+        frame = get_variable_frame(self.target, self.env, self.stack)
+        if frame is None:
+            raise InvalidAssignmentException("Variable not declared: " + self.target)
+        variable = frame[self.target]
+        datatype, current = variable.get_datatype(), variable.get_value()
+        if is_array_type(datatype) or natives.is_native_type(datatype) or (current is None and datatype != STRING):
+            raise InvalidAssignmentException("Cannot update " + datatype + " " + self.target)
+        if datatype == STRING and operator == '+' and operand:
+            variable.set_value(strings.concatenate(current, [operand()]))   # Accumulated in a rope.
+            return
+        if type(current) is str:
+            current = current[1:-1]     # Strings and chars are stored with their quotes.
+        result = operators.apply(operator, current, operand() if operand else 1, datatype)
+        variable.set_value('"' + result + '"' if type(result) is str else result)
+        
+    def update_element(self, operator, operand):
+        array = lookup_array(self.target, self.env, self.stack)
+        index = evaluate_expression(self.index, self.env, self.stack)
+        unchecked = (self.target, self.index) in unchecked_accesses
+        # The index is checked before the right-hand side is evaluated, as in Java.
+        current = array.get_unchecked(index) if unchecked else array[index]
+        array.set_unchecked(index, operators.apply(operator, current, operand() if operand else 1, array.type))
+        
+class CompoundAssignment(SlotUpdate):
+    """x op= value, for every Java compound assignment operator, on a variable or an array element."""
+    def __init__(self, str=None, env=None, s=None):
+        self.str = str.strip()
+        match = re.match(COMPOUND_ASSIGNMENT, self.str)
+        if not match:
+            raise InvalidAssignmentException("Statement provided was: " + self.str)
+        SlotUpdate.__init__(self, match.group(1), match.group(2), env, s)
+        self.operator, self.operand = match.group(3), match.group(4).strip()
+        
+    def eval(self):
+        self.value = self.update(self.operator, lambda: evaluate_expression(self.operand, self.env, self.stack))
+        return self.value
+        
+    def __repr__(self):
+        return 'CompoundAssignment({0})'.format(self.str)
+        
+class Concatenation(SlotUpdate):
+    """s = s + a + b ..., where s is a String: the terms are appended to s in place (see strings.py) 
+    instead of building a new string.  Assignments of this shape to variables of any other datatype are 
+    evaluated as ordinary assignments.
+    """
+    def __init__(self, str=None, env=None, s=None):
+        self.str = str.strip()
+        match = re.match(SELF_CONCATENATION, self.str)
+        if not match:
+            raise InvalidAssignmentException("Statement provided was: " + self.str)
+        SlotUpdate.__init__(self, match.group(1), None, env, s)
+        self.terms = strings.concatenation_terms(match.group(2))
+        
+    def eval(self):
+        frame = get_variable_frame(self.target, self.env, self.stack)
+        if frame is None or frame[self.target].get_datatype() != STRING or self.terms is None:
+            self.value = assign_variable(self.str, self.env, self.stack)
+            return self.value
+        values = [evaluate_expression(term, self.env, self.stack) for term in self.terms]
+        frame[self.target].set_value(strings.concatenate(frame[self.target].get_value(), values))
+        self.value = None
+        return self.value
+        
+    def __repr__(self):
+        return 'Concatenation({0})'.format(self.str)
+        
+class Increment(SlotUpdate):
+    """++x, x++, --x and x-- used as statements, on a variable or an array element."""
+    def __init__(self, str=None, env=None, s=None):
+        self.str = str.strip()
+        match = re.match(INCREMENT, self.str)
+        if not match:
+            raise InvalidAssignmentException("Statement provided was: " + self.str)
+        if match.group(1):
+            SlotUpdate.__init__(self, match.group(2), match.group(3), env, s)
+            self.operator, self.prefix = match.group(1)[0], True
+        else:
+            SlotUpdate.__init__(self, match.group(4), match.group(5), env, s)
+            self.operator, self.prefix = match.group(6)[0], False
+        
+    def eval(self):
+        self.value = self.update(self.operator)
+        return self.value
+        
+    def __repr__(self):
+        return 'Increment({0})'.format(self.str)
+        
+class JumpStatement:
+    """break, continue and return.  Evaluating one returns a control.Jump, which eval_commands() hands back 
+    to the enclosing loop; the Jumps of break and continue are built once, with the node.
+    """
+    def __init__(self, str=None, env=None, s=None):
+        self.str = str.strip()
+        self.env = env if env is not None else instance_variables
+        self.stack = s if s is not None else stack
+        match = re.match(JUMP, self.str)
+        kind = match.group(1) or control.RETURN
+        self.expression = match.group(3) if match.group(3) and match.group(3).strip() else None
+        self.value = control.Jump(kind, match.group(2))
+        
+    def eval(self):
+        if self.value.kind == control.RETURN:
+            value = evaluate_expression(self.expression, self.env, self.stack) if self.expression else None
+            return control.Jump(control.RETURN, None, value)
+        return self.value
+        
+    def __repr__(self):
+        return 'JumpStatement({0})'.format(self.str)
+        
+class TryStatement:
+    """try { ... } catch (E e) { ... } finally { ... }.  The blocks are parsed when the node is built, and 
+    the catch clauses are compiled into an exception table: a list of (classes, variable, handler) entries, 
+    searched in order when the block raises.  Nothing is set up per statement of the block, so a block that 
+    raises nothing runs exactly as it would outside of the try.
+    """
+    def __init__(self, str=None, env=None, s=None):
+        self.str = str.strip()
+        self.value = 'n/a'
+        self.env = env if env is not None else instance_variables
+        self.stack = s if s is not None else stack
+        block, catches, final = blocks.try_clauses(self.str)
+        self.block = parse_block(block, self.env, self.stack)
+        self.table = [(tuple(throwables.resolve(name) for name in names), names, var, parse_block(handler, self.env, self.stack))
+                      for names, var, handler in catches]
+        self.final = parse_block(final, self.env, self.stack) if final is not None else None
+        
+    def eval(self):
+        if self.final is None:
+            self.value = self.run()
+            return self.value
+        try:
+            self.value = self.run()
+        except Exception:
+            # A break, continue or return in the finally block discards the exception, as in Java.
+            self.value = eval_commands(self.final, not continue_prompt)
+            if self.value is None:
+                raise
+            return self.value
+        signal = eval_commands(self.final, not continue_prompt)
+        if signal is not None:
+            self.value = signal
+        return self.value
+        
+    def run(self):
+        try:
+            return eval_commands(self.block, not continue_prompt)
+        except Exception as error:
+            throwable = throwables.as_throwable(error)
+            handler = self.find_handler(throwable)
+            if handler is None:
+                raise
+            return self.handle(throwable, *handler)
+        
+    def find_handler(self, throwable):
+        if throwable is None:
+            return None     # Not a Java exception; no catch clause applies.
+        for classes, names, var, handler in self.table:
+            if isinstance(throwable, classes):
+                return names[0] if len(names) == 1 else throwables.Throwable.__name__, var, handler
+        return None
+        
+    def handle(self, throwable, datatype, var, handler):
+        declare_variable(datatype + " " + var, self.env, self.stack)
+        frame = get_variable_frame(var, self.env, self.stack)
+        frame[var].value = throwable
+        try:
+            return eval_commands(handler, not continue_prompt)
+        finally:
+            frame.pop(var)
+        
+    def __repr__(self):
+        return 'TryStatement({0})'.format(self.str)
+        
+class Throw:
+    """throw expression.  The Throwable is raised inside a ThrownException."""
+    def __init__(self, str=None, env=None, s=None):
+        self.str = str.strip()
+        self.value = 'n/a'
+        self.env = env if env is not None else instance_variables
+        self.stack = s if s is not None else stack
+        self.expression = re.match(THROW, self.str).group(1)
+        
+    def eval(self):
+        throwable = evaluate_expression(self.expression, self.env, self.stack)
+        if throwable is None:
+            raise NullPointerException("Cannot throw null: " + self.expression)
+        if not isinstance(throwable, throwables.Throwable):
+            raise InvalidDatatypeException("incompatible types: " + self.expression + " cannot be converted to Throwable")
+        raise ThrownException(throwable)
+        
+    def __repr__(self):
+        return 'Throw({0})'.format(self.str)
+        
+class SynchronizedStatement:
+    """synchronized (lock) { ... }.  The block runs holding the lock's monitor (see greenthreads.py), which 
+    is released however the block ends.
+    """
+    def __init__(self, str=None, env=None, s=None):
+        self.str = str.strip()
+        self.value = 'n/a'
+        self.env = env if env is not None else instance_variables
+        self.stack = s if s is not None else stack
+        self.lock, block, end = blocks.header_and_block(self.str, 'synchronized')
+        if self.str[end:].strip():
+            raise SyntaxError("unexpected text after synchronized block: " + self.str[end:])
+        self.block = parse_block(block, self.env, self.stack)
+        
+    def eval(self):
+        lock = evaluate_expression(self.lock, self.env, self.stack)
+        self.value = greenthreads.synchronized(lock, lambda: eval_commands(self.block, not continue_prompt))
+        return self.value
+        
+    def __repr__(self):
+        return 'SynchronizedStatement({0})'.format(self.str)
+        
+"""
+declare_classes() compiles Java source holding one or more classes, and declares them.
+
+Returns:
+The names of the classes declared
+
+Exceptions:
+SyntaxError -- raised if the source does not compile
+"""
+def declare_classes(source):
+    try:
+        compiled = load_str(source)
+    except (CompileException, AssertionError) as error:
+        raise SyntaxError(str(error))
+    return declare_compiled(compiled)
+
+"""
+declare_compiled() declares classes already compiled (by load_str, or read with interface.serialize).
+
+Arguments:
+compiled -- a dictionary of ClassObj by name
+
+Returns:
+The names of the classes declared
+"""
+def declare_compiled(compiled):
+    for name, cls in compiled.items():
+        base = natives.CLASSES.get(cls.superclass())
+        if base is not None and issubclass(base, throwables.Throwable):
+            throwables.define(name, base)
+        else:
+            classes[name] = cls
+    return list(compiled)
+
+class ClassDeclaration:
+    """class Name [extends Base] { ... }, compiled with the compiler package.  Classes extending a Throwable 
+    become native exception classes, which can be created, thrown and caught; their constructors take the 
+    message and cause as Throwable's do.  Other classes are kept in classes for the interpreter to use.
+    """
+    def __init__(self, str=None, env=None, s=None):
+        self.str = str.strip()
+        self.value = 'n/a'
+        
+    def eval(self):
+        declare_classes(self.str)
+        self.value = None
+        return self.value
+        
+    def __repr__(self):
+        return 'ClassDeclaration({0})'.format(self.str)
+        
     
 def parse(str, env=None, s=None):
     tokens = tokenize(str) # is a list of lists
@@ -188,14 +875,13 @@ def tokenize(cur_read):
     s = cur_read.strip() 
     
     expressions = unevaled + ' ' + s
-    for item in CONTINUE_KEYWORDS:
-        if item in expressions:
-            continue_prompt = True
+    if re.search(r'\b(?:' + '|'.join(CONTINUE_KEYWORDS) + r')\b|->', natives.blank_literals(expressions)):
+        continue_prompt = True
     
     if continue_prompt and cur_read == '':
         continue_prompt = False
         unevaled = ''
-        exp_lst = [expressions]
+        exp_lst = blocks.split_statements(expressions)
     elif continue_prompt:
         unevaled = expressions
         exp_lst = []
@@ -222,16 +908,58 @@ def remove_empty(ls):
 def analyze(lst, env=None, s=None):
     expressions = []
     for item in lst:
-        expressions.append(Expression(item, env,s))
+        item = natives.erase_generics(item)
+        label = re.match(LABEL, item)
+        if label:
+            expressions.append(Expression(item[label.end():], env, s, label.group(1)))
+        elif re.match(JUMP, item.strip()):
+            expressions.append(JumpStatement(item, env, s))
+        elif re.match(r'\s*try\b', item):
+            expressions.append(TryStatement(item, env, s))
+        elif re.match(r'\s*synchronized\b', item):
+            expressions.append(SynchronizedStatement(item, env, s))
+        elif re.match(THROW, item.strip()):
+            expressions.append(Throw(item, env, s))
+        elif re.match(CLASS_DECLARATION, item):
+            expressions.append(ClassDeclaration(item, env, s))
+        elif re.match(INCREMENT, item.strip()):
+            expressions.append(Increment(item, env, s))
+        elif re.match(COMPOUND_ASSIGNMENT, item.strip()):
+            expressions.append(CompoundAssignment(item, env, s))
+        elif re.match(SELF_CONCATENATION, item.strip()):
+            expressions.append(Concatenation(item, env, s))
+        else:
+            expressions.append(Expression(item, env,s))
     return expressions
     
+"""
+parse_block() parses the statements of a block, which may hold nested blocks, into commands.  Unlike 
+parse(), it does not go through the REPL's line buffer.
+"""
+def parse_block(text, env=None, s=None):
+    return analyze(blocks.split_statements(text), env, s)
     
+"""
+eval_commands() runs a block's commands in order, printing the values of expression statements if 
+should_print is True.
+
+Returns:
+The control.Jump that ended the block early, or None if every command ran
+"""
 def eval_commands(commands, should_print=True):
     for exp in commands:
-        value = exp.eval()
-        if value != None and should_print:
-            print(java_form(value))
-    return
+        limits.tick()
+        try:
+            value = exp.eval()
+        except Exception as error:
+            throwables.record_statement(error, exp.str)
+            raise
+        if value != None:
+            if type(value) is control.Jump:
+                return value
+            if should_print:
+                print(java_form(value), file=natives.out)
+    return None
     
 def java_form(item):
     if str(item) in PYTHON_TO_JAVA:
@@ -243,21 +971,35 @@ def handle_println(exp_str):
     if thing_to_eval[-1] != ')':
         raise InvalidSystemCallException("println statement malformed")
     thing_to_eval = thing_to_eval[:-1]
-    print(Expression(thing_to_eval).eval())
+    print(operators.java_string(Expression(thing_to_eval).eval()), file=natives.out)
 
 def parse_eval(strg, env = None, s=None):
-    return eval_commands(parse(strg, env,s),not continue_prompt)
+    limits.start()
+    if len(constants) >= CONSTANTS_LIMIT:
+        constants.clear()
+    constants.add_all(strg)
+    with greenthreads.program():
+        return eval_commands(parse(strg, env,s),not continue_prompt)
     
 def read_eval_print_loop():
     """Run a read-eval-print loop for JavaInterpreter."""
     while True:
         try:
-            parse_eval(input(prompt_types[continue_prompt]))
-        except (JavaException, SyntaxError, TypeError, ZeroDivisionError) as err:
-            print(type(err).__name__ + ':', err)
+            control.check_top_level(parse_eval(input(prompt_types[continue_prompt])))
+        except (JavaException, SyntaxError, TypeError, ZeroDivisionError, RecursionError) as err:
+            throwable = throwables.as_throwable(err)
+            if throwable is not None:
+                print(throwables.stack_trace(throwable))    # An uncaught Java exception
+            else:
+                print(type(err).__name__ + ':', err)
         except (KeyboardInterrupt, EOFError):  # <Control>-D, etc.
             print('<(^ ^)>')
+            if instrument.enabled:
+                print(instrument.report())
+                print(memoize.report())
             return
+        if diagnostics.enabled:
+            diagnostics.dump()
 
 """
 handle_conditional_statements() takes a conditional block, divides the branches into cases, 
@@ -278,95 +1020,15 @@ Exceptions Raised:
 InvalidIfElseBlockException -- raised if the syntax is invalid for an if-else block.
 """
 def handle_conditional_statements(if_else_block, instance_vars, stack):
-    #import javarepl# import evaluate_expression
-    has_else_clause = verify_if_else_syntax(if_else_block)
-    
-    # Tokenize if-else block: split conditions from statements
-    tokens = clean_up_list_elems(flatten_list(re.split("\s*\}\s*else if\s*\(", if_else_block))) # Split by } else if (
-    tokens = clean_up_list_elems(flatten_list(list(map(lambda elem: re.split("\s*if\s*\(", elem), tokens))))    # Split by if (
-    tokens = clean_up_list_elems(flatten_list(list(map(lambda elem: re.split("\s*\}\s*else\s*\{", elem), tokens)))) # Split by } else {, insert True as condition
-    if has_else_clause:
-        tokens.insert(-1, "True")
-    tokens = clean_up_list_elems(flatten_list(list(map(lambda elem: re.split("\s*\)\s*\{", elem), tokens))))    # Split  by ) {
-    tokens = clean_up_list_elems(flatten_list(list(map(lambda elem: re.split("\}", elem), tokens))))    # Split by }
-    
-    # Split tokens into list of conditions and statements
-    conditions_list, statements_list = [], []
-    for index in range(0, len(tokens)):
-        if index % 2 == 0:  # Even, is a condition.
-            conditions_list.append(tokens[index])
-        else:
-            statements_list.append(tokens[index])
-    
-    assert len(conditions_list) == len(statements_list), "conditions_list and statements_list are of different lengths"
-    
-    # Check the conditions; if True, return the associated statements
-    for index in range(0, len(conditions_list)):
-        curr_condition = evaluate_expression(conditions_list[index], instance_vars, stack)
+    for condition, statements in blocks.if_chain(if_else_block):
+        if condition is None:
+            return statements   # The else clause
+        curr_condition = evaluate_expression(condition, instance_vars, stack)
         if type(curr_condition) is not bool:
             raise InvalidIfElseBlockException("Condition parsed was not a boolean expression.  Condition was: " + str(curr_condition))
         if curr_condition:
-            return statements_list[index]
-        
+            return statements
     return None
-"""
-# For testing purposes only.
-def evaluate_expression(condition):
-    print("Evaluating " + str(condition))
-    x, y, z = 0, 0, 0
-    return eval(condition)
-"""
-"""
-verify_if_else_syntax() takes an if-else block and scans it to ensure that it is a 
-valid if-else block.  Only verifies general format; does NOT check to ensure that 
-a boolean expression is included in conditional.  This HAS a return value -- it 
-also scans to see if an else statement exists!
-
-Arguments:
-block -- the block that is being verified
-
-Returns:
-True if else clause exists, False otherwise
-
-Exceptions Raised:
-InvalidIfElseBlockException -- thrown if the block has determined to be invalid syntax
-"""
-def verify_if_else_syntax(block):
-    has_else = True
-    block = block.strip()
-    block = re.sub("\)[\s\n]*\{", ") { ", block)
-    block = re.sub("[\s\n]*\{", " { ", block)
-    block = re.sub("[\s\n]*\([\s\n]*", " ( ", block)
-    block = re.sub("[\s\n]*\)[\s\n]*", " ) ", block)
-    
-    assert len(block) > 0, "len(block) is NOT > 0, it is " + str(len(block))
-    last_position = block.find("if (")
-    if last_position != 0:
-        raise InvalidIfElseBlockException("0th word is NOT if, it is: " + block[0])
-    
-    if block.find("else if {") != -1:
-        raise InvalidIfElseBlockException("else if has no condition")
-    
-    curr_position = 0
-    while curr_position != -1:
-        last_position, curr_position = curr_position, block.find(") {", curr_position)
-        if last_position >= curr_position or curr_position == -1:
-            raise InvalidIfElseBlockException("if or else if NOT followed by ') {'")
-        
-        last_position, curr_position = curr_position, block.find("} else if (", curr_position)
-    
-    # At this point, curr_position is -1 from searching for '} else if ('
-    curr_position = block.find("} else {", last_position)
-    if curr_position == -1:
-        curr_position = block.find("}", last_position)
-        if curr_position == -1:
-            raise InvalidIfElseBlockException("else-if clause is not terminated with '}'")
-        has_else = False
-    else:
-        last_position, curr_position = curr_position, block.find("}", curr_position+1)
-        if last_position >= curr_position:
-            raise InvalidIfElseBlockException("else clause not terminated with '}'")
-    return has_else
 
 """
 handle_switch_statements() takes a switch statement, divides the cases, evaluates the 
@@ -402,6 +1064,12 @@ Returns:
 tokens -- list of tokens for assignment 
 """
 def tokenize_assignment_statement(statement):
+    arrow = natives.blank_literals(statement).find('->')
+    if arrow >= 0:
+        # The value is or holds a lambda, whose body is left as it is: only the first "=" is split at.
+        match = re.search(r'(?<![=<>!+\-*/%&|^])=(?!=)', statement[:arrow])
+        if match:
+            return [statement[:match.start()], statement[match.end():]]
     statement = re.sub("\s*! =\s*", " != ", re.sub("\s*> =\s*", " >= ", re.sub("\s*< =\s*", " <= ", re.sub("\s*=  =\s*", " == " , re.sub("[\s]*=[\s]*", " = ", statement)))))
     tokens = re.split("[^=<>!]=[^=]", statement)
     return tokens
@@ -439,6 +1107,37 @@ def assign_variable(statement, instance_vars, stack):
         declare_variable(declaration, instance_vars, stack)   # Adds the variable to dictionary.
     update_variable(assignment, instance_vars, stack, datatype != None)   # If datatype != None, then it was just declared.
     
+"""
+assign_array_element() takes an assignment to an array element ("a[i] = value") and evaluates it.  The 
+array and index are evaluated before the value, and the index is only checked once the value is known, 
+as in Java.
+
+Arguments:
+statement -- the statement to be evaluated, passed as a string (untokenized)
+instance_vars -- the dictionary holding all the instance variables
+stack -- the dictionary containing the entire stack
+
+Returns:
+None
+
+Exceptions:
+InvalidAssignmentException -- raised if the statement is not a well-formed array element assignment
+InvalidDatatypeException -- raised if the value does not match the array's element datatype
+ArrayIndexOutOfBoundsException -- raised if the index is outside of the array
+"""
+def assign_array_element(statement, instance_vars, stack):
+    match = re.match(ARRAY_ASSIGNMENT, statement.strip())
+    if not match:
+        raise InvalidAssignmentException("Statement provided was: " + str(statement))
+    array = lookup_array(match.group(1), instance_vars, stack)
+    index = evaluate_expression(match.group(2), instance_vars, stack)
+    result = evaluate_expression(match.group(3), instance_vars, stack)
+    verify_element_datatype(result, array.type)
+    if (match.group(1), match.group(2).strip()) in unchecked_accesses:
+        array.set_unchecked(index, result)
+    else:
+        array.change_item(index, result)
+
 """
 split_declaration() takes a declaration statement and splits it into the datatype and variable name 
 components.  If the declaration is an assignment statement, datatype will be None.  If invalid, this 
@@ -486,7 +1185,7 @@ def declare_variable(statement, instance_vars, stack, is_global=False):
     datatype, variable_name = split_declaration(statement)
     local_variables = get_current_frame(stack)
     
-    if datatype not in TYPES:
+    if datatype not in TYPES and not is_array_type(datatype) and not natives.is_native_type(datatype):
         raise InvalidDeclarationException("Datatype is invalid: " + str(datatype))
     
     if get_variable_frame(variable_name, instance_vars, stack) != None:
@@ -527,10 +1226,13 @@ def update_variable(statement, instance_vars, stack, just_declared=False):
         raise InvalidAssignmentException("")
     
     # Compute the result to update the value of expression with.
-    result = evaluate_expression(variable_value, instance_vars, stack)
-    result_type = type(result)
     stored_variable_type = variable_frame[variable_name].get_datatype()
     stored_variable_value = variable_frame[variable_name].get_value()
+    if is_array_type(stored_variable_type) and variable_value.startswith("{"):
+        result = handle_array_initializer(variable_value, element_type(stored_variable_type), instance_vars, stack)
+    else:
+        result = evaluate_expression(variable_value, instance_vars, stack)
+    result_type = type(result)
     
     # Check to ensure result datatype matches variable datatype
     verify_result_datatype(result, variable_name, just_declared, stored_variable_type, instance_vars, stack)
@@ -556,7 +1258,17 @@ stored_variable_type -- the datatype of the stored variable
 def verify_result_datatype(result, variable_name, just_declared, stored_variable_type, instance_vars, stack):
     result_type = type(result)
     variable_frame = get_variable_frame(variable_name, instance_vars, stack)
-    if result_type is bool and stored_variable_type != BOOLEAN:
+    if natives.is_native_type(stored_variable_type) or isinstance(result, natives.NativeObject):
+        if result is not None and not natives.is_instance(result, stored_variable_type):
+            if just_declared:
+                variable_frame.pop(variable_name)
+            raise InvalidDatatypeException("Invalid datatype: result_type is " + str(result_type) + ", variable type is " + stored_variable_type)
+    elif is_array_type(stored_variable_type) or result_type is Array:
+        if result is not None and (result_type is not Array or result.get_datatype() != stored_variable_type):
+            if just_declared:
+                variable_frame.pop(variable_name)
+            raise InvalidDatatypeException("Invalid datatype: result_type is " + str(result_type) + ", variable type is " + stored_variable_type)
+    elif result_type is bool and stored_variable_type != BOOLEAN:
         if just_declared: # and stored_variable_type == None:
             variable_frame.pop(variable_name)
         raise InvalidDatatypeException("Invalid datatype: result_type is " + str(result_type) + ", variable type is " + stored_variable_type)
@@ -578,6 +1290,26 @@ def verify_result_datatype(result, variable_name, just_declared, stored_variable
                 variable_frame.pop(variable_name)
             raise InvalidDatatypeException("Invalid datatype: result_type is " + str(result_type) + ", variable type is " + stored_variable_type)
 
+"""
+verify_element_datatype() checks that a value can be stored in an array with the given element datatype.  Ints 
+may be stored in arrays of floating point types, as in Java.
+
+Arguments:
+result -- the value that will be stored
+datatype -- the element datatype of the array
+
+Exceptions:
+InvalidDatatypeException -- raised if the value does not match the element datatype
+"""
+def verify_element_datatype(result, datatype):
+    result_type = type(result)
+    if (result_type is bool and datatype != BOOLEAN) or \
+            (result_type is int and datatype not in INT_TYPES + FLOAT_TYPES) or \
+            (result_type is float and datatype not in FLOAT_TYPES) or \
+            (result_type is str and (datatype not in STRING_TYPES or (datatype == CHAR and len(result) != 1))) or \
+            (result is None and datatype != STRING):
+        raise InvalidDatatypeException("Invalid datatype: result_type is " + str(result_type) + ", array type is " + datatype)
+
 """
 get_current_frame() returns the current frame in the stack.
 
@@ -619,28 +1351,34 @@ Arguments:
 block -- the while loop  block that is being parsed
 instance_vars -- the dictionary which represents the instance variables
 stack -- the list of dictionaries which represents our stack
+label -- the label of the loop, or None
 
 Returns:
-None.  Calls parse_eval() instead of returning.
+None, or the control.Jump the loop passes on to the enclosing block (a return, or a break or continue 
+aimed at an outer loop).
 
 Exceptions raised:
 InvalidWhileLoopException -- raised if the syntax does not follow the form of a valid while loop
 """
-def handle_while(block, instance_vars, stack):
+def handle_while(block, instance_vars, stack, label=None):
     validate_while_loop_syntax(block)
     
-    tokens = clean_up_list_elems(flatten_list(re.split("while\s*\(", block)))
-    tokens = clean_up_list_elems(flatten_list(list(map(lambda x: re.split("\)\s*\{", x), tokens))))
-    tokens = clean_up_list_elems(flatten_list(list(map(lambda x: re.split("\}", x), tokens))))
-    
-    assert len(tokens) == 2, "There should be 2 tokens, but there are " + str(len(tokens))
-    
-    condition, statements = tokens[0], tokens[1]
+    condition, statements, _ = blocks.header_and_block(block, "while")
     
-    while evaluate_expression(condition, instance_vars, stack):
-        parse_eval(statements, instance_vars, stack)    # We will NOT support different scoping for variables inside.
+    instrument.record(instrument.INTERPRETED_LOOP)
+    condition, statements, temporaries = licm.hoist("while", condition, statements, None, [], instance_vars, stack,
+                                                    evaluate_expression)
+    try:
+        commands = parse_block(statements, instance_vars, stack)    # The body is only parsed once.
+        while evaluate_expression(condition, instance_vars, stack):
+            signal = eval_commands(commands, not continue_prompt)    # We will NOT support different scoping for variables inside.
+            if signal is not None and not control.continues(signal, label):
+                return control.after_loop(signal, label)
+            limits.tick()   # The back-edge
+    finally:
+        licm.release(temporaries, stack)
         
-    return  # Call parse_eval with instance_vars
+    return None
 
 """
 validate_while_loop_syntax() walks through the syntax to ensure that the basic syntax of a while 
@@ -658,35 +1396,224 @@ InvalidWhileLoopException -- raised if the syntax does not follow the structure
 def validate_while_loop_syntax(block):
     return
 
-def handle_for(block, instance_vars, stack):
+def handle_for(block, instance_vars, stack, label=None):
     validate_for_loop_syntax(block)
     
-    tokens = clean_up_list_elems(flatten_list(re.split("for\s*\(", block)))
-    tokens = clean_up_list_elems(flatten_list(list(map(lambda x: re.split("\)\s*\{", x), tokens))))
-    tokens = clean_up_list_elems(flatten_list(list(map(lambda x: re.split("\}", x), tokens))))
+    header, statements, _ = blocks.header_and_block(block, "for")
+    tokens = [header, statements]
+    for_each = re.match(FOR_EACH, tokens[0]) if ";" not in tokens[0] else None
+    if for_each:
+        datatype, var, iterable = for_each.groups()
+        instrument.record(instrument.FOR_EACH_LOOP)
+        return run_for_each(datatype.replace(" ", ""), var, iterable, tokens[1], instance_vars, stack, label)
     
     tokens = tokens[0].split(";") + [tokens[1]]
     initialize, condition, update, statements = tokens
     
+    # Element-wise and reduction loops over arrays are handed off to NumPy when possible.
+    if vectorize.lower_for_loop(initialize, condition, update, statements, instance_vars, stack, evaluate_expression):
+        instrument.record(instrument.VECTORIZED_LOOP)
+        return
+    
+    header = match_counted_loop(initialize, condition, update)
+    if header is not None:
+        signal = run_counted_loop(header, initialize, statements, instance_vars, stack, label)
+        if signal is not False:
+            instrument.record(instrument.COUNTED_LOOP)
+            return signal
+    
+    instrument.record(instrument.INTERPRETED_LOOP)
     assign_variable(initialize, instance_vars, stack)
     """
     evaluated_condition = evaluate_expression(condition, instance_vars, stack)
     if type(evaluated_condition) is not bool:
         raise InvalidForLoopException("Boolean condition is of wrong type")
     """
-    while evaluate_expression(condition, instance_vars, stack):
-        parse_eval(statements, instance_vars, stack)
-        assign_variable(update, instance_vars, stack)
-        
     # Assumes well-formed expression.
     var_name = initialize.split(" ")[1]
-    get_variable_frame(var_name, instance_vars, stack).pop(var_name)
+    temporaries = []
+    try:
+        condition, statements, temporaries = licm.hoist("for", condition, statements, update, [var_name],
+                                                        instance_vars, stack, evaluate_expression)
+        update_command = analyze([update], instance_vars, stack)[0]
+        commands = parse_block(statements, instance_vars, stack)
+        while evaluate_expression(condition, instance_vars, stack):
+            signal = eval_commands(commands, not continue_prompt)
+            if signal is not None and not control.continues(signal, label):
+                return control.after_loop(signal, label)
+            update_command.eval()
+            limits.tick()
+    finally:
+        # The loop variable goes out of scope even if the body raised.
+        licm.release(temporaries, stack)
+        get_variable_frame(var_name, instance_vars, stack).pop(var_name)
     
-    return
+    return None
     
 def validate_for_loop_syntax(block):
     return
 
+"""
+run_counted_loop() runs a counted for loop ("for (int i = 0; i < n; i++)") with a native Python counter. 
+The bound is evaluated once and the condition and update clauses are never interpreted; the loop 
+variable's slot is only written when the body reads it.  The body is parsed once for the whole loop.
+
+Arguments:
+header -- the tuple returned by match_counted_loop()
+initialize -- the initialization clause of the for loop
+statements -- the body of the for loop
+instance_vars -- the dictionary which represents the instance variables
+stack -- the list of dictionaries which represents our stack
+label -- the label of the loop, or None
+
+Returns:
+False if it is not a counted loop and must be interpreted normally; nothing has been executed when 
+False is returned.  Otherwise, the result of the loop, as for handle_for().
+"""
+def run_counted_loop(header, initialize, statements, instance_vars, stack, label=None):
+    var, start, end, step, inclusive = header
+    if var in assigned_variables(statements) or var in referenced_variables(end) or not is_invariant(end, statements):
+        return False
+    end = evaluate_expression(end, instance_vars, stack)
+    if type(end) is not int:
+        return False
+    stop = end + (step // abs(step) if inclusive else 0)
+    if narrow(stop + step, INT) != stop + step:
+        return False    # The Java counter would overflow and wrap around instead of stopping.
+    
+    assign_variable(initialize, instance_vars, stack)
+    variable = get_variable_frame(var, instance_vars, stack)[var]
+    proven = set()
+    temporaries = []
+    try:
+        values = range(variable.get_value(), stop, step)
+        proven = prove_in_bounds(var, values, statements, instance_vars, stack) - unchecked_accesses
+        unchecked_accesses.update(proven)   # In place: greenthreads.py swaps the set between threads.
+        _, statements, temporaries = licm.hoist("for", None, statements, None, [var], instance_vars, stack,
+                                                evaluate_expression)
+        reads = reads_variable(var, statements)
+        commands = parse_block(statements, instance_vars, stack)
+        for value in values:
+            if reads:
+                variable.set_value(value)
+            signal = eval_commands(commands, not continue_prompt)
+            if signal is not None and not control.continues(signal, label):
+                return control.after_loop(signal, label)
+            limits.tick()
+    finally:
+        unchecked_accesses.difference_update(proven)
+        licm.release(temporaries, stack)
+        get_variable_frame(var, instance_vars, stack).pop(var)
+    return None
+
+"""
+run_for_each() runs an enhanced for loop ("for (int x : xs)") over an array or a native collection.  The 
+loop walks the Python list, dict or deque holding the elements directly, with no iterator object or 
+index of its own; the loop variable's slot is only written when the body reads it.  The body is parsed 
+once for the whole loop.
+
+Arguments:
+datatype -- the declared type of the loop variable
+var -- the name of the loop variable
+iterable -- the expression after the colon
+statements -- the body of the loop
+instance_vars -- the dictionary which represents the instance variables
+stack -- the list of dictionaries which represents our stack
+label -- the label of the loop, or None
+
+Returns:
+The result of the loop, as for handle_for()
+
+Exceptions:
+InvalidDatatypeException -- raised if the expression is neither an array nor a Collection
+NullPointerException -- raised if the expression is null
+ConcurrentModificationException -- raised if the body changes the structure of the collection
+"""
+def run_for_each(datatype, var, iterable, statements, instance_vars, stack, label=None):
+    if re.match(r'[a-zA-Z_]\w*$', iterable.strip()):
+        source = variable_lookup(iterable.strip(), instance_vars, stack).get_value()
+    else:
+        source = evaluate_expression(iterable, instance_vars, stack)
+    if source is None:
+        raise NullPointerException("Cannot iterate over null: " + iterable.strip())
+    if isinstance(source, Array):
+        elements, collection = source.items, None
+    elif isinstance(source, containers.Collection):
+        elements, collection = source.contents(), source
+    else:
+        raise InvalidDatatypeException("for-each not applicable to expression type: " + iterable.strip())
+    
+    declare_variable(datatype + " " + var, instance_vars, stack)
+    variable = get_variable_frame(var, instance_vars, stack)[var]
+    temporaries = []
+    try:
+        _, statements, temporaries = licm.hoist("for", None, statements, None, [var], instance_vars, stack,
+                                                evaluate_expression)
+        reads = reads_variable(var, statements)
+        commands = parse_block(statements, instance_vars, stack)
+        expected = collection.modifications if collection is not None else None
+        for value in elements:
+            if reads:
+                variable.value = '"' + value + '"' if type(value) is str else value     # Strings keep their quotes.
+            signal = eval_commands(commands, not continue_prompt)
+            if signal is not None and not control.continues(signal, label):
+                return control.after_loop(signal, label)
+            if collection is not None and collection.modifications != expected:
+                raise ConcurrentModificationException()
+            limits.tick()
+    finally:
+        licm.release(temporaries, stack)
+        get_variable_frame(var, instance_vars, stack).pop(var)
+    return None
+
+"""
+prove_in_bounds() performs the single range check that replaces the per-iteration bounds checks of a 
+counted loop.  Accesses indexed by the loop variable plus a constant, on arrays the body does not 
+reassign, are in bounds on every iteration if they are in bounds for the first and last values of the 
+loop variable.  Accesses that fail the check keep their bounds check, so the exception is still raised 
+on the iteration that goes out of bounds.
+
+Arguments:
+var -- the name of the loop variable
+values -- the range of values the loop variable takes
+statements -- the body of the loop
+
+Returns:
+The set of (array name, index text) pairs that can be accessed without checking the bounds
+"""
+def prove_in_bounds(var, values, statements, instance_vars, stack):
+    proven = set()
+    if len(values) == 0:
+        return proven
+    low, high = min(values[0], values[-1]), max(values[0], values[-1])
+    for name, index, offset in indexed_accesses(var, statements):
+        frame = get_variable_frame(name, instance_vars, stack)
+        array = frame[name].get_value() if frame is not None else None
+        if isinstance(array, Array) and low + offset >= 0 and high + offset < array.getLen():
+            proven.add((name, index))
+            instrument.record(instrument.BOUNDS_CHECK_ELIMINATED)
+    return proven
+
             
+"""
+command_line_option() returns the value given after an option on the command line ("--budget 1000"),
+converted with convert, or None if the option is not given.
+"""
+def command_line_option(name, convert):
+    args = sys.argv[1:]
+    if name in args and args.index(name) + 1 < len(args):
+        return convert(args[args.index(name) + 1])
+    return None
+
 if __name__ == '__main__':
+    limits.budget = command_line_option('--budget', int)
+    limits.time_limit = command_line_option('--time-limit', float)
+    limits.heap_quota = command_line_option('--heap-quota', int)
+    limits.quantum = command_line_option('--quantum', int) or limits.quantum
+    greenthreads.schedule_seed = command_line_option('--schedule-seed', int)
+    instrument.enabled = '--stats' in sys.argv[1:]
+    diagnostics.enabled = '--diagnostics' in sys.argv[1:]
+    memoize.enabled = '--no-memoize' not in sys.argv[1:]
+    memoize.automatic = '--memoize-all' in sys.argv[1:]
+    sys.setrecursionlimit(10000)    # Each Java call takes a few dozen Python frames.
     read_eval_print_loop()
@@ -0,0 +1,246 @@
+'''
+licm.py
+Loop-invariant code motion.  Pure subexpressions of a loop's condition and body whose operands are never
+written by the loop, such as "n * n" or "a.length", are computed once before the loop starts and stored in
+temporaries, and the loop text is rewritten to read the temporaries instead:
+
+    while (i < n * n) { sum = sum + a.length * k; i = i + 1; }
+    ==> $licm0 = n * n; $licm1 = a.length * k
+        while (i < $licm0) { sum = sum + $licm1; i = i + 1; }
+
+The temporaries' names start with "$", so they cannot clash with the program's own variables.
+'''
+import re
+import itertools
+from collections import namedtuple
+from variable import Variable
+from exceptions import JavaException
+from loop_analysis import assigned_variables, assigned_arrays, calls_methods, strip_literals
+import diagnostics
+import stdlib
+import containers
+
+TOKEN_PATTERN = re.compile(r'\s*(?:(?P<literal>"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|(?:\d+\.\d*|\.\d+|\d+)[lLfFdD]?)|' +
+                           r'(?P<name>[a-zA-Z_$][\w$]*)|' +
+                           r'(?P<op>>>>|<<|>>|<=|>=|==|!=|&&|\|\||[-+*/%<>!~&|^().,\[\]]))')
+ASSIGNMENT_PATTERN = r'([^=]*?[^=<>!])=(?!=)(.*)$'
+# Binary operators, from the loosest binding to the tightest
+BINARY_OPERATORS = [['||'], ['&&'], ['|'], ['^'], ['&'], ['==', '!='], ['<', '>', '<=', '>='], ['<<', '>>', '>>>'],
+                    ['+', '-'], ['*', '/', '%']]
+UNARY_OPERATORS = ['-', '+', '!', '~']
+CONSTANTS = ['true', 'false', 'null']
+# Members that can be read without side effects, on a variable the loop does not reassign.  split() is
+# left out because every call returns a new array.  Collections are only read by loops without method
+# calls, since any call could change them.
+PURE_MEMBERS = ['length'] + [name for name in stdlib.STRING_METHODS if name != 'split'] + containers.READ_ONLY_METHODS
+
+# start and end are offsets into the expression text; a trivial node is one not worth a temporary.
+Node = namedtuple('Node', ['start', 'end', 'pure', 'trivial', 'children'])
+
+temporary_names = ("$licm" + str(number) for number in itertools.count())
+
+class NotHoistable(Exception):
+    """Raised for expressions the parser does not understand; nothing is hoisted out of them."""
+
+"""
+hoist() hoists the invariant subexpressions out of a loop.  Each candidate is evaluated once, before the
+loop runs; candidates whose evaluation fails are left in place, so that any exception is raised where the
+loop would have raised it.  Loops whose bodies call methods are left alone, since a call could change
+any variable.
+
+Arguments:
+kind -- the kind of loop ("while" or "for"), for the diagnostics
+condition -- the loop condition, or None if the caller does not interpret it
+statements -- the body of the loop
+update -- the update clause of a for loop, or None
+loop_vars -- the names of variables the loop header writes
+instance_vars -- the dictionary holding all the instance variables
+stack -- the list of dictionaries representing the stack frames on the stack
+evaluate -- the evaluator's evaluate_expression(exp_str, instance_vars, stack) function
+
+Returns:
+A tuple (rewritten condition, rewritten statements, names of the temporaries created).  The temporaries
+live in the current stack frame until release() is called.
+"""
+def hoist(kind, condition, statements, update, loop_vars, instance_vars, stack, evaluate):
+    loop_text = ";".join([condition or "", statements, update or ""])
+    if calls_methods(loop_text):
+        return condition, statements, []
+    written = assigned_variables(loop_text) | set(loop_vars)
+    written_arrays = assigned_arrays(loop_text)
+
+    candidates = []
+    def collect(expression):
+        if expression not in candidates:
+            candidates.append(expression)
+    rewrite(condition, statements, written, written_arrays, collect)
+
+    temporaries = {}
+    for expression in candidates:
+        try:
+            value = evaluate(expression, instance_vars, stack)
+        except (Exception, JavaException):
+            continue
+        if type(value) not in (int, float, bool, str):
+            continue
+        name = next(temporary_names)
+        stack[-1][name] = Variable(None, None, name)
+        stack[-1][name].set_value('"' + value + '"' if type(value) is str else value)
+        temporaries[expression] = name
+        diagnostics.note("licm", "hoisted '{0}' out of {1} loop as {2}".format(expression, kind, name))
+    if not temporaries:
+        return condition, statements, []
+    condition, statements = rewrite(condition, statements, written, written_arrays, temporaries.get)
+    return condition, statements, list(temporaries.values())
+
+"""
+release() removes the temporaries created by hoist() from the current stack frame.
+"""
+def release(temporaries, stack):
+    for name in temporaries:
+        stack[-1].pop(name, None)
+
+"""
+rewrite() walks the invariant subexpressions of the loop condition and of the simple statements of the
+body (assignments, declarations and expression statements; statements holding nested blocks are not
+touched), and replaces each one for which replace() returns a string.
+
+Returns:
+A tuple (rewritten condition, rewritten statements)
+"""
+def rewrite(condition, statements, written, written_arrays, replace):
+    if condition is not None:
+        condition = rewrite_expression(condition, written, written_arrays, replace)
+    pieces = statements.split(";")
+    if "{" in statements or len(pieces) != len(strip_literals(statements).split(";")):
+        return condition, statements
+    for number, piece in enumerate(pieces):
+        assignment = re.match(ASSIGNMENT_PATTERN, piece, re.DOTALL)
+        if assignment:
+            pieces[number] = assignment.group(1) + "=" + \
+                rewrite_expression(assignment.group(2), written, written_arrays, replace)
+        elif piece.strip():
+            pieces[number] = rewrite_expression(piece, written, written_arrays, replace)
+    return condition, ";".join(pieces)
+
+"""
+rewrite_expression() replaces the invariant subexpressions of one expression for which replace() returns
+a string.  Expressions that cannot be parsed are returned unchanged.
+"""
+def rewrite_expression(expression, written, written_arrays, replace):
+    try:
+        parser = Parser(expression, written, written_arrays)
+        spans = invariant_spans(parser.parse())
+    except NotHoistable:
+        return expression
+    for start, end in reversed(spans):
+        replacement = replace(expression[start:end])
+        if replacement is not None:
+            expression = expression[:start] + replacement + expression[end:]
+    return expression
+
+"""
+invariant_spans() returns the (start, end) offsets of the largest pure, non-trivial subexpressions of a
+parsed expression, in left-to-right order.
+"""
+def invariant_spans(node):
+    if node.pure and not node.trivial:
+        return [(node.start, node.end)]
+    spans = []
+    for child in node.children:
+        spans.extend(invariant_spans(child))
+    return spans
+
+class Parser(object):
+    """Precedence-climbing parser for the subset of Java expressions the interpreter evaluates.  Every
+    node records whether it is pure, i.e. reads nothing the loop writes and has no side effects.
+    """
+    def __init__(self, text, written, written_arrays):
+        self.written, self.written_arrays = written, written_arrays
+        self.tokens, self.position, offset = [], 0, 0
+        while text[offset:].strip():
+            token = TOKEN_PATTERN.match(text, offset)
+            if token is None:
+                raise NotHoistable(text)
+            kind = token.lastgroup
+            self.tokens.append((kind, token.group(kind), token.start(kind), token.end()))
+            offset = token.end()
+
+    def parse(self):
+        node = self.binary(0)
+        if self.position != len(self.tokens):
+            raise NotHoistable(self.peek())
+        return node
+
+    def peek(self):
+        return self.tokens[self.position][1] if self.position < len(self.tokens) else None
+
+    def advance(self):
+        if self.position == len(self.tokens):
+            raise NotHoistable("unexpected end of expression")
+        self.position += 1
+        return self.tokens[self.position - 1]
+
+    def expect(self, text):
+        token = self.advance()
+        if token[1] != text:
+            raise NotHoistable(token[1])
+        return token
+
+    def binary(self, level):
+        if level == len(BINARY_OPERATORS):
+            return self.unary()
+        left = self.binary(level + 1)
+        while self.peek() in BINARY_OPERATORS[level]:
+            self.advance()
+            right = self.binary(level + 1)
+            left = Node(left.start, right.end, left.pure and right.pure, False, [left, right])
+        return left
+
+    def unary(self):
+        if self.peek() in UNARY_OPERATORS:
+            start = self.advance()[2]
+            operand = self.unary()
+            return Node(start, operand.end, operand.pure, operand.trivial, [operand])
+        return self.primary()
+
+    def primary(self):
+        kind, text, start, end = self.advance()
+        if kind == 'literal' or text in CONSTANTS:
+            return Node(start, end, True, True, [])
+        if text == '(':
+            inner = self.binary(0)
+            end = self.expect(')')[3]
+            return Node(start, end, inner.pure, inner.trivial, [inner])
+        if kind != 'name' or text == 'new':
+            raise NotHoistable(text)
+
+        parts = [text]
+        while self.peek() == '.':
+            self.advance()
+            kind, text, _, end = self.advance()
+            if kind != 'name':
+                raise NotHoistable(text)
+            parts.append(text)
+        stable = len(parts) == 2 and parts[1] in PURE_MEMBERS and parts[0] not in self.written
+        if self.peek() == '(':
+            self.advance()
+            arguments = []
+            while self.peek() != ')':
+                if arguments:
+                    self.expect(',')
+                arguments.append(self.binary(0))
+            end = self.expect(')')[3]
+            pure = (stable or ".".join(parts) in stdlib.PURE_FUNCTIONS) and all(argument.pure for argument in arguments)
+            return Node(start, end, pure, False, arguments)
+        if self.peek() == '[' and len(parts) == 1:
+            self.advance()
+            index = self.binary(0)
+            end = self.expect(']')[3]
+            # Another variable may refer to the same array, so no element is invariant in a loop
+            # writing any array element.
+            pure = index.pure and text not in self.written and not self.written_arrays
+            return Node(start, end, pure, False, [index])
+        if len(parts) > 1:
+            return Node(start, end, stable, False, [])
+        return Node(start, end, text not in self.written, True, [])
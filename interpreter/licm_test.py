@@ -0,0 +1,69 @@
+"""
+licm_test.py
+
+Testing harness for licm.py. Run with
+
+    python3 licm_test.py
+
+This file is designed to run on python3
+"""
+
+import sys
+sys.path.append(sys.path[0] + '/../')
+
+import licm
+from variable import Variable
+from session import InterpreterSession
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+def evaluate(exp_str, instance_vars, stack):
+    """Stand-in for the evaluator: variables are looked up in the frame."""
+    names = {name: var.get_value() for name, var in stack[-1].items()}
+    return eval(exp_str.replace('/', '//'), {}, names)
+
+def hoist(condition, statements, loop_vars=[]):
+    stack = [{'n': Variable(5, 'int', 'n'), 'i': Variable(0, 'int', 'i'),
+              'k': Variable(0, 'int', 'k')}]
+    condition, statements, temporaries = licm.hoist('while', condition, statements, None,
+                                                    loop_vars, {}, stack, evaluate)
+    values = [stack[-1][name].get_value() for name in temporaries]
+    licm.release(temporaries, stack)
+    assert_equal(sorted(stack[-1]), ['i', 'k', 'n'])
+    for number, name in enumerate(temporaries):
+        condition = condition and condition.replace(name, '$' + str(number))
+        statements = statements.replace(name, '$' + str(number))
+    return condition, statements, values
+
+def licm_test():
+    print("*---- licm Test ----*")
+
+    print("  --- hoisting ---")
+    assert_equal(hoist('i < n * n', 'i = i + 1;'), ('i < $0', 'i = i + 1;', [25]))
+    assert_equal(hoist('i < 10', 'k = k + (n + 1) * i; i = i + 1;'),
+                 ('i < 10', 'k = k + $0 * i; i = i + 1;', [6]))
+    assert_equal(hoist(None, 'System.out.println(n * 2);', ['i']),
+                 (None, 'System.out.println($0);', [10]))
+
+    print("  --- nothing to hoist ---")
+    assert_equal(hoist('i < n', 'n = n * 2; i = i + 1;'), ('i < n', 'n = n * 2; i = i + 1;', []))
+    assert_equal(hoist('i < n * 2', 'i = i + 1; foo();'), ('i < n * 2', 'i = i + 1; foo();', []))
+    assert_equal(hoist('i < 3', 'k = k + 10 / (n - 5); i++;'),
+                 ('i < 3', 'k = k + 10 / (n - 5); i++;', []))
+
+    print("  --- aliased arrays ---")
+    session = InterpreterSession()
+    session.execute('int[] a = new int[3]; int[] b = a; int s = 0;')
+    assert_equal(session.execute('int i = 0; while (i < 3) { b[0] = b[0] + 1; s = s + a[0]; i++; } s'), 6)
+    assert_equal(session.execute('for (int j = 0; j < 3; j++) { b[0] = b[0] + 1; s = s + a[0]; } s'), 21)
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    licm_test()
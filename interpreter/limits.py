@@ -0,0 +1,205 @@
+'''
+limits.py
+Limits on what a program may use: an instruction budget, a wall-clock deadline and a heap quota.  They
+make the interpreter safe to run untrusted code under load; "while (true) { }" or "new int[1 << 30]" is
+stopped with a LimitExceededException instead of taking the process down with it.
+
+Instructions are counted at safepoints: every statement, every loop back-edge and every method call
+calls tick(), which only decrements a counter.  When the counter runs out, safepoint() charges the
+instructions to the budget and checks the deadline, and sets the counter again, at most CHECK_INTERVAL
+instructions ahead.  With no limits set, tick() costs a decrement and a comparison.
+
+The heap quota is checked when arrays, objects and library objects are allocated, and when a
+collection or a StringBuilder grows; the bytes of an object are given back when Python frees it.
+
+A job may also be run in time slices (see timeslice.py): with preempt set, safepoint() calls it once
+every slice_size instructions, and preempt lets other jobs run before it returns.  In the same way, the
+Java threads of a program (see greenthreads.py) take turns of quantum instructions: switch is called at
+the end of each.
+
+A limit is set to None for no limit.  start() begins a new job (a REPL line, or a session's execute()),
+with the whole budget and a new deadline; the heap is kept across jobs.
+'''
+import time
+import weakref
+from constants import INT, SHORT, LONG, FLOAT, DOUBLE, BOOLEAN, CHAR
+from exceptions import JavaException
+
+budget = None       # Instructions a job may run
+time_limit = None   # Seconds a job may run
+heap_quota = None   # Bytes of arrays and objects a session may hold
+
+preempt = None      # Called every slice_size instructions, or None
+slice_size = 1000   # Instructions a job runs before it is preempted
+switch = None       # Called every quantum instructions while the program has Java threads, or None
+quantum = 100       # Instructions a Java thread runs before the next one has a turn
+
+CHECK_INTERVAL = 1024   # Most instructions between two checks of the deadline
+
+# Estimated sizes, in bytes, as on a 64-bit JVM
+OBJECT_HEADER = 16
+REFERENCE = 8
+ENTRY = OBJECT_HEADER + 4 * REFERENCE   # A HashMap or HashSet entry: its node and its slot in the table
+ELEMENT_SIZES = {BOOLEAN: 1, CHAR: 2, SHORT: 2, INT: 4, FLOAT: 4, LONG: 8, DOUBLE: 8}
+
+class LimitExceededException(JavaException):
+    """Raised when a job goes over one of its limits.  Java code cannot catch it; the embedding program
+    (the REPL, a session's caller) can."""
+    catchable = False
+
+class InstructionBudgetExceededException(LimitExceededException):
+    pass
+
+class DeadlineExceededException(LimitExceededException):
+    pass
+
+class HeapQuotaExceededException(LimitExceededException):
+    pass
+
+class Heap(object):
+    """The bytes of arrays and objects a session holds."""
+    def __init__(self):
+        self.used = 0
+
+    def release(self, size):
+        self.used -= size
+
+heap = Heap()
+
+fuel = CHECK_INTERVAL   # Instructions left before the next safepoint
+granted = CHECK_INTERVAL    # The fuel given at the last safepoint
+remaining = None    # Instructions of the budget not yet charged, or None
+deadline = None     # The time.monotonic() the job must end by, or None
+executed = 0        # Instructions of the job charged so far
+slice_left = None   # Instructions left in the job's time slice, or None
+switch_left = None  # Instructions left in the running Java thread's turn, or None
+
+"""
+start() begins a job: the budget is refilled and the deadline set time_limit seconds from now.
+"""
+def start():
+    global remaining, deadline, executed, slice_left
+    remaining = budget
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    executed = 0
+    slice_left = slice_size if preempt is not None else None
+    refuel()
+
+"""
+tick() counts n instructions.  It is called at every safepoint.
+
+Exceptions:
+LimitExceededException -- raised if the budget has run out or the deadline has passed
+"""
+def tick(n=1):
+    global fuel
+    fuel -= n
+    if fuel <= 0:
+        safepoint()
+
+"""
+safepoint() charges the instructions run since the last safepoint to the budget, and checks the deadline.
+At the end of a time slice, it calls preempt, and at the end of a Java thread's turn, switch.  The counter
+is set again first, so the job or thread running next starts with a full one.
+
+Exceptions:
+InstructionBudgetExceededException -- raised if the job has run more instructions than its budget
+DeadlineExceededException -- raised if the job has run longer than its time limit
+"""
+def safepoint():
+    global remaining, executed, slice_left, switch_left
+    ran = granted - fuel
+    executed += ran
+    if remaining is not None:
+        remaining -= ran
+        if remaining < 0:
+            exhaust()
+            raise InstructionBudgetExceededException("instruction budget of {0} exceeded".format(budget))
+    if deadline is not None and time.monotonic() > deadline:
+        exhaust()
+        raise DeadlineExceededException("time limit of {0} seconds exceeded".format(time_limit))
+    preempting = switching = False
+    if slice_left is not None:
+        slice_left -= ran
+        if slice_left <= 0:
+            slice_left, preempting = slice_size, True
+    if switch_left is not None:
+        switch_left -= ran
+        if switch_left <= 0:
+            switch_left, switching = quantum, True
+    refuel()
+    if preempting:
+        preempt()
+    if switching:
+        switch()
+
+def refuel():
+    global fuel, granted
+    fuel = CHECK_INTERVAL
+    if remaining is not None:
+        fuel = max(0, min(fuel, remaining))
+    if slice_left is not None:
+        fuel = min(fuel, slice_left)
+    if switch_left is not None:
+        fuel = min(fuel, switch_left)
+    granted = fuel
+
+"""
+count() returns the number of instructions the job has run so far.
+"""
+def count():
+    return executed + granted - fuel
+
+def exhaust():
+    """Leaves no fuel, so that the next safepoint (in a finally clause, say) raises again."""
+    global fuel, granted
+    granted = fuel = 0
+
+"""
+allocate() charges the bytes of a new array or object to the heap, and gives them back when the object
+is freed.
+
+Arguments:
+obj -- the new object
+size -- its estimated size in bytes
+
+Exceptions:
+HeapQuotaExceededException -- raised if the heap would hold more than heap_quota bytes
+"""
+def allocate(obj, size):
+    if heap_quota is None:
+        return
+    if heap.used + size > heap_quota:
+        raise HeapQuotaExceededException("heap quota of {0} bytes exceeded: {1} more bytes requested with {2} "
+                                         "in use".format(heap_quota, size, heap.used))
+    heap.used += size
+    weakref.finalize(obj, heap.release, size)
+
+"""
+grow() charges the heap for the contents of a library object (a collection, a StringBuilder) before they
+grow to needed bytes.  As in the JDK, the capacity of a full object is doubled, so a run of appends is
+charged, and checked against the quota, only a few times.  The bytes are given back with the object.
+
+Arguments:
+obj -- the object
+capacity -- the bytes charged for its contents so far
+needed -- the bytes its contents are growing to
+
+Returns:
+The bytes charged for its contents now
+
+Exceptions:
+HeapQuotaExceededException -- raised if the heap would hold more than heap_quota bytes
+"""
+def grow(obj, capacity, needed):
+    if needed <= capacity:
+        return capacity
+    size = max(needed, 2 * capacity)
+    allocate(obj, size - capacity)
+    return size
+
+"""
+array_size() returns the estimated size in bytes of an array of the given element datatype and length.
+"""
+def array_size(datatype, length):
+    return OBJECT_HEADER + length * ELEMENT_SIZES.get(datatype, REFERENCE)
@@ -0,0 +1,115 @@
+"""
+limits_test.py
+
+Testing harness for limits.py. Run with
+
+    python3 limits_test.py
+
+This file is designed to run on python3
+"""
+
+import gc
+from session import InterpreterSession
+import limits
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+def budget_test():
+    global s
+    print("*---- Instruction Budget Test ----*")
+    s = InterpreterSession(budget=5000)
+    assert_error("s.execute('int n = 0; while (true) { n++; }')", limits.InstructionBudgetExceededException)
+    n = s.execute('n')
+    assert_equal(0 < n < 5000, True)
+
+    print("  --- each job has the whole budget ---")
+    s.execute('int t = 0; for (int i = 0; i < 1000; i++) { t += i; }')
+    s.execute('for (int i = 0; i < 1000; i++) { t -= i; }')
+    assert_equal(s.execute('t'), 0)
+
+    print("  --- Java cannot catch it ---")
+    assert_error("s.execute('try { while (true) { } } catch (Throwable e) { }')",
+                 limits.InstructionBudgetExceededException)
+    assert_error("s.execute('int k = 0; try { while (true) { } } finally { while (true) { k++; } }')",
+                 limits.InstructionBudgetExceededException)
+    assert_equal(s.execute('k') < 5, True)
+
+    print("  --- calls ---")
+    s = InterpreterSession(budget=100)
+    s.load('class R { static int down(int n) { return down(n + 1); } }')
+    assert_error("s.call('R', 'down', [0])", limits.InstructionBudgetExceededException)
+    assert_equal(InterpreterSession().execute('int z = 0; for (int i = 0; i < 6000; i++) { z++; } z'), 6000)
+    print('All tests passed!\n')
+
+def deadline_test():
+    global s
+    print("*---- Deadline Test ----*")
+    s = InterpreterSession(time_limit=0.2)
+    assert_error("s.execute('while (true) { }')", limits.DeadlineExceededException)
+    assert_equal(s.execute('1 + 1'), 2)
+    print('All tests passed!\n')
+
+def heap_quota_test():
+    global s
+    print("*---- Heap Quota Test ----*")
+    s = InterpreterSession(heap_quota=4096)
+    assert_error("s.execute('int[] big = new int[2000];')", limits.HeapQuotaExceededException)
+    s.execute('int[] small = new int[600];')
+    assert_error("s.execute('int[] more = new int[600];')", limits.HeapQuotaExceededException)
+
+    print("  --- freed objects are given back ---")
+    s.execute('small = null;')
+    gc.collect()
+    s.execute('int[] again = new int[600];')
+    assert_equal(s.execute('again.length'), 600)
+
+    print("  --- collections and StringBuilders are charged as they grow ---")
+    s.execute('again = null;')
+    gc.collect()
+    s.execute('ArrayList<Integer> xs = new ArrayList<>(); StringBuilder sb = new StringBuilder();')
+    assert_error("s.execute('for (int i = 0; i < 1000; i++) { xs.add(i); }')", limits.HeapQuotaExceededException)
+    assert_equal(s.execute('xs.size()') < 500, True)
+    s.execute('xs = null;')
+    gc.collect()
+    assert_error("s.execute('for (int i = 0; i < 1000; i++) { sb.append(\"xyz\"); }')",
+                 limits.HeapQuotaExceededException)
+    s.execute('sb = null; HashMap<Integer, Integer> m = new HashMap<>();')
+    gc.collect()
+    assert_error("s.execute('for (int i = 0; i < 1000; i++) { m.put(i, i); }')", limits.HeapQuotaExceededException)
+    assert_equal(s.execute('m.size()') < 100, True)
+    s.execute('m = null;')
+    gc.collect()
+
+    print("  --- Strings built with += are charged as they grow ---")
+    s = InterpreterSession(heap_quota=100000)
+    assert_error("s.execute('String s = \"\"; int i = 0; while (i < 100000) { s += \"xxxxxxxxxxxxxxxx\"; i++; }')",
+                 limits.HeapQuotaExceededException)
+
+    print("  --- sessions have their own heaps ---")
+    t = InterpreterSession(heap_quota=4096)
+    t.execute('int[] own = new int[600];')
+    assert_equal(InterpreterSession().execute('int[] free = new int[100000]; free.length'), 100000)
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    budget_test()
+    deadline_test()
+    heap_quota_test()
@@ -0,0 +1,173 @@
+'''
+loop_analysis.py
+Static analysis of loop headers and bodies, used to decide which loops can take a fast path.  All of
+the analysis is done on the source text of the loop, before the loop starts running.
+'''
+import re
+from constants import ARRAY_ACCESS
+import stdlib
+import containers
+
+NAME = r'[a-zA-Z_]\w*'
+INITIALIZE_PATTERN = r'int\s+(' + NAME + r')\s*=\s*(.+)$'
+CONDITION_PATTERN = r'(' + NAME + r')\s*(<=|<|>=|>)\s*(.+)$'
+ASSIGNMENT_PATTERN = r'(?<![\w.])(' + NAME + r')\s*(\[[^\]]*\]\s*)?(?:[-+*/%&|^]|<<|>>>?)?=(?!=)'
+INCREMENT_PATTERN = r'(?<![\w.])(' + NAME + r')\s*(\[[^\]]*\]\s*)?(?:\+\+|--)|(?:\+\+|--)\s*(' + NAME + r')(\s*\[)?'
+CALL_PATTERN = r'(?<![\w.])(' + NAME + r'(?:\.' + NAME + r')*)\s*\('
+STRING_LITERAL = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+NOT_CALLS = ['if', 'for', 'while', 'switch', 'return', 'new']
+PURE_CALLS = ['System.out.println'] + stdlib.PURE_FUNCTIONS
+# Methods that only read their receiver, whatever kind of object it is
+READ_ONLY_METHODS = list(stdlib.STRING_METHODS) + containers.READ_ONLY_METHODS
+
+"""
+match_counted_loop() recognizes the header of a counted for loop, one whose variable is stepped by a
+constant towards a bound.
+
+Arguments:
+initialize, condition, update -- the three clauses of the for loop header
+
+Returns:
+A tuple (variable name, start expression, end expression, step, True if the end is inclusive), or None
+if the header does not describe a counted loop
+
+>>> match_counted_loop("int i = 0", "i < n", "i++")
+('i', '0', 'n', 1, False)
+>>> match_counted_loop("int i = n", "i >= 0", "i -= 2")
+('i', 'n', '0', -2, True)
+"""
+def match_counted_loop(initialize, condition, update):
+    initialize = re.match(INITIALIZE_PATTERN, initialize.strip())
+    condition = re.match(CONDITION_PATTERN, condition.strip())
+    if not initialize or not condition:
+        return None
+    var = initialize.group(1)
+    if condition.group(1) != var:
+        return None
+    step = match_step(var, update)
+    if step is None or (step > 0) != (condition.group(2) in ['<', '<=']):
+        return None
+    return var, initialize.group(2).strip(), condition.group(3).strip(), step, condition.group(2) in ['<=', '>=']
+
+"""
+match_step() returns the constant amount the update clause of a for loop adds to the loop variable, or
+None if the update clause is anything else.
+"""
+def match_step(var, update):
+    update = re.sub(r'\s+', '', update)
+    if update in [var + "++", "++" + var]:
+        return 1
+    if update in [var + "--", "--" + var]:
+        return -1
+    match = re.match(re.escape(var) + r'(\+=|-=|=' + re.escape(var) + r'\+|=' + re.escape(var) + r'-)(\d+)$', update)
+    if not match or int(match.group(2)) == 0:
+        return None
+    return int(match.group(2)) if '+' in match.group(1) else -int(match.group(2))
+
+"""
+strip_literals() blanks out string and char literals so that their contents are not mistaken for code.
+"""
+def strip_literals(statements):
+    return re.sub(STRING_LITERAL, '""', statements)
+
+"""
+assigned_variables() returns the set of variables that the statements assign to, declare or increment.
+Array elements that are assigned to are not included (see assigned_arrays()).
+
+>>> sorted(assigned_variables("x = x + 1; a[i] = 3; count++; int y = 2;"))
+['count', 'x', 'y']
+"""
+def assigned_variables(statements):
+    statements = strip_literals(statements)
+    names = set()
+    for match in re.finditer(ASSIGNMENT_PATTERN, statements):
+        if not match.group(2):
+            names.add(match.group(1))
+    for match in re.finditer(INCREMENT_PATTERN, statements):
+        if match.group(1) and not match.group(2):
+            names.add(match.group(1))
+        elif match.group(3) and not match.group(4):
+            names.add(match.group(3))
+    return names
+
+"""
+assigned_arrays() returns the set of arrays that have one of their elements assigned to or incremented.
+
+>>> sorted(assigned_arrays("x = x + 1; a[i] = 3; b[0]++;"))
+['a', 'b']
+"""
+def assigned_arrays(statements):
+    statements = strip_literals(statements)
+    names = set()
+    for match in re.finditer(ASSIGNMENT_PATTERN, statements):
+        if match.group(2):
+            names.add(match.group(1))
+    for match in re.finditer(INCREMENT_PATTERN, statements):
+        if match.group(1) and match.group(2):
+            names.add(match.group(1))
+        elif match.group(3) and match.group(4):
+            names.add(match.group(3))
+    return names
+
+"""
+referenced_variables() returns the set of identifiers that appear in the expression, other than the
+names of fields and methods accessed with a dot.
+"""
+def referenced_variables(expression):
+    return set(re.findall(r'(?<![\w.])' + NAME, strip_literals(expression)))
+
+"""
+reads_variable() returns True if the variable is mentioned anywhere in the statements.
+"""
+def reads_variable(var, statements):
+    return var in referenced_variables(statements)
+
+"""
+calls_methods() returns True if the statements contain a method call that might change variables
+behind the analysis' back.  Printing, the pure library functions (Math.max, ...) and read-only methods
+such as s.charAt(i) are not considered to be such calls.
+"""
+def calls_methods(statements):
+    for match in re.finditer(CALL_PATTERN, strip_literals(statements)):
+        name = match.group(1)
+        if name in NOT_CALLS or name in PURE_CALLS:
+            continue
+        if "." in name and name.split(".")[-1] in READ_ONLY_METHODS:
+            continue
+        return True
+    return False
+
+"""
+is_invariant() returns True if the value of the expression cannot change while the statements run: none
+of the variables it mentions are assigned to, and none of the arrays it indexes have elements assigned
+to.
+"""
+def is_invariant(expression, statements):
+    if calls_methods(statements) or calls_methods(expression):
+        return False
+    mentioned = referenced_variables(expression)
+    if mentioned & assigned_variables(statements):
+        return False
+    if "[" in expression and mentioned & assigned_arrays(statements):
+        return False
+    return True
+
+"""
+indexed_accesses() returns the array accesses in the statements whose index is the loop variable plus or
+minus a constant, as (array name, index text, offset) tuples.  Arrays that the statements might reassign
+are left out, since the bounds of those cannot be known before the loop runs.
+
+>>> sorted(indexed_accesses("i", "b[i] = a[i + 1] - a[j];"))
+[('a', 'i + 1', 1), ('b', 'i', 0)]
+"""
+def indexed_accesses(var, statements):
+    if calls_methods(statements):
+        return set()
+    reassigned = assigned_variables(statements)
+    accesses = set()
+    for match in re.finditer(ARRAY_ACCESS, strip_literals(statements)):
+        index = re.match(re.escape(var) + r'\s*(?:([+-])\s*(\d+))?$', match.group(2).strip())
+        if index and match.group(1) not in reassigned:
+            offset = int(index.group(2) or 0) * (-1 if index.group(1) == '-' else 1)
+            accesses.add((match.group(1), match.group(2).strip(), offset))
+    return accesses
@@ -0,0 +1,148 @@
+'''
+memoize.py
+Result caches for pure static methods.  Recursive methods written top-down (fib, binomial coefficients,
+dynamic programming) call themselves again and again with the same arguments; a memoized method looks
+the arguments up in a bounded LRU cache before running its body.
+
+A static method is memoized if it is opted in, by its "@Memoize" annotation, because its class is in
+opted_in, or because automatic is True, and the purity analysis below proves it pure.  Setting enabled
+to False (the REPL's --no-memoize) turns memoization off, to compare semantics and timing; the setting
+applies to methods compiled after it is changed.
+'''
+import re
+import functools
+from constants import TYPES, STRING
+import blocks
+import diagnostics
+import natives
+import stdlib
+
+enabled = True
+automatic = False   # Memoize every pure static method, opted in or not
+opted_in = set()    # The names of the classes whose pure static methods are memoized
+ANNOTATION = 'Memoize'
+MAX_SIZE = 1024     # Results kept per method
+
+caches = {}     # "Class.method/arity" -> the cached function
+
+CALL_PATTERN = re.compile(r'(?<![\w$.])([a-zA-Z_]\w*)\s*\(')
+MEMBER_CALL_PATTERN = re.compile(r'(?:(?<![\w$.])([a-zA-Z_]\w*)\s*)?\.\s*([a-zA-Z_]\w*)\s*\(')
+MEMBER_PATTERN = re.compile(r'(?<![\w$.])([a-zA-Z_]\w*)\s*\.\s*([a-zA-Z_]\w*)\b(?!\s*\()')
+STRING_DECLARATION = re.compile(r'\bString\s+([a-zA-Z_]\w*)')
+NAME_PATTERN = re.compile(r'(?<![\w$.])[a-zA-Z_]\w*')
+NOT_METHODS = ['if', 'for', 'while', 'switch', 'catch', 'synchronized', 'return', 'throw', 'new', 'this', 'super']
+
+"""
+wrap() returns the function to run for a static method: function itself, or function behind an LRU
+cache keyed by the tuple of arguments if the method is memoized.  Exceptions are not cached, so a call
+that throws throws again when it is repeated.
+
+Arguments:
+cls -- the ClassObj the method belongs to
+method -- the Method
+function -- the Python function that runs the method's body
+classes -- the classes declared in the REPL, by name
+"""
+def wrap(cls, method, function, classes):
+    if not enabled or not (automatic or cls.name in opted_in or ANNOTATION in method.annotations):
+        return function
+    name = "{0}.{1}/{2}".format(cls.name, method.name, len(method.args))
+    reason = impurity(cls, method, classes)
+    if reason is not None:
+        diagnostics.note("memoize", "not memoizing {0}: {1}".format(name, reason))
+        return function
+    diagnostics.note("memoize", "memoizing " + name)
+    caches[name] = functools.lru_cache(maxsize=MAX_SIZE, typed=True)(function)
+    return caches[name]
+
+"""
+impurity() is the purity analysis.  A static method is pure if its parameters and result are primitives
+or Strings, it neither reads nor writes a field that is not final, does no I/O, allocates no objects
+(arrays are allowed) and calls only pure methods: pure static methods of the REPL's classes, pure library
+functions such as Math.max, and String methods called on a String parameter or local variable.  A local
+variable with the name of a field is taken for the field, so the analysis errs on the side of impure.
+
+Arguments:
+cls -- the ClassObj the method belongs to
+method -- the Method
+classes -- the classes declared in the REPL, by name
+assumed -- the methods of cls assumed to be pure, while the analysis is inside them (recursion)
+
+Returns:
+None if the method is pure, otherwise the reason it is not
+"""
+def impurity(cls, method, classes, assumed=()):
+    if not method.static:
+        return "not static"
+    if method.type not in TYPES:
+        return "returns " + str(method.type)
+    for arg in method.args:
+        if arg.type not in TYPES:
+            return "takes a " + arg.type
+    body = natives.blank_literals(blocks.respace(method.body))
+    if "System." in body:
+        return "does I/O"
+    if re.search(r'\bnew\s+[\w.<>]+\s*\(', body):
+        return "allocates objects"
+    fields = [name for name, var in cls.instance_attr.items() if not var.final]
+    for name in NAME_PATTERN.findall(body):
+        if name in fields:
+            return "uses field " + name
+    for owner, name in MEMBER_PATTERN.findall(body):
+        variable = classes[owner].instance_attr.get(name) if owner in classes else None
+        if variable is not None and not variable.final:
+            return "uses field " + owner + "." + name
+
+    # The receivers that hold Strings, whose methods are pure.  "" stands for the result of a call, an
+    # array element or a literal: the call is checked in turn, and a pure method returns a primitive or
+    # a String, as the elements of the arrays a pure method can reach are.
+    strings = set(STRING_DECLARATION.findall(body)) | {arg.name for arg in method.args if arg.type == STRING}
+    strings.add("")
+    assumed = assumed + (method,)
+    called = [(None, name) for name in CALL_PATTERN.findall(body) if name not in NOT_METHODS]
+    for match in MEMBER_CALL_PATTERN.finditer(body):
+        receiver, name = match.groups()
+        if receiver is None and body[:match.start()].rstrip()[-1:] not in ')]"':
+            return "calls " + name + " on a field"
+        called.append((receiver or "", name))
+    for receiver, name in called:
+        owner = cls if receiver in (None, cls.name) else classes.get(receiver)
+        if owner is not None:
+            qualified = name if owner is cls else receiver + "." + name
+            targets = [target for (target_name, _), target in owner.methods.items() if target_name == name]
+            if not targets:
+                return "calls unknown method " + qualified
+            for target in targets:
+                if target not in assumed and impurity(owner, target, classes, assumed) is not None:
+                    return "calls impure method " + qualified
+        elif receiver + "." + name not in stdlib.PURE_FUNCTIONS and \
+                (receiver not in strings or name not in stdlib.STRING_METHODS):
+            return "calls " + (receiver + "." if receiver else "") + name
+    return None
+
+"""
+stats() returns the hit and miss counts of the memoized methods.
+
+Returns:
+A dictionary from "Class.method/arity" to the method cache's functools cache_info() (hits, misses,
+maxsize, currsize)
+"""
+def stats():
+    return {name: cached.cache_info() for name, cached in caches.items()}
+
+"""
+report() returns the statistics of the memoized methods as a human-readable string, one method per line.
+"""
+def report():
+    lines = ["---------------Memoization--------------"]
+    for name, info in sorted(stats().items()):
+        lines.append("{0:<24}{1:>8} hits{2:>8} misses".format(name, info.hits, info.misses))
+    return "\n".join(lines)
+
+"""
+clear() empties the caches and forgets the memoized methods.
+"""
+def clear():
+    for cached in caches.values():
+        cached.cache_clear()
+    caches.clear()
@@ -0,0 +1,128 @@
+"""
+memoize_test.py
+
+Testing harness for memoize.py. Run with
+
+    python3 memoize_test.py
+
+This file is designed to run on python3
+"""
+
+import sys
+sys.path.append(sys.path[0] + '/../')
+
+from compiler.compile_eval import load_str
+import memoize
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+SOURCE = """class M { int count; final int limit = 3;
+    static int fib(int n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+    static int even(int n) { if (n == 0) { return 1; } return odd(n - 1); }
+    static int odd(int n) { if (n == 0) { return 0; } return even(n - 1); }
+    static int clamp(int a) { return Math.max(0, Math.min(a, limit)); }
+    static int len(String s) { return s.trim().length(); }
+    static int grid(int n) { int[] row = new int[n]; return row.length; }
+    static int print(int n) { System.out.println(n); return n; }
+    static int counter(int n) { count += n; return count; }
+    static int random(int n) { return (int) (Math.random() * n); }
+    static int list(int n) { ArrayList<Integer> xs = new ArrayList<>(); return n; }
+    static int calls(int n) { return print(n); }
+    static void nothing(int n) { }
+    static int sum(int[] a) { return 0; }
+    static int word(int n) { String w = "ab"; return w.length() + "cd".length() + Counter.LIMIT; }
+    static int tally(int n) { return Counter.hits + n; }
+    static int seen(int n) { return Counter.contains(n) ? 1 : 0; }
+    static int bumped(int n) { return Counter.length(); }
+    int instance(int n) { return n; } }
+class Counter { static int hits; static final int LIMIT = 3; int total;
+    boolean contains(int x) { return x < total; }
+    static int length() { hits++; return hits; } }"""
+
+def impurity_test():
+    print("*---- impurity Test ----*")
+    classes = load_str(SOURCE)
+    cls = classes['M']
+    method = lambda name: [m for (n, _), m in cls.methods.items() if n == name][0]
+
+    print("  --- pure ---")
+    for name in ['fib', 'even', 'odd', 'clamp', 'len', 'grid', 'word']:
+        assert_equal(memoize.impurity(cls, method(name), classes), None)
+
+    print("  --- impure ---")
+    assert_equal(memoize.impurity(cls, method('print'), classes), 'does I/O')
+    assert_equal(memoize.impurity(cls, method('counter'), classes), 'uses field count')
+    assert_equal(memoize.impurity(cls, method('random'), classes), 'calls Math.random')
+    assert_equal(memoize.impurity(cls, method('list'), classes), 'allocates objects')
+    assert_equal(memoize.impurity(cls, method('calls'), classes), 'calls impure method print')
+    assert_equal(memoize.impurity(cls, method('nothing'), classes), 'returns void')
+    assert_equal(memoize.impurity(cls, method('sum'), classes), 'takes a int[]')
+    assert_equal(memoize.impurity(cls, method('instance'), classes), 'not static')
+    assert_equal(memoize.impurity(cls, method('tally'), classes), 'uses field Counter.hits')
+    assert_equal(memoize.impurity(cls, method('seen'), classes), 'calls impure method Counter.contains')
+    assert_equal(memoize.impurity(cls, method('bumped'), classes), 'calls impure method Counter.length')
+
+    print('All tests passed!\n')
+
+def wrap_test():
+    print("*---- wrap Test ----*")
+    global function
+    classes = load_str("""class W { @Memoize static int sq(int n) { return n * n; }
+        static int cube(int n) { return n * n * n; } }""")
+    cls = classes['W']
+    sq, cube = cls.methods[('sq', 1)], cls.methods[('cube', 1)]
+    runs = []
+    def square(n):
+        runs.append(n)
+        return n * n
+
+    print("  --- opt-in ---")
+    memoize.clear()
+    function = memoize.wrap(cls, sq, square, classes)
+    assert_equal(function(3), 9)
+    assert_equal(function(3), 9)
+    assert_equal(runs, [3])
+    assert_equal(memoize.stats()['W.sq/1'].hits, 1)
+    assert_equal(memoize.stats()['W.sq/1'].misses, 1)
+    assert_equal(memoize.wrap(cls, cube, square, classes) is square, True)
+    memoize.opted_in.add('W')
+    assert_equal(memoize.wrap(cls, cube, square, classes) is square, False)
+    memoize.opted_in.clear()
+
+    print("  --- switched off ---")
+    memoize.enabled = False
+    assert_equal(memoize.wrap(cls, sq, square, classes) is square, True)
+    memoize.enabled = True
+
+    print("  --- exceptions are not cached ---")
+    def failing(n):
+        runs.append(n)
+        raise ZeroDivisionError("/ by zero")
+    function = memoize.wrap(cls, sq, failing, classes)
+    assert_error("function(0)", ZeroDivisionError)
+    assert_error("function(0)", ZeroDivisionError)
+    memoize.clear()
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    impurity_test()
+    wrap_test()
@@ -0,0 +1,214 @@
+'''
+natives.py
+Support for Java library classes that are implemented natively in Python (StringBuilder, ArrayList, ...).
+Instances are stored directly in Variables; a method call "receiver.method(args)" on one is carried out by
+calling the Python method of the same name.
+'''
+import re
+import ast
+import struct
+from constants import INT
+from exceptions import JavaNameError
+from util import narrow
+
+CALL_PATTERN = r'(?<![\w.$])([a-zA-Z_]\w*)\s*\.\s*([a-zA-Z_]\w*)\s*\('
+CHAINED_CALL_PATTERN = r'\s*\.\s*([a-zA-Z_]\w*)\s*\('
+CREATION_PATTERN = r'new\s+([A-Z]\w*)\s*\((.*)\)$'
+STRING_LITERAL = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+# Type arguments, "<String, List<Integer>>", directly after a class name.  Type arguments are erased, so
+# "ArrayList<Integer>" is the same type as "ArrayList" to the interpreter.
+TYPE_ARGUMENTS = r'\b[A-Z]\w*<(?:[\w\s,.?\[\]]|<[\w\s,.?\[\]]*>)*>'
+
+# Java class name -> Python class, filled in by register()
+CLASSES = {}
+# Names of the Java interfaces the registered classes implement ("List", "Map", ...)
+INTERFACES = set()
+# The file the program's output (System.out, printStackTrace()) is written to; None for standard output
+out = None
+
+class NativeObject(object):
+    """Base class of natively implemented Java objects.  Subclasses list the Java methods they implement
+    in methods; every other attribute is hidden from Java code.  interfaces lists the Java interfaces
+    the class implements, which may be used as the declared type of a variable holding one.
+    """
+    methods = ['toString', 'hashCode', 'equals', 'wait', 'notify', 'notifyAll']
+    interfaces = ()
+
+    def call(self, name, args):
+        if name not in self.methods:
+            raise JavaNameError("cannot find symbol: method {0} in {1}".format(name, self.get_datatype()))
+        return getattr(self, name)(*args)
+
+    def get_datatype(self):
+        return type(self).__name__
+
+    def toString(self):
+        return "{0}@{1:x}".format(self.get_datatype(), id(self))
+
+    def hashCode(self):
+        return id(self) & 0x7fffffff
+
+    def equals(self, other):
+        return self is other
+
+    # The object's monitor, as in Java (see greenthreads.py)
+    def wait(self, millis=0):
+        import greenthreads
+        greenthreads.wait(self, millis)
+
+    def notify(self):
+        import greenthreads
+        greenthreads.notify(self)
+
+    def notifyAll(self):
+        import greenthreads
+        greenthreads.notify(self, everyone=True)
+
+    def __str__(self):
+        # The text the evaluator substitutes for the object: its string form, as a literal.
+        return '"' + self.toString() + '"'
+
+    # Python dictionaries and sets use the Java methods, so objects used as keys behave as in Java.
+    def __eq__(self, other):
+        return self.equals(other)
+
+    def __hash__(self):
+        return self.hashCode()
+
+"""
+register() is a class decorator that makes a NativeObject subclass available to Java code under the
+class's own name.
+"""
+def register(cls):
+    CLASSES[cls.__name__] = cls
+    INTERFACES.update(cls.interfaces)
+    return cls
+
+@register
+class Object(NativeObject):
+    """java.lang.Object, as a program makes one to use as a lock."""
+
+"""
+is_native_type() returns True if the datatype names a natively implemented class, or an interface one
+of them implements.
+"""
+def is_native_type(datatype):
+    return datatype in CLASSES or datatype in INTERFACES
+
+"""
+is_instance() returns True if value is a native object that can be stored in a variable of the given
+datatype, i.e. its class is the datatype, extends it or implements it.
+"""
+def is_instance(value, datatype):
+    return isinstance(value, NativeObject) and \
+        (datatype in value.interfaces or any(cls.__name__ == datatype for cls in type(value).__mro__))
+
+"""
+java_hash() returns the hash code Java gives a value: String.hashCode() for strings, Integer.hashCode(),
+Double.hashCode() and Boolean.hashCode() for the boxed primitives, and hashCode() for objects.
+
+>>> java_hash("ab")
+3105
+>>> java_hash(True)
+1231
+"""
+def java_hash(value):
+    if value is None:
+        return 0
+    if type(value) is bool:
+        return 1231 if value else 1237
+    if type(value) is int:
+        if narrow(value, INT) == value:
+            return value
+        bits = value & 0xffffffffffffffff     # a long
+        return narrow(bits ^ (bits >> 32), INT)
+    if type(value) is float:
+        bits = struct.unpack('>Q', struct.pack('>d', value))[0]
+        return narrow(bits ^ (bits >> 32), INT)
+    if type(value) is str:
+        code = 0
+        for char in value:
+            code = (31 * code + ord(char)) & 0xffffffff
+        return narrow(code, INT)
+    if isinstance(value, NativeObject):
+        return value.hashCode()
+    return narrow(hash(value), INT)
+
+"""
+erase_generics() removes the type arguments from a statement, outside of string literals.
+
+>>> erase_generics('HashMap<String, List<Integer>> m = new HashMap<>()')
+'HashMap m = new HashMap()'
+"""
+def erase_generics(text):
+    if '<' not in text:
+        return text
+    return re.sub(STRING_LITERAL + '|' + TYPE_ARGUMENTS,
+                  lambda match: match.group(0) if match.group(0)[0] in '"\'' else match.group(0).split('<')[0], text)
+
+"""
+initial_value() returns the value an instance variable of a new interface.structures.Instance starts
+with.  An initializer that creates a natively implemented object with literal arguments, such as
+"new ArrayList<>()", is carried out, so that every instance gets its own object; other values are
+returned unchanged, to be evaluated by the interpreter.
+
+Arguments:
+variable -- the class's Variable for the instance variable
+
+Returns:
+The initial value
+"""
+def initial_value(variable):
+    match = re.match(CREATION_PATTERN, erase_generics(variable.value)) if type(variable.value) is str else None
+    if not match or match.group(1) not in CLASSES:
+        return variable.value
+    try:
+        args = [ast.literal_eval(arg) for arg in split_arguments(match.group(2))]
+    except (ValueError, SyntaxError):
+        return variable.value
+    return CLASSES[match.group(1)](*args)
+
+"""
+blank_literals() replaces the contents of string and char literals with spaces, so that their contents
+are not mistaken for code.  Unlike loop_analysis.strip_literals(), offsets into the text are unchanged.
+"""
+def blank_literals(text):
+    return re.sub(STRING_LITERAL, lambda match: match.group(0)[0] + " " * (len(match.group(0)) - 2) + match.group(0)[-1], text)
+
+"""
+find_closing() returns the index of the parenthesis that closes the one at index start.
+
+Exceptions:
+SyntaxError -- raised if the parenthesis is never closed
+"""
+def find_closing(text, start):
+    blanked, depth = blank_literals(text), 0
+    for index in range(start, len(blanked)):
+        if blanked[index] in "([":
+            depth += 1
+        elif blanked[index] in ")]":
+            depth -= 1
+            if depth == 0:
+                return index
+    raise SyntaxError("'(' was never closed: " + text)
+
+"""
+split_arguments() splits the text between the parentheses of a call into its argument expressions.
+
+>>> split_arguments('a, f(b, c), "x,y"')
+['a', 'f(b, c)', '"x,y"']
+"""
+def split_arguments(text):
+    if not text.strip():
+        return []
+    blanked, depth, arguments, start = blank_literals(text), 0, [], 0
+    for index, char in enumerate(blanked):
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            arguments.append(text[start:index].strip())
+            start = index + 1
+    arguments.append(text[start:].strip())
+    return arguments
@@ -0,0 +1,136 @@
+'''
+operators.py
+Java semantics for the arithmetic done by compound assignments ("x += y", "a[i] <<= 2") and increments
+("i++", "--count").  The result of x op= y is (T) (x op y), where T is the datatype of x, so every
+result is narrowed back to the datatype of the slot it is written to.
+'''
+import math
+from decimal import Decimal
+from constants import *
+from exceptions import InvalidDatatypeException
+from util import narrow
+
+INTEGRAL_OPERATORS = ['+', '-', '*', '/', '%', '&', '|', '^', '<<', '>>', '>>>']
+FLOAT_OPERATORS = ['+', '-', '*', '/', '%']
+BOOLEAN_OPERATORS = ['&', '|', '^']
+CHAR_BITS = 16
+
+"""
+apply() computes the value a compound assignment stores.
+
+Arguments:
+operator -- the operator without its "=", e.g. "+" for "+=" or ">>>" for ">>>="
+left -- the current value of the slot being assigned
+right -- the value of the right-hand side
+datatype -- the datatype of the slot being assigned
+
+Returns:
+The new value of the slot, narrowed to datatype
+
+Exceptions:
+InvalidDatatypeException -- raised if the operator cannot be applied to values of these datatypes
+ZeroDivisionError -- raised for integral division or remainder by zero
+"""
+def apply(operator, left, right, datatype):
+    if datatype == STRING and operator == '+':
+        return java_string(left) + java_string(right)
+    if datatype == BOOLEAN and operator in BOOLEAN_OPERATORS and type(right) is bool:
+        return {'&': left and right, '|': left or right, '^': left != right}[operator]
+    if datatype == CHAR and type(left) is str and len(left) == 1:
+        result = apply(operator, ord(left), right, INT)
+        return chr(result & ((1 << CHAR_BITS) - 1))
+    if type(right) is str and len(right) == 1 and datatype not in STRING_TYPES:
+        right = ord(right)  # chars are promoted to int
+    if type(left) not in (int, float) or type(right) not in (int, float):
+        raise InvalidDatatypeException("bad operand types for " + operator + "=: " + str(datatype) + ", " + type(right).__name__)
+
+    if datatype in FLOAT_TYPES or type(right) is float:
+        if operator not in FLOAT_OPERATORS:
+            raise InvalidDatatypeException("bad operand types for " + operator + "=: " + str(datatype) + ", " + type(right).__name__)
+        result = float_arithmetic(operator, float(left), float(right))
+        return narrow(result, datatype) if datatype in FLOAT_TYPES else cast_to_integral(result, datatype)
+    if datatype not in INT_TYPES or operator not in INTEGRAL_OPERATORS:
+        raise InvalidDatatypeException("bad operand types for " + operator + "=: " + str(datatype))
+    return narrow(integral_arithmetic(operator, left, right, INT_BITS[LONG] if datatype == LONG else INT_BITS[INT]), datatype)
+
+"""
+integral_arithmetic() applies a binary operator to two integral values computed in a type of the given
+width.  Division truncates towards zero and shift distances are masked, as in Java.
+"""
+def integral_arithmetic(operator, left, right, bits):
+    if operator in ['/', '%']:
+        if right == 0:
+            raise ZeroDivisionError("/ by zero")
+        quotient = abs(left) // abs(right) * (1 if (left < 0) == (right < 0) else -1)
+        return quotient if operator == '/' else left - right * quotient
+    if operator in ['<<', '>>', '>>>']:
+        right &= bits - 1
+        if operator == '<<':
+            return left << right
+        if operator == '>>':
+            return left >> right
+        return (left & ((1 << bits) - 1)) >> right
+    return {'+': left + right, '-': left - right, '*': left * right,
+            '&': left & right, '|': left | right, '^': left ^ right}[operator]
+
+"""
+float_arithmetic() applies a binary operator to two floating point values.  Division by zero gives an
+infinity or NaN instead of raising, and % is the truncating remainder, as in Java.
+"""
+def float_arithmetic(operator, left, right):
+    if operator == '/':
+        if right == 0:
+            return math.nan if left == 0 or math.isnan(left) else math.copysign(math.inf, left) * math.copysign(1, right)
+        return left / right
+    if operator == '%':
+        return math.nan if right == 0 or math.isinf(left) else math.fmod(left, right)
+    return {'+': left + right, '-': left - right, '*': left * right}[operator]
+
+"""
+cast_to_integral() converts a floating point result to an integral datatype the way a Java cast does:
+NaN becomes 0 and out-of-range values saturate to the nearest bound of int (or long) before being
+narrowed further.
+"""
+def cast_to_integral(value, datatype):
+    if math.isnan(value):
+        return 0
+    bits = INT_BITS[LONG] if datatype == LONG else INT_BITS[INT]
+    low, high = -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+    if value <= low:
+        return narrow(low, datatype)
+    if value >= high:
+        return narrow(high, datatype)
+    return narrow(int(value), datatype)
+
+"""
+java_string() converts a value to a string the way Java string concatenation does.
+
+>>> java_string(True), java_string(None), java_string(2.0), java_string(1e10)
+('true', 'null', '2.0', '1.0E10')
+"""
+def java_string(value):
+    if value is None:
+        return "null"
+    if type(value) is bool:
+        return "true" if value else "false"
+    if type(value) is float:
+        return java_double_string(value)
+    if hasattr(value, 'toString'):
+        return value.toString()
+    return str(value)
+
+"""
+java_double_string() formats a double like Double.toString(): plain notation between 10^-3 and 10^7,
+and computerized scientific notation ("1.0E10") outside of it.
+"""
+def java_double_string(value):
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value == 0 or 1e-3 <= abs(value) < 1e7:
+        return repr(value)
+    sign, digits, exponent = Decimal(repr(value)).normalize().as_tuple()
+    digits = "".join(map(str, digits))
+    mantissa = digits[0] + "." + (digits[1:] or "0")
+    return ("-" if sign else "") + mantissa + "E" + str(exponent + len(digits) - 1)
@@ -0,0 +1,65 @@
+"""
+operators_test.py
+
+Testing harness for operators.py. Run with
+
+    python3 operators_test.py
+
+This file is designed to run on python3
+"""
+
+from operators import *
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+def operators_test():
+    print("*---- operators Test ----*")
+
+    print("  --- integral ---")
+    assert_equal(apply('+', 2 ** 31 - 1, 1, 'int'), -2 ** 31)
+    assert_equal(apply('-', -32768, 1, 'short'), 32767)
+    assert_equal(apply('/', -7, 2, 'int'), -3)
+    assert_equal(apply('%', -7, 2, 'int'), -1)
+    assert_equal(apply('<<', 1, 33, 'int'), 2)
+    assert_equal(apply('>>>', -1, 28, 'int'), 15)
+    assert_equal(apply('>>>', -1, 60, 'long'), 15)
+    assert_error("apply('/', 1, 0, 'int')", ZeroDivisionError)
+
+    print("  --- implicit narrowing ---")
+    assert_equal(apply('*', 5, 1.5, 'int'), 7)
+    assert_equal(apply('*', 3, 1e20, 'int'), 2 ** 31 - 1)
+    assert_equal(apply('+', 'a', 1, 'char'), 'b')
+    assert_error("apply('<<', 1.0, 2, 'double')", InvalidDatatypeException)
+    assert_error("apply('+', 1, True, 'int')", InvalidDatatypeException)
+
+    print("  --- floating point, boolean and String ---")
+    assert_equal(apply('/', 1.0, 0, 'double'), float('inf'))
+    assert_equal(apply('%', 5.5, 2, 'double'), 1.5)
+    assert_equal(apply('^', True, True, 'boolean'), False)
+    assert_equal(apply('+', 'ab', 2.0, 'String'), 'ab2.0')
+    assert_equal(apply('+', None, True, 'String'), 'nulltrue')
+    assert_equal(java_string(1e10), '1.0E10')
+    assert_equal(java_string(-1.5e-5), '-1.5E-5')
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    operators_test()
@@ -0,0 +1,334 @@
+'''
+session.py
+Interpreter sessions, for embedding the interpreter in other programs.  An InterpreterSession owns
+everything a program run in the REPL would leave behind: its stack and instance variables, the classes
+it declared, its compiled and memoized methods, its output and its settings.  Sessions are independent,
+so any number of them can be kept in one process:
+
+    session = InterpreterSession()
+    session.load("class M { static int sq(int x) { return x * x; } }")
+    session.execute("int n = M.sq(4); System.out.println(n);")
+    session.call("M", "sq", [5])        # 25
+    session.output()                    # "16\n"
+
+The interpreter keeps the state of the running program in module globals (javarepl.stack and so on).
+A session binds its own state into those globals while it runs, and takes it back afterwards; a lock
+lets only one session run at a time, so sessions can be used from different threads.
+'''
+import os
+import io
+import sys
+import copy
+import threading
+import itertools
+import contextlib
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import javarepl
+import control
+import diagnostics
+import greenthreads
+import inline
+import instrument
+import limits
+import memoize
+import natives
+import throwables
+from exceptions import JavaNameError
+from interface import structures
+from interface.structures import ConstantPool
+from interface.exceptions import CompileException
+from interface import serialize
+
+sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))  # Each Java call takes a few dozen Python frames.
+
+# The library classes, which every session starts with; the exception classes a session declares are
+# its own.
+LIBRARY_CLASSES = dict(natives.CLASSES)
+LIBRARY_INTERFACES = set(natives.INTERFACES)
+
+# The state of a running program: (module, global, function making its initial value)
+STATE = [(javarepl, 'unevaled', str), (javarepl, 'memory', list), (javarepl, 'stack', lambda: [{}]),
+         (javarepl, 'instance_variables', dict), (javarepl, 'continue_prompt', bool),
+         (javarepl, 'unchecked_accesses', set), (javarepl, 'classes', dict), (javarepl, 'class_context', list),
+         (javarepl, 'compiled_methods', dict), (javarepl, 'constants', ConstantPool), (structures, 'interned', dict),
+         (throwables, 'call_stack', lambda: ['main']),
+         (natives, 'CLASSES', lambda: dict(LIBRARY_CLASSES)), (natives, 'INTERFACES', lambda: set(LIBRARY_INTERFACES)),
+         (natives, 'out', lambda: None), (memoize, 'caches', dict), (memoize, 'opted_in', set),
+         (inline, 'decisions', dict), (instrument, 'counts', Counter), (diagnostics, 'entries', list),
+         (limits, 'heap', limits.Heap), (limits, 'fuel', lambda: limits.CHECK_INTERVAL),
+         (limits, 'granted', lambda: limits.CHECK_INTERVAL), (limits, 'remaining', lambda: None),
+         (limits, 'deadline', lambda: None), (limits, 'executed', int), (limits, 'slice_left', lambda: None),
+         (limits, 'switch', lambda: None), (limits, 'switch_left', lambda: None),
+         (greenthreads, 'scheduler', lambda: None), (greenthreads, 'numbers', itertools.count)]
+OUT = [attribute for module, attribute, factory in STATE].index('out')     # Where the session's out is kept
+# The state a clone of a session starts afresh rather than copies: the functions compiled and memoized
+# for the methods of its classes run the original's classes, and are made again for the copies.
+FRESH = {'compiled_methods', 'caches', 'decisions', 'out', 'scheduler'}
+# The settings of a session, which the REPL takes from its command line: name -> (module, global)
+SETTINGS = {'stats': (instrument, 'enabled'), 'diagnostics': (diagnostics, 'enabled'),
+            'memoize': (memoize, 'enabled'), 'memoize_all': (memoize, 'automatic'),
+            'budget': (limits, 'budget'), 'time_limit': (limits, 'time_limit'), 'heap_quota': (limits, 'heap_quota'),
+            'slice_size': (limits, 'slice_size'), 'preempt': (limits, 'preempt'),
+            'quantum': (limits, 'quantum'), 'schedule_seed': (greenthreads, 'schedule_seed')}
+
+class EngineLock(object):
+    """A reentrant lock, as threading.RLock, held by the thread running a session.  The Java threads of the
+    program it runs (see greenthreads.py) run on threads of their own, and hold the lock on its behalf.
+    """
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.owner = None
+        self.count = 0
+
+    def identity(self):
+        ident = threading.get_ident()
+        return greenthreads.acting_for.get(ident, ident)
+
+    def acquire(self):
+        me = self.identity()
+        with self.condition:
+            while self.owner is not None and self.owner != me:
+                self.condition.wait()
+            self.owner = me
+            self.count += 1
+
+    def release(self):
+        with self.condition:
+            if self.owner != self.identity():
+                raise RuntimeError("cannot release un-acquired lock")
+            self.count -= 1
+            if self.count == 0:
+                self.owner = None
+                self.condition.notify()
+
+    def __enter__(self):
+        self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+engine_lock = EngineLock()     # Held by the session running, if any
+
+class InterpreterSession(object):
+    """One interpreter, with its own program state.
+
+    out is the file the program's output is written to; by default it is collected in memory, and read
+    with output().  The keyword arguments are the settings, as the REPL's command line options: stats
+    (--stats), diagnostics (--diagnostics), memoize (off with --no-memoize), memoize_all (--memoize-all),
+    and the limits of limits.py: budget (--budget), time_limit (--time-limit) and heap_quota
+    (--heap-quota).  The budget and the time limit apply to each load(), execute() and call(); the heap
+    quota to the whole session.  slice_size and preempt run the session's jobs in time slices (see
+    timeslice.py).  quantum (--quantum) and schedule_seed (--schedule-seed) are the settings of the
+    program's Java threads (see greenthreads.py).
+    """
+    def __init__(self, out=None, **settings):
+        for name in settings:
+            if name not in SETTINGS:
+                raise TypeError("unknown setting: " + name)
+        self.out = out if out is not None else io.StringIO()
+        self.settings = {name: getattr(module, attribute) for name, (module, attribute) in SETTINGS.items()}
+        self.settings.update(settings)
+        self.state = [factory() for module, attribute, factory in STATE]
+        self.state[OUT] = self.out
+        self.depth = 0  # How many running() blocks of the session are open
+        self.executed = 0   # Instructions run by the last job
+
+    """
+    load() compiles Java source holding one or more classes, and declares them in the session.
+
+    Returns:
+    The names of the classes declared
+
+    Exceptions:
+    SyntaxError -- raised if the source does not compile
+    """
+    def load(self, source):
+        with self.running():
+            return javarepl.declare_classes(source)
+
+    """
+    load_compiled() declares classes compiled elsewhere (by the web server, say), in the form of
+    interface.serialize, without compiling them again.
+
+    Returns:
+    The names of the classes declared
+
+    Exceptions:
+    SyntaxError -- raised if the text is not classes in the form serialize reads
+    """
+    def load_compiled(self, text):
+        try:
+            compiled = serialize.loads(text)
+        except CompileException as error:
+            raise SyntaxError(str(error))
+        with self.running():
+            return javarepl.declare_compiled(compiled)
+
+    """
+    execute() runs one or more complete statements, as the REPL runs a line.  System.out output goes to
+    the session's out.
+
+    Returns:
+    The value of the last statement, if it is an expression with a value, as the REPL would echo it;
+    None otherwise
+
+    Exceptions:
+    JavaException, SyntaxError, ... -- raised as the REPL would report them; the statements before the
+    one raising have run
+    """
+    def execute(self, statements):
+        with self.running():
+            value = None
+            for command in javarepl.parse_block(statements):
+                try:
+                    value = command.eval()
+                except Exception as error:
+                    throwables.record_statement(error, command.str)
+                    raise
+                if type(value) is control.Jump:
+                    control.check_top_level(value)
+                    value = value.value
+            return value
+
+    """
+    call() calls a static method of a class loaded in the session.
+
+    Arguments:
+    cls -- the name of the class
+    method -- the name of the method
+    args -- the arguments, as Python values (ints, floats, strs, ...)
+
+    Returns:
+    The value the method returns
+
+    Exceptions:
+    JavaNameError -- raised if there is no such class or static method
+    """
+    def call(self, cls, method, args=()):
+        with self.running():
+            if cls not in javarepl.classes:
+                raise JavaNameError("cannot find symbol: class " + cls)
+            return javarepl.invoke_static(javarepl.classes[cls], method, list(args))
+
+    """
+    clone() returns a new session in the state this one is in: with its classes, variables and settings,
+    as copies, so that the two go their own ways from there.  A session loaded with libraries once can be
+    cloned for each user, rather than compiling the libraries again.  Its output is collected in memory
+    (see output()).
+    """
+    def clone(self):
+        with engine_lock:
+            state = [getattr(module, attribute) for module, attribute, factory in STATE] if self.depth else self.state
+            twin = InterpreterSession(**self.settings)
+            shared = {id(value): value for value in LIBRARY_CLASSES.values()}   # The library is not copied.
+            for index, (module, attribute, factory) in enumerate(STATE):
+                if attribute not in FRESH:
+                    twin.state[index] = copy.deepcopy(state[index], shared)
+        return twin
+
+    """
+    output() returns the output collected so far, and clears it.  It is only available when the session
+    collects its output in memory, i.e. when no out was given.
+    """
+    def output(self):
+        text = self.out.getvalue()
+        self.out.seek(0)
+        self.out.truncate()
+        return text
+
+    """
+    writing_to() is a context manager sending the output of the jobs run inside it to out (any object with
+    a write() method) rather than to the session's own out, which is restored afterwards.  A web server
+    streaming a job's output, say, writes it to its client as it is written.  It is not to be used while
+    the session is running.
+    """
+    @contextlib.contextmanager
+    def writing_to(self, out):
+        previous = self.out
+        self.out = self.state[OUT] = out
+        try:
+            yield self
+        finally:
+            self.out = self.state[OUT] = previous
+
+    """
+    notes() returns the diagnostics recorded since it was last called (with the diagnostics setting on), as
+    (category, message) pairs, and clears them.
+    """
+    def notes(self):
+        with self.running():
+            entries = list(diagnostics.entries)
+            del diagnostics.entries[:]
+            return entries
+
+    """
+    report() returns the session's instrumentation counters and memoization statistics, as the REPL
+    prints them on exit with --stats.
+    """
+    def report(self):
+        with self.running():
+            return instrument.report() + "\n" + memoize.report()
+
+    """
+    running() is a context manager binding the session's state and settings into the interpreter's
+    globals, for the statements run inside it.  Sessions wait for each other; a session may run inside
+    itself (e.g. from a callback).  Each outermost running() block is a new job for the session's limits;
+    the number of instructions the job ran is kept in executed.
+    """
+    @contextlib.contextmanager
+    def running(self):
+        with engine_lock:
+            self.depth += 1
+            if self.depth > 1:
+                try:
+                    yield self  # Already bound
+                finally:
+                    self.depth -= 1
+                return
+            self.bind()
+            limits.start()
+            try:
+                with greenthreads.program():
+                    yield self
+            finally:
+                self.depth -= 1
+                self.executed = limits.count()
+                self.unbind()
+
+    """
+    paused() is a context manager for a thread running the session (inside running()) to wait in, for its
+    next time slice, say: the session is taken out of the interpreter's globals and other sessions may run
+    until the block ends.  It must not be used while another session is running inside this one.
+    """
+    @contextlib.contextmanager
+    def paused(self):
+        depth = self.depth
+        self.unbind()
+        for _ in range(depth):
+            engine_lock.release()
+        try:
+            yield self
+        finally:
+            for _ in range(depth):
+                engine_lock.acquire()
+            self.bind()
+
+    def bind(self):
+        self.saved = [getattr(module, attribute) for module, attribute, factory in STATE]
+        self.saved_settings = {name: getattr(module, attribute) for name, (module, attribute) in SETTINGS.items()}
+        for (module, attribute, factory), value in zip(STATE, self.state):
+            setattr(module, attribute, value)
+        for name, (module, attribute) in SETTINGS.items():
+            setattr(module, attribute, self.settings[name])
+
+    def unbind(self):
+        # Strings and flags are replaced rather than changed in place, so they are read back.
+        self.state = [getattr(module, attribute) for module, attribute, factory in STATE]
+        for (module, attribute, factory), value in zip(STATE, self.saved):
+            setattr(module, attribute, value)
+        for name, (module, attribute) in SETTINGS.items():
+            setattr(module, attribute, self.saved_settings[name])
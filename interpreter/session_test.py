@@ -0,0 +1,135 @@
+"""
+session_test.py
+
+Testing harness for session.py. Run with
+
+    python3 session_test.py
+
+This file is designed to run on python3
+"""
+
+import threading
+from session import InterpreterSession
+import exceptions
+import javarepl
+from compiler.compile_eval import load_str
+from interface import serialize
+from interface import structures
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+SOURCE = """class M { static int sq(int x) { return x * x; }
+    static int fact(int n) { if (n < 2) { return 1; } return n * fact(n - 1); } }"""
+
+def session_test():
+    print("*---- InterpreterSession Test ----*")
+    global a, b, c
+    a, b = InterpreterSession(), InterpreterSession(diagnostics=True)
+
+    print("  --- load, execute, call ---")
+    assert_equal(a.load(SOURCE), ['M'])
+    assert_equal(a.execute('int n = M.sq(4); System.out.println(n);'), None)
+    assert_equal(a.execute('n + 1'), 17)
+    assert_equal(a.call('M', 'fact', [5]), 120)
+    assert_equal(a.output(), '16\n')
+    assert_error("a.call('M', 'cube', [2])", exceptions.JavaNameError)
+    assert_error("a.load('class {')", SyntaxError)
+
+    print("  --- array bounds proven by a caller's loop ---")
+    a.load('class U { static int get(int[] b, int i) { return b[i]; } }')
+    assert_error("a.execute('int[] b = {1, 2, 3}; int[] c = {1}; int t = 0; for (int i = 0; i < 3; i++) { t += b[i] + U.get(c, i); }')",
+                 exceptions.ArrayIndexOutOfBoundsException)
+
+    print("  --- arguments and results converted to their declared types ---")
+    a.load('class H { static double half(double x) { return x / 2; } static double hn(int n) { double r = half(n); return r; } static int first(String s) { return s.charAt(0); } }')
+    assert_equal(a.call('H', 'half', [5]), 2.5)
+    assert_equal(a.call('H', 'half', [5.0]), 2.5)
+    assert_equal(a.call('H', 'hn', [5]), 2.5)
+    assert_equal(a.call('H', 'first', ['abc']), 97)
+
+    print("  --- output elsewhere ---")
+    pieces = []
+    class Sink(object):
+        def write(self, text):
+            pieces.append(text)
+    with a.writing_to(Sink()):
+        a.execute('System.out.println(M.sq(3)); n + 1')
+    assert_equal(''.join(pieces), '9\n')
+    a.execute('System.out.println(n);')
+    assert_equal(a.output(), '16\n')
+
+    print("  --- classes compiled elsewhere ---")
+    c = InterpreterSession()
+    assert_equal(c.load_compiled(serialize.dumps(load_str(SOURCE))), ['M'])
+    assert_equal(c.call('M', 'fact', [6]), 720)
+    assert_error("c.load_compiled('{\"v\":0}')", SyntaxError)
+
+    print("  --- isolation ---")
+    b.execute('int n = 7;')
+    assert_equal(b.execute('n'), 7)
+    assert_equal(a.execute('n'), 16)
+    assert_error("b.call('M', 'sq', [1])", exceptions.JavaNameError)
+    b.load('class Oops extends RuntimeException { }')
+    b.execute('try { throw new Oops("x"); } catch (Oops e) { System.out.println(e); }')
+    assert_equal(b.output(), 'Oops: x\n')
+    assert_equal('Oops' in javarepl.natives.CLASSES, False)
+    assert_equal(javarepl.classes, {})
+    b.load('class Lit { static String s() { return "only in b"; } }')
+    assert_equal('"only in b"' in structures.interned, False)
+
+    print("  --- clones ---")
+    global d, e
+    d = c.clone()
+    d.execute('int[] v = {1};')
+    e = d.clone()
+    e.execute('v[0] = 2; System.out.println(M.fact(3));')
+    assert_equal(e.execute('v[0]'), 2)
+    assert_equal(d.execute('v[0]'), 1)
+    assert_equal(d.call('M', 'fact', [5]), 120)
+    assert_equal((e.output(), d.output()), ('6\n', ''))
+    assert_error("c.execute('v')", exceptions.JavaNameError)
+    d.load('class L { static int one() { return 1; } }')
+    assert_equal(d.call('L', 'one'), 1)
+    assert_error("e.call('L', 'one')", exceptions.JavaNameError)
+
+    print("  --- settings ---")
+    b.load('class N { static int one(int x) { return x; } static int two(int y) { return one(y) + 1; } }')
+    assert_equal(b.call('N', 'two', [1]), 2)
+    assert_equal(b.notes(), [('inline', 'inlined N.one into N.two')])
+    assert_equal(a.notes(), [])
+    assert_error("InterpreterSession(colour=True)", TypeError)
+
+    print("  --- threads ---")
+    sessions = [InterpreterSession() for _ in range(4)]
+    def run(session, k):
+        session.load(SOURCE)
+        session.execute('int t = 0; for (int i = 0; i < 50; i++) { t += M.sq(' + str(k) + '); }')
+    threads = [threading.Thread(target=run, args=(session, k)) for k, session in enumerate(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert_equal([session.execute('t') for session in sessions], [0, 50, 200, 450])
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    session_test()
@@ -0,0 +1,224 @@
+'''
+stdlib.py
+The core of the Java standard library, implemented natively: String methods, Math, Integer and
+Character.  Every method is a plain Python function taking its receiver (for String methods) and then
+its arguments; the evaluator looks the functions up once, when an expression is compiled, and calls
+them directly.
+'''
+import re
+import math
+import random
+import unicodedata
+from constants import *
+from exceptions import StringIndexOutOfBoundsException, NumberFormatException, JavaNameError
+from arrays import Array
+from operators import java_string, cast_to_integral
+from util import narrow
+import greenthreads
+
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+def check_string_index(text, index, limit):
+    if type(index) is not int or index < 0 or index > limit:
+        raise StringIndexOutOfBoundsException("index " + str(index) + ", length " + str(len(text)))
+
+def char_at(text, index):
+    check_string_index(text, index, len(text) - 1)
+    return text[index]
+
+def substring(text, begin, end=None):
+    end = len(text) if end is None else end
+    check_string_index(text, begin, len(text))
+    check_string_index(text, end, len(text))
+    if begin > end:
+        raise StringIndexOutOfBoundsException("begin " + str(begin) + ", end " + str(end) + ", length " + str(len(text)))
+    return text[begin:end]
+
+def index_of(text, target, start=0):
+    return text.find(java_string(target), max(start, 0))
+
+def equals(text, other):
+    return type(other) is str and text == other
+
+def compare_to(text, other):
+    for left, right in zip(text, other):
+        if left != right:
+            return ord(left) - ord(right)
+    return len(text) - len(other)
+
+"""
+split() splits a String around matches of a regular expression, returning a String[].  As in Java, a
+limit of 0 drops trailing empty strings, and a zero-width match at the start never produces a leading
+empty string.
+"""
+def split(text, regex, limit=0):
+    pieces, start = [], 0
+    for match in re.finditer(regex, text):
+        if limit > 0 and len(pieces) == limit - 1:
+            break
+        if match.end() > 0:
+            pieces.append(text[start:match.start()])
+            start = match.end()
+    matched = len(pieces) > 0
+    pieces.append(text[start:])
+    while limit == 0 and matched and pieces and pieces[-1] == "":
+        pieces.pop()
+    return Array(STRING, len(pieces), pieces)
+
+def parse_int(text, radix=10):
+    digits = text[1:] if type(text) is str and text[:1] in "+-" else text
+    if type(text) is not str or not re.match(r'[0-9a-zA-Z]+$', digits) or any(int(digit, 36) >= radix for digit in digits):
+        raise NumberFormatException('For input string: "' + str(text) + '"')
+    value = int(text, radix)
+    if value < INT_MIN or value > INT_MAX:
+        raise NumberFormatException('For input string: "' + text + '"')
+    return value
+
+def integer_value_of(value, radix=10):
+    """Integer.valueOf(int) boxes an int; Integer.valueOf(String) parses one, as parseInt()."""
+    return value if type(value) is int else parse_int(value, radix)
+
+# Java's Character.isLetter() and isDigit() go by Unicode category; str.isalpha() agrees, but str.isdigit()
+# also takes superscripts and other numbers ('²'), which are not digits to Java.
+LETTERS = ('Lu', 'Ll', 'Lt', 'Lm', 'Lo')
+
+def is_digit(char):
+    return unicodedata.category(char) == 'Nd'
+
+def is_letter(char):
+    return unicodedata.category(char) in LETTERS
+
+def integer_to_string(value, radix=10):
+    if radix == 10:
+        return str(value)
+    digits, number = "", abs(value)
+    while True:
+        digits = "0123456789abcdefghijklmnopqrstuvwxyz"[number % radix] + digits
+        number //= radix
+        if number == 0:
+            return ("-" if value < 0 else "") + digits
+
+def java_round(value):
+    if math.isnan(value):
+        return 0
+    return cast_to_integral(float(math.floor(value + 0.5)), LONG if type(value) is float else INT)
+
+def java_sqrt(value):
+    return math.sqrt(value) if value >= 0 else math.nan
+
+def java_log(value):
+    if value == 0:
+        return -math.inf
+    return math.log(value) if value > 0 else math.nan
+
+def java_log10(value):
+    if value == 0:
+        return -math.inf
+    return math.log10(value) if value > 0 else math.nan
+
+def java_pow(base, exponent):
+    try:
+        return math.pow(base, exponent)
+    except (OverflowError, ValueError):
+        return math.inf if base > 0 or float(exponent).is_integer() and exponent % 2 == 0 else math.nan
+
+def java_abs(value):
+    result = abs(value)
+    return narrow(result, INT) if result == 2 ** 31 else result     # Math.abs(Integer.MIN_VALUE) overflows
+
+def signum(value):
+    return math.copysign(1.0, value) if value != 0 and not math.isnan(value) else float(value)
+
+def floor_div(left, right):
+    if right == 0:
+        raise ZeroDivisionError("/ by zero")
+    return left // right
+
+def floor_mod(left, right):
+    if right == 0:
+        raise ZeroDivisionError("/ by zero")
+    return left % right
+
+STRING_METHODS = {
+    'charAt': char_at,
+    'substring': substring,
+    'indexOf': index_of,
+    'length': len,
+    'equals': equals,
+    'compareTo': compare_to,
+    'split': split,
+    'isEmpty': lambda text: len(text) == 0,
+    'contains': lambda text, target: java_string(target) in text,
+    'startsWith': lambda text, prefix: text.startswith(prefix),
+    'endsWith': lambda text, suffix: text.endswith(suffix),
+    'toUpperCase': lambda text: text.upper(),
+    'toLowerCase': lambda text: text.lower(),
+    'trim': lambda text: text.strip(" \t\n\r\f\v\0"),
+    'toString': lambda text: text,
+}
+
+STATIC_METHODS = {
+    'Math': {
+        'abs': java_abs, 'max': max, 'min': min, 'pow': java_pow, 'sqrt': java_sqrt,
+        'cbrt': lambda value: math.copysign(abs(value) ** (1.0 / 3), value),
+        'floor': lambda value: float(math.floor(value)) if math.isfinite(value) else float(value),
+        'ceil': lambda value: float(math.ceil(value)) if math.isfinite(value) else float(value),
+        'round': java_round, 'random': random.random, 'signum': signum, 'hypot': math.hypot,
+        'exp': math.exp, 'log': java_log, 'log10': java_log10,
+        'sin': math.sin, 'cos': math.cos, 'tan': math.tan, 'asin': math.asin, 'acos': math.acos,
+        'atan': math.atan, 'atan2': math.atan2, 'toRadians': math.radians, 'toDegrees': math.degrees,
+        'floorDiv': floor_div, 'floorMod': floor_mod,
+    },
+    'Integer': {
+        'parseInt': parse_int, 'valueOf': integer_value_of, 'toString': integer_to_string,
+        'max': max, 'min': min, 'compare': lambda left, right: (left > right) - (left < right),
+        'toBinaryString': lambda value: format(value & 0xffffffff, 'b'),
+    },
+    'Character': {
+        'isDigit': is_digit,
+        'isLetter': is_letter,
+        'isLetterOrDigit': lambda char: is_letter(char) or is_digit(char),
+        'isWhitespace': lambda char: char in " \t\n\r\f\x0b\x1c\x1d\x1e\x1f",
+        'isUpperCase': lambda char: char.isupper(),
+        'isLowerCase': lambda char: char.islower(),
+        'toUpperCase': lambda char: char.upper() if len(char.upper()) == 1 else char,
+        'toLowerCase': lambda char: char.lower() if len(char.lower()) == 1 else char,
+        'getNumericValue': lambda char: int(char, 36) if char.isalnum() and char.isascii() else -1,
+    },
+    'String': {
+        'valueOf': java_string,
+    },
+    'Thread': {
+        'sleep': greenthreads.sleep, 'currentThread': greenthreads.current_thread, 'yield': greenthreads.yield_turn,
+    },
+}
+
+STATIC_FIELDS = {
+    'Math': {'PI': math.pi, 'E': math.e},
+    'Integer': {'MAX_VALUE': INT_MAX, 'MIN_VALUE': INT_MIN},
+    'Long': {'MAX_VALUE': 2 ** 63 - 1, 'MIN_VALUE': -2 ** 63},
+    'Double': {'MAX_VALUE': 1.7976931348623157e308, 'MIN_VALUE': 5e-324,
+               'POSITIVE_INFINITY': math.inf, 'NEGATIVE_INFINITY': -math.inf, 'NaN': math.nan},
+}
+
+# Static methods that neither read nor change any state, so calls to them may be moved or repeated.
+PURE_FUNCTIONS = [cls + '.' + name for cls, methods in STATIC_METHODS.items() for name in methods
+                  if (cls, name) != ('Math', 'random') and cls != 'Thread']
+
+"""
+resolve_static() returns the Python function implementing a static library method.
+
+Exceptions:
+JavaNameError -- raised if the class or method is not part of the library
+"""
+def resolve_static(cls, name):
+    if name not in STATIC_METHODS.get(cls, {}):
+        raise JavaNameError("cannot find symbol: method {0} in {1}".format(name, cls))
+    return STATIC_METHODS[cls][name]
+
+"""
+resolve_string_method() returns the Python function implementing a String method, or None if there is
+none (the receiver may turn out to be another kind of object).
+"""
+def resolve_string_method(name):
+    return STRING_METHODS.get(name)
@@ -0,0 +1,84 @@
+"""
+stdlib_test.py
+
+Testing harness for stdlib.py and calls.py. Run with
+
+    python3 stdlib_test.py
+
+This file is designed to run on python3
+"""
+
+from stdlib import *
+from calls import compile_calls
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+def stdlib_test():
+    print("*---- stdlib Test ----*")
+
+    print("  --- String ---")
+    assert_equal(char_at("hello", 1), "e")
+    assert_error("char_at('hello', 5)", StringIndexOutOfBoundsException)
+    assert_equal(substring("hello", 1, 3), "el")
+    assert_error("substring('hello', 3, 1)", StringIndexOutOfBoundsException)
+    assert_equal(index_of("hello", "l", 3), 3)
+    assert_equal(compare_to("apple", "apricot"), -2)
+    assert_equal(compare_to("ab", "abc"), -1)
+    assert_equal(split("a,b,,", ",").items, ["a", "b"])
+    assert_equal(split("", ",").items, [""])
+    assert_equal(split("a1b2c", r"\d", 2).items, ["a", "b2c"])
+
+    print("  --- Math / Integer / Character ---")
+    assert_equal(java_round(-2.5), -2)
+    assert_equal(java_abs(-2 ** 31), -2 ** 31)
+    assert_equal(java_sqrt(-1.0) != java_sqrt(-1.0), True)
+    assert_equal(parse_int("-42"), -42)
+    assert_equal(parse_int("ff", 16), 255)
+    assert_error("parse_int('0x1f', 16)", NumberFormatException)
+    assert_error("parse_int('2147483648')", NumberFormatException)
+    assert_equal(integer_to_string(-255, 16), "-ff")
+    assert_equal(integer_value_of(7), 7)
+    assert_equal(integer_value_of("-7"), -7)
+    assert_equal(integer_value_of("7f", 16), 127)
+    assert_equal(STATIC_METHODS['Character']['isDigit']('7'), True)
+    assert_equal(STATIC_METHODS['Character']['isDigit']('\u0663'), True)    # Arabic-Indic three
+    assert_equal(STATIC_METHODS['Character']['isDigit']('\u00b2'), False)   # Superscript two
+    assert_equal(STATIC_METHODS['Character']['isLetterOrDigit']('\u00bd'), False)
+    assert_equal(STATIC_METHODS['Character']['isLetter']('\u00e9'), True)
+    assert_equal('Math.random' in PURE_FUNCTIONS, False)
+
+    print("  --- compile_calls ---")
+    sites = compile_calls('Math.max(a, s.length()) + Integer.MAX_VALUE')
+    assert_equal([(site.kind, site.receiver) for site in sites], [('static', 'Math'), ('constant', 'Integer')])
+    assert_equal(sites[0].chain[0].function, max)
+    assert_equal(sites[0].chain[0].arguments, ('a', 's.length()'))
+    site, = compile_calls(' "a,b".split(",").length ')
+    assert_equal((site.kind, site.receiver, site.chain[0].function), ('literal', '"a,b"', split))
+    site, = compile_calls('s.substring(1).charAt(0)')
+    assert_equal([call.function for call in site.chain], [substring, char_at])
+    assert_equal(site.whole, True)
+    assert_equal(compile_calls('a.length + 1.5'), ())
+    assert_error("compile_calls('Math.nope(1)')", JavaNameError)
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    stdlib_test()
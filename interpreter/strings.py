@@ -0,0 +1,133 @@
+'''
+strings.py
+Linear-time string building.  A Rope holds a string as a list of chunks and only joins them when the
+string is read, so appending to it is O(1) instead of copying the whole string.  String variables that
+are accumulated with "s += x" or "s = s + x + ..." hold a Rope; StringBuilder is a native class backed
+by one.
+'''
+import re
+from constants import CHAR
+from exceptions import StringIndexOutOfBoundsException
+from operators import java_string
+import natives
+import limits
+
+class Rope(object):
+    """Ropes are charged to the heap as they grow (see limits.grow()), whether they hold a String
+    variable or a StringBuilder."""
+    capacity = 0    # Bytes charged to the heap for the characters
+
+    def __init__(self, text=""):
+        self.chunks = [text] if text else []
+        self.length = 0
+        self.reserve(len(text))
+        self.length = len(text)
+
+    def reserve(self, count):
+        """Charges the heap for count more characters, before they are added."""
+        needed = (self.length + count) * limits.ELEMENT_SIZES[CHAR]
+        if needed > self.capacity:
+            self.capacity = limits.grow(self, self.capacity, needed)
+
+    def append(self, text):
+        if text:
+            self.reserve(len(text))
+            self.chunks.append(text)
+            self.length += len(text)
+
+    def flatten(self):
+        """Joins the chunks into one string, which is kept so that the next read is free."""
+        if len(self.chunks) > 1:
+            self.chunks = ["".join(self.chunks)]
+        return self.chunks[0] if self.chunks else ""
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return '[Rope] {0} chunks, length {1}'.format(len(self.chunks), self.length)
+
+    def __str__(self):
+        # Stored String values are kept with their quotes, so this is what the evaluator substitutes.
+        return '"' + self.flatten() + '"'
+
+@natives.register
+class StringBuilder(natives.NativeObject):
+    methods = natives.NativeObject.methods + ['append', 'insert', 'length', 'charAt', 'reverse', 'setLength']
+
+    def __init__(self, initial=None):
+        # new StringBuilder(16) gives a capacity, which a rope has no use for.
+        self.rope = Rope(initial if type(initial) is str else "")
+
+    def append(self, value):
+        self.rope.append(java_string(value))
+        return self
+
+    def insert(self, offset, value):
+        text = self.toString()
+        if type(offset) is not int or offset < 0 or offset > len(text):
+            raise StringIndexOutOfBoundsException("offset " + str(offset) + ", length " + str(len(text)))
+        value = java_string(value)
+        self.rope = Rope(text[:offset] + value + text[offset:])
+        return self
+
+    def length(self):
+        return len(self.rope)
+
+    def charAt(self, index):
+        if type(index) is not int or index < 0 or index >= len(self.rope):
+            raise StringIndexOutOfBoundsException("index " + str(index) + ", length " + str(len(self.rope)))
+        return self.toString()[index]
+
+    def reverse(self):
+        self.rope = Rope(self.toString()[::-1])
+        return self
+
+    def setLength(self, length):
+        if type(length) is not int or length < 0:
+            raise StringIndexOutOfBoundsException(str(length))
+        text = self.toString()
+        self.rope = Rope(text[:length] + "\u0000" * (length - len(text)))
+
+    def toString(self):
+        return self.rope.flatten()
+
+"""
+concatenate() appends values to a String variable's value, converting each the way Java string
+concatenation does.  The value becomes (or stays) a Rope.
+
+Arguments:
+value -- the stored value of the String variable: a Rope, a quoted string, or None for null
+values -- the values to append, in order
+
+Returns:
+The Rope holding the result
+"""
+def concatenate(value, values):
+    if not isinstance(value, Rope):
+        value = Rope(java_string(value[1:-1] if value is not None else None))
+    for item in values:
+        value.append(java_string(item))
+    return value
+
+"""
+concatenation_terms() splits the right-hand side of "s = s + a + b * c" (the text after "s +") into the
+terms that are appended one after another, ["a", "b * c"].  Returns None if the text contains an
+operator that binds more loosely than + or -, or a binary -, since then it is not a chain of appends.
+"""
+def concatenation_terms(text):
+    blanked, depth, terms, start = natives.blank_literals(text), 0, [], 0
+    for index, char in enumerate(blanked):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif depth > 0:
+            continue
+        elif char == "+" and blanked[index + 1:index + 2] not in ["+", "="] and blanked[index - 1:index] != "+":
+            terms.append(text[start:index].strip())
+            start = index + 1
+        elif char in "<>=!&|?:+" or (char == "-" and blanked[start:index].strip()):
+            return None
+    terms.append(text[start:].strip())
+    return terms if all(terms) else None
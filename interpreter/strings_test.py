@@ -0,0 +1,67 @@
+"""
+strings_test.py
+
+Testing harness for strings.py. Run with
+
+    python3 strings_test.py
+
+This file is designed to run on python3
+"""
+
+from strings import *
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+def strings_test():
+    print("*---- strings Test ----*")
+
+    print("  --- Rope ---")
+    rope = concatenate('"ab"', [1, True, 2.5])
+    assert_equal(len(rope.chunks), 4)
+    assert_equal(str(rope), '"ab1true2.5"')
+    assert_equal(len(rope.chunks), 1)
+    assert_equal(concatenate(None, ['x']).flatten(), 'nullx')
+    assert_equal(concatenate(rope, ['!']) is rope, True)
+
+    print("  --- StringBuilder ---")
+    global sb
+    sb = StringBuilder()
+    sb.call('append', ['ab']).call('append', [3])
+    assert_equal(sb.call('length', []), 3)
+    assert_equal(sb.call('charAt', [1]), 'b')
+    assert_equal(sb.call('insert', [0, 1.0]).toString(), '1.0ab3')
+    assert_equal(sb.call('reverse', []).toString(), '3ba0.1')
+    assert_equal(str(sb), '"3ba0.1"')
+    assert_error("sb.call('charAt', [6])", StringIndexOutOfBoundsException)
+    assert_error("sb.call('insert', [7, 'x'])", StringIndexOutOfBoundsException)
+    assert_error("sb.call('flatten', [])", natives.JavaNameError)
+
+    print("  --- concatenation_terms ---")
+    assert_equal(concatenation_terms(' i + 1'), ['i', '1'])
+    assert_equal(concatenation_terms(' a * (b + c) + "+"'), ['a * (b + c)', '"+"'])
+    assert_equal(concatenation_terms(' -1'), ['-1'])
+    assert_equal(concatenation_terms(' a - 1'), None)
+    assert_equal(concatenation_terms(' a == b'), None)
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    strings_test()
@@ -0,0 +1,146 @@
+'''
+throwables.py
+Java's Throwable classes.  Exceptions are native objects: "new IllegalStateException("bad")" creates
+one like any other object, and a throw statement raises it inside a ThrownException.  The errors the
+interpreter raises on its own, such as ArrayIndexOutOfBoundsException or a division by zero, are
+converted to the Throwable of the same class when a catch clause or the REPL looks at them, so they are
+caught and reported exactly like thrown ones.
+'''
+import exceptions
+import natives
+
+# The methods being run, outermost first.  A Throwable copies the stack when it is created, as Java's
+# fillInStackTrace() does.
+call_stack = ['main']
+
+@natives.register
+class Throwable(natives.NativeObject):
+    methods = natives.NativeObject.methods + ['getMessage', 'getLocalizedMessage', 'getCause', 'printStackTrace']
+    package = 'java.lang'
+
+    def __init__(self, message=None, cause=None):
+        if isinstance(message, Throwable) and cause is None:
+            message, cause = message.toString(), message     # new RuntimeException(cause)
+        self.message, self.cause = message, cause
+        self.frames = list(reversed(call_stack))
+        self.statements = {}    # Frame index -> the statement running in it, recorded as it propagates
+
+    def getMessage(self):
+        return self.message
+
+    def getLocalizedMessage(self):
+        return self.message
+
+    def getCause(self):
+        return self.cause
+
+    def get_name(self):
+        return self.package + "." + self.get_datatype() if self.package else self.get_datatype()
+
+    def toString(self):
+        return self.get_name() + (": " + self.message if self.message is not None else "")
+
+    def printStackTrace(self):
+        print(stack_trace(self), file=natives.out)
+
+"""
+define() creates and registers a Throwable subclass.  It is used for the library exceptions below, and by
+the interpreter for the exception classes declared by Java code.
+
+Arguments:
+name -- the simple name of the class
+base -- the Throwable subclass it extends
+package -- the package shown in its stack traces, or None for a class declared in the REPL
+"""
+def define(name, base, package=None):
+    return natives.register(type(name, (base,), {'package': package}))
+
+for _name, _base, _package in [('Exception', 'Throwable', 'java.lang'),
+                               ('Error', 'Throwable', 'java.lang'),
+                               ('StackOverflowError', 'Error', 'java.lang'),
+                               ('RuntimeException', 'Exception', 'java.lang'),
+                               ('ArithmeticException', 'RuntimeException', 'java.lang'),
+                               ('ClassCastException', 'RuntimeException', 'java.lang'),
+                               ('IllegalArgumentException', 'RuntimeException', 'java.lang'),
+                               ('NumberFormatException', 'IllegalArgumentException', 'java.lang'),
+                               ('IllegalStateException', 'RuntimeException', 'java.lang'),
+                               ('IllegalThreadStateException', 'IllegalArgumentException', 'java.lang'),
+                               ('IllegalMonitorStateException', 'RuntimeException', 'java.lang'),
+                               ('InterruptedException', 'Exception', 'java.lang'),
+                               ('IndexOutOfBoundsException', 'RuntimeException', 'java.lang'),
+                               ('ArrayIndexOutOfBoundsException', 'IndexOutOfBoundsException', 'java.lang'),
+                               ('StringIndexOutOfBoundsException', 'IndexOutOfBoundsException', 'java.lang'),
+                               ('NegativeArraySizeException', 'RuntimeException', 'java.lang'),
+                               ('NullPointerException', 'RuntimeException', 'java.lang'),
+                               ('UnsupportedOperationException', 'RuntimeException', 'java.lang'),
+                               ('ConcurrentModificationException', 'RuntimeException', 'java.util'),
+                               ('NoSuchElementException', 'RuntimeException', 'java.util')]:
+    define(_name, natives.CLASSES[_base], _package)
+
+"""
+resolve() looks up the Throwable class a catch clause or a throws clause names.
+
+Exceptions:
+JavaNameError -- raised if there is no such class, or if it is not a Throwable
+"""
+def resolve(name):
+    cls = natives.CLASSES.get(name)
+    if cls is None or not issubclass(cls, Throwable):
+        raise exceptions.JavaNameError("cannot find symbol: class " + name)
+    return cls
+
+"""
+as_throwable() returns the Java exception a Python exception stands for: the Throwable of a thrown
+exception, or a new Throwable of the same class as one of the interpreter's runtime errors.  The new
+Throwable is stored on the error, so that every handler sees the same object.
+
+Returns:
+A Throwable, or None if the error is not one Java code can catch (a compile error, or an error in the
+interpreter itself)
+"""
+def as_throwable(error):
+    if hasattr(error, 'throwable'):
+        return error.throwable
+    if isinstance(error, ZeroDivisionError):
+        name, message = 'ArithmeticException', '/ by zero'
+    elif isinstance(error, RecursionError):
+        name, message = 'StackOverflowError', None
+    elif isinstance(error, exceptions.JavaException) and error.catchable:
+        name, message = type(error).__name__, str(error) or None
+    else:
+        return None
+    cls = natives.CLASSES.get(name)
+    if cls is None or not issubclass(cls, Throwable):
+        return None
+    error.throwable = cls(message)
+    if hasattr(error, 'frames'):
+        error.throwable.frames, error.throwable.statements = error.frames, error.statements
+    return error.throwable
+
+"""
+record_statement() notes the statement of the current method an exception is propagating through, for
+its stack trace.  It is called for every enclosing statement, innermost first; only the innermost
+statement of each method is kept.  The errors the interpreter raises have their stack copied the first
+time, as a Throwable's is when it is created.
+"""
+def record_statement(error, statement):
+    holder = getattr(error, 'throwable', error)
+    if not hasattr(holder, 'frames'):
+        holder.frames, holder.statements = list(reversed(call_stack)), {}
+    holder.statements.setdefault(len(holder.frames) - len(call_stack), statement)
+
+"""
+stack_trace() formats a Throwable's stack trace the way Java prints it, followed by the traces of its
+causes.
+
+>>> stack_trace(natives.CLASSES['ArithmeticException']('/ by zero'))
+'java.lang.ArithmeticException: / by zero\\n\\tat main'
+"""
+def stack_trace(throwable):
+    lines = [throwable.toString()]
+    for depth, frame in enumerate(throwable.frames):
+        statement = throwable.statements.get(depth)
+        lines.append("\tat " + frame + ("(" + statement + ")" if statement else ""))
+    if throwable.cause is not None and throwable.cause is not throwable:
+        lines.append("Caused by: " + stack_trace(throwable.cause))
+    return "\n".join(lines)
@@ -0,0 +1,114 @@
+"""
+throwables_test.py
+
+Testing harness for throwables.py and blocks.py. Run with
+
+    python3 throwables_test.py
+
+This file is designed to run on python3
+"""
+
+import exceptions
+import natives
+import blocks
+from throwables import *
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+def throwables_test():
+    print("*---- throwables Test ----*")
+
+    print("  --- hierarchy ---")
+    error = natives.CLASSES['ArrayIndexOutOfBoundsException']("Index 3")
+    assert_equal(isinstance(error, natives.CLASSES['IndexOutOfBoundsException']), True)
+    assert_equal(isinstance(error, natives.CLASSES['RuntimeException']), True)
+    assert_equal(natives.is_instance(error, 'Exception'), True)
+    assert_equal(natives.is_instance(error, 'IllegalStateException'), False)
+    assert_equal(error.toString(), 'java.lang.ArrayIndexOutOfBoundsException: Index 3')
+    assert_equal(natives.CLASSES['NoSuchElementException']().toString(), 'java.util.NoSuchElementException')
+    assert_error("resolve('FooException')", exceptions.JavaNameError)
+    assert_error("resolve('ArrayList')", exceptions.JavaNameError)
+
+    print("  --- messages and causes ---")
+    cause = natives.CLASSES['IllegalStateException']("bad")
+    wrapper = natives.CLASSES['RuntimeException'](cause)
+    assert_equal(wrapper.getMessage(), 'java.lang.IllegalStateException: bad')
+    assert_equal(wrapper.getCause() is cause, True)
+    assert_equal(natives.CLASSES['Exception']().getMessage(), None)
+
+    print("  --- user classes ---")
+    cls = define('InsufficientFundsException', natives.CLASSES['Exception'])
+    assert_equal(cls('low').toString(), 'InsufficientFundsException: low')
+    assert_equal(issubclass(cls, natives.CLASSES['RuntimeException']), False)
+
+    print("  --- as_throwable ---")
+    division = ZeroDivisionError("integer division or modulo by zero")
+    throwable = as_throwable(division)
+    assert_equal(throwable.toString(), 'java.lang.ArithmeticException: / by zero')
+    assert_equal(as_throwable(division) is throwable, True)
+    bounds = exceptions.ArrayIndexOutOfBoundsException("Index 5 out of bounds for length 3")
+    call_stack.append('Table.fill')
+    record_statement(bounds, "a[5] = 1")
+    record_statement(bounds, "for (int i = 0; i < 9; i++) { a[i] = 1; }")
+    call_stack.pop()
+    record_statement(bounds, "Table.fill(a)")
+    assert_equal(stack_trace(as_throwable(bounds)),
+                 'java.lang.ArrayIndexOutOfBoundsException: Index 5 out of bounds for length 3\n' +
+                 '\tat Table.fill(a[5] = 1)\n\tat main(Table.fill(a))')
+    thrown = exceptions.ThrownException(cause)
+    assert_equal(as_throwable(thrown) is cause, True)
+    assert_equal(as_throwable(exceptions.InvalidDatatypeException("int")), None)
+    assert_equal(as_throwable(TypeError()), None)
+
+    print("  --- stack traces ---")
+    call_stack.append('deposit')
+    nested = natives.CLASSES['IllegalArgumentException']("negative", cause)
+    call_stack.pop()
+    assert_equal(stack_trace(nested), 'java.lang.IllegalArgumentException: negative\n\tat deposit\n\tat main\n' +
+                 'Caused by: java.lang.IllegalStateException: bad\n\tat main')
+
+    print('All tests passed!\n')
+
+def blocks_test():
+    print("*---- blocks Test ----*")
+
+    print("  --- split_statements ---")
+    assert_equal(blocks.split_statements('try { a(); } catch (E e) { b(); } x = 1;'),
+                 ['try { a(); } catch (E e) { b(); }', 'x = 1'])
+    assert_equal(blocks.split_statements('if (a) { b; } else { c; } d;'), ['if (a) { b; } else { c; }', 'd'])
+    assert_equal(blocks.split_statements('int[] a = {1, 2}; s = "}";'), ['int[] a = {1, 2}', 's = "}"'])
+
+    print("  --- if_chain ---")
+    assert_equal(blocks.if_chain('if (a) { if (b) { c; } } else if (d) { e; } else f;'),
+                 [('a', ' if (b) { c; } '), ('d', ' e; '), (None, 'f')])
+    assert_error("blocks.if_chain('if (a) { b; } c;')", exceptions.InvalidIfElseBlockException)
+    assert_error("blocks.if_chain('if (a { b; }')", exceptions.InvalidIfElseBlockException)
+
+    print("  --- try_clauses ---")
+    assert_equal(blocks.try_clauses('try { a; } finally { b; }'), (' a; ', [], ' b; '))
+    assert_error("blocks.try_clauses('try { a; }')", SyntaxError)
+    assert_error("blocks.try_clauses('try { a; } catch (e) { }')", SyntaxError)
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    throwables_test()
+    blocks_test()
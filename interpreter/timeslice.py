@@ -0,0 +1,205 @@
+'''
+timeslice.py
+Time-sliced execution of sessions under asyncio.  A TimeSlicer runs the jobs of any number of sessions in
+one process, fairly: a job runs for at most slice_size instructions, then waits at the back of the queue
+while the other jobs take their turn, so a long program does not hold up the short ones.
+
+    slicer = TimeSlicer(slice_size=1000)
+    async def main():
+        busy, quick = InterpreterSession(), InterpreterSession()
+        await asyncio.gather(slicer.run(busy, 'execute', 'while (true) { }'),   # Runs in turns...
+                             slicer.run(quick, 'execute', '6 * 7'))             # ...so this ends at once
+    slicer.metrics()        # -> {quick: SliceStats(jobs=1, slices=1, ...), busy: ...}
+
+The interpreter runs a job on the Python stack, so the stack is kept between slices by running each job
+in a thread of its own; the slicer lets one of those threads run at a time.  At the end of its slice,
+the job's thread takes its session out of the interpreter (InterpreterSession.paused()) and waits for its
+next turn.
+'''
+import time
+import asyncio
+import threading
+import collections
+import limits
+
+class SliceStats(object):
+    """What a session has had from the slicer: its jobs, slices, the instructions and seconds they ran, and
+    the seconds they waited for a turn."""
+    def __init__(self):
+        self.jobs = 0
+        self.slices = 0
+        self.instructions = 0
+        self.run_time = 0.0
+        self.wait_time = 0.0
+        self.longest_wait = 0.0
+
+    def __repr__(self):
+        return ("SliceStats(jobs={0}, slices={1}, instructions={2}, run_time={3:.4f}, wait_time={4:.4f}, "
+                "longest_wait={5:.4f})".format(self.jobs, self.slices, self.instructions, self.run_time,
+                                               self.wait_time, self.longest_wait))
+
+class Job(object):
+    """One load, execute or call of a session, as the slicer runs it."""
+    def __init__(self, session, kind, payload, stats):
+        self.session = session
+        self.kind = kind
+        self.payload = payload
+        self.stats = stats
+        self.turn = threading.Event()   # Set when the job may run
+        self.done = None        # The future run() waits on, set to the outcome when the job ends
+        self.outcome = None     # (True, value) or (False, exception), once the job has ended
+        self.queued = None      # When the job was put in the queue
+        self.started = None     # When the job's current slice began
+        self.counted = 0        # Instructions of the job counted in its stats
+
+class TimeSlicer(object):
+    """Runs the jobs of sessions in turns, slice_size instructions at a time.  It is used from one asyncio
+    event loop.
+    """
+    def __init__(self, slice_size=1000):
+        self.slice_size = slice_size
+        self.queue = collections.deque()    # The jobs waiting for a turn
+        self.current = None     # The job running, if any
+        self.stats = {}         # Session -> SliceStats
+        self.locks = {}         # Session -> asyncio.Lock, so a session runs one job at a time
+        self.loop = None
+        self.driver = None
+        self.waiting = None     # Set when a job joins an empty queue
+        self.slice_ended = None     # The future drive() waits on while a job runs
+
+    """
+    run() runs a job in a session, in turns with the other jobs given to the slicer.
+
+    Arguments:
+    session -- an InterpreterSession
+    kind -- 'load' (payload is Java source holding classes), 'execute' (payload is statements) or 'call'
+    (payload is (class name, method name, arguments))
+
+    Returns:
+    What the session's method returns
+
+    Exceptions:
+    ValueError -- raised for an unknown kind of job
+    JavaException, SyntaxError, ... -- raised as the session raises them
+    """
+    async def run(self, session, kind, payload):
+        if kind not in ('load', 'execute', 'call'):
+            raise ValueError("unknown kind of job: " + str(kind))
+        self.start()
+        lock = self.locks.setdefault(session, asyncio.Lock())
+        async with lock:
+            stats = self.stats.setdefault(session, SliceStats())
+            stats.jobs += 1
+            session.settings['slice_size'] = self.slice_size
+            session.settings['preempt'] = self.preempt
+            job = Job(session, kind, payload, stats)
+            job.done = self.loop.create_future()
+            threading.Thread(target=self.work, args=(job,), daemon=True).start()
+            self.enqueue(job)
+            try:
+                ok, value = await job.done
+            finally:
+                session.settings['preempt'] = None
+        if not ok:
+            raise value
+        return value
+
+    def start(self):
+        if self.driver is None:
+            self.loop = asyncio.get_running_loop()
+            self.waiting = asyncio.Event()
+            self.driver = self.loop.create_task(self.drive())
+
+    def enqueue(self, job):
+        job.queued = time.perf_counter()
+        self.queue.append(job)
+        self.waiting.set()
+
+    """
+    drive() gives the jobs in the queue their turns, in order, one slice each, until it is cancelled (by
+    close()).
+    """
+    async def drive(self):
+        while True:
+            if not self.queue:
+                self.waiting.clear()
+                await self.waiting.wait()
+                continue
+            job = self.queue.popleft()
+            job.started = time.perf_counter()
+            waited = job.started - job.queued
+            job.stats.wait_time += waited
+            job.stats.longest_wait = max(job.stats.longest_wait, waited)
+            job.stats.slices += 1
+            self.current = job
+            self.slice_ended = self.loop.create_future()
+            job.turn.set()
+            await self.slice_ended
+            self.current = None
+            job.stats.run_time += time.perf_counter() - job.started
+            if job.outcome is None:
+                self.enqueue(job)
+
+    """
+    work() runs a job, in the job's own thread, once it has its first turn.
+    """
+    def work(self, job):
+        job.turn.wait()
+        job.turn.clear()
+        try:
+            if job.kind == 'call':
+                value = job.session.call(*job.payload)
+            else:
+                value = getattr(job.session, job.kind)(job.payload)
+        except BaseException as error:
+            outcome = (False, error)
+        else:
+            outcome = (True, value)
+        job.stats.instructions += job.session.executed - job.counted
+        self.loop.call_soon_threadsafe(self.finish, job, outcome)
+
+    def finish(self, job, outcome):
+        job.outcome = outcome
+        self.slice_ended.set_result(None)
+        job.done.set_result(outcome)
+
+    """
+    preempt() ends the time slice of the job running.  It is called by the interpreter (limits.safepoint())
+    in the job's thread, and returns when the job has its next turn.  The job's deadline, if it has one,
+    is put back by the time it waited.
+    """
+    def preempt(self):
+        job = self.current
+        job.stats.instructions += limits.count() - job.counted
+        job.counted = limits.count()
+        paused = time.monotonic()
+        with job.session.paused():
+            self.loop.call_soon_threadsafe(self.slice_ended.set_result, None)
+            job.turn.wait()
+            job.turn.clear()
+        if limits.deadline is not None:
+            limits.deadline += time.monotonic() - paused
+
+    """
+    metrics() returns the SliceStats of each session the slicer has run.
+    """
+    def metrics(self):
+        return dict(self.stats)
+
+    """
+    fairness() returns Jain's fairness index of the instructions the sessions have run: 1.0 if they have
+    all run as many, down to 1/n if one session has run them all.  The index of no sessions is 1.0.
+    """
+    def fairness(self):
+        shares = [stats.instructions for stats in self.stats.values()]
+        if not any(shares):
+            return 1.0
+        return sum(shares) ** 2 / (len(shares) * sum(share * share for share in shares))
+
+    """
+    close() stops giving turns.  Jobs still running stay paused; their threads end with the process.
+    """
+    def close(self):
+        if self.driver is not None:
+            self.driver.cancel()
+            self.driver = None
@@ -0,0 +1,78 @@
+"""
+timeslice_test.py
+
+Testing harness for timeslice.py. Run with
+
+    python3 timeslice_test.py
+
+This file is designed to run on python3
+"""
+
+import asyncio
+from session import InterpreterSession
+from timeslice import TimeSlicer
+import exceptions
+import limits
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+async def assert_raises(job, error_type=BaseException):
+    """Subroutine that asserts that awaiting JOB raises the specified
+    ERROR_TYPE.
+    """
+    try:
+        result = await job
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+async def slicing_test():
+    print("*---- TimeSlicer Test ----*")
+    slicer = TimeSlicer(slice_size=200)
+    busy, quick = InterpreterSession(), InterpreterSession()
+    finished = []
+    async def run(session, name, statements):
+        value = await slicer.run(session, 'execute', statements)
+        finished.append(name)
+        return value
+    values = await asyncio.gather(run(busy, 'busy', 'int n = 0; while (n < 2000) { n++; } n'),
+                                  run(quick, 'quick', 'int k = 0; while (k < 50) { k++; } k'))
+    assert_equal(values, [2000, 50])
+    assert_equal(finished, ['quick', 'busy'])
+
+    print("  --- metrics ---")
+    metrics = slicer.metrics()
+    assert_equal(metrics[quick].slices, 1)
+    assert_equal(metrics[busy].slices > 10, True)
+    assert_equal(metrics[busy].instructions, busy.executed)
+    assert_equal(metrics[busy].instructions > metrics[quick].instructions, True)
+    assert_equal(0.5 < slicer.fairness() < 1.0, True)
+
+    print("  --- loads and calls ---")
+    await slicer.run(quick, 'load', 'class M { static int sq(int x) { return x * x; } }')
+    assert_equal(await slicer.run(quick, 'call', ('M', 'sq', [9])), 81)
+    assert_equal(metrics[quick].jobs, 3)
+
+    print("  --- errors and limits ---")
+    await assert_raises(slicer.run(quick, 'execute', 'int[] a = new int[1]; a[3] = 1;'),
+                        exceptions.JavaException)
+    await assert_raises(slicer.run(quick, 'paint', ''), ValueError)
+    limited = InterpreterSession(budget=1000)
+    await assert_raises(slicer.run(limited, 'execute', 'while (true) { }'),
+                        limits.InstructionBudgetExceededException)
+    slicer.close()
+
+    print("  --- sessions run outside the slicer afterwards ---")
+    assert_equal(busy.execute('n + 1'), 2001)
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    asyncio.run(slicing_test())
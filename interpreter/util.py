@@ -23,13 +23,13 @@ The value in the appropriate datatype
 "string"
 """
 def parse_value(value):    
-    if value == None:
-        return value
+    if type(value) is not str:
+        return value    # None, or a value that is already typed
     try:
         to_return = int(value)
     except ValueError as e:
         try:
-            float(value)
+            to_return = float(value)
         except ValueError as f:
             to_return = value
     
@@ -66,3 +66,54 @@ def flatten_list(lst):
     if type(lst[0]) == list:
         return flatten_list(lst[0]) + flatten_list(lst[1:])
     return [lst[0]] + flatten_list(lst[1:])
+
+"""
+narrow() converts a numeric value to the representation Java uses for the given datatype.  Integral 
+types wrap around on overflow (two's complement) and floating point types are converted to floats.  
+Any other datatype is returned unchanged.
+
+Arguments:
+value -- the value to be narrowed
+datatype -- STRING representation of the target datatype
+
+Returns:
+The value as it would be stored in a Java variable of type datatype
+
+>>> narrow(2147483648, "int")
+-2147483648
+>>> narrow(3, "double")
+3.0
+"""
+def narrow(value, datatype):
+    if datatype in INT_BITS and type(value) is int:
+        bits = INT_BITS[datatype]
+        value &= (1 << bits) - 1
+        if value >> (bits - 1):
+            value -= 1 << bits
+    elif datatype in FLOAT_TYPES and type(value) in (int, float):
+        value = float(value)
+    return value
+
+"""
+to_literal() takes a Python value and returns the source text that the evaluator uses to represent it 
+inside an expression.  Strings are wrapped in double quotes, matching the way string variables are stored.
+
+Arguments:
+value -- the value to be converted
+
+Returns:
+A string that evaluates back to value
+
+>>> to_literal(4)
+'4'
+>>> to_literal("hi")
+'"hi"'
+>>> to_literal(1e20)
+"float('1e+20')"
+"""
+def to_literal(value):
+    if type(value) is str:
+        return '"' + value + '"'
+    if type(value) is float and any(char.isalpha() for char in repr(value)):
+        return "float('" + repr(value) + "')"    # inf, nan and exponents would be taken for names
+    return repr(value)
@@ -0,0 +1,246 @@
+'''
+vectorize.py
+Optional NumPy lowering of counted for loops over arrays.  Two kinds of loop bodies are recognized:
+
+    c[i] = a[i] * b[i] + k;         element-wise arithmetic
+    sum += a[i] * b[i];             reductions (also "sum = sum + ..." and "m = Math.max(m, ...)")
+
+The arithmetic is carried out on fixed-width dtypes, so int and long overflow wraps exactly as it does
+in Java.  If NumPy is not installed, or the loop cannot be proven to behave exactly like the interpreted
+version, lower_for_loop() returns False and the loop is run normally.
+'''
+import re
+from constants import *
+from arrays import Array
+from util import narrow
+from loop_analysis import match_counted_loop
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NAME = r'[a-zA-Z_]\w*'
+ELEMENTWISE_PATTERN = r'(' + NAME + r')\s*\[\s*(' + NAME + r')\s*\]\s*=([^=].*)$'
+SUM_PATTERNS = [r'(' + NAME + r')\s*\+=\s*(.+)$', r'(' + NAME + r')\s*=\s*\1\s*\+\s*(.+)$']
+MIN_MAX_PATTERN = r'(' + NAME + r')\s*=\s*Math\.(min|max)\s*\(\s*\1\s*,(.+)\)$'
+TOKEN_PATTERN = re.compile(r'\s*(?:(?P<array>' + NAME + r')\s*\[\s*(?P<index>' + NAME + r')\s*\]|' +
+                           r'(?P<number>\d+\.\d+|\d+)|(?P<name>' + NAME + r')|(?P<op>[-+*/()]))')
+# A call, increment or assignment, which the bounds must not contain: Java evaluates the condition on
+# every iteration, and a loop that is not lowered has its bounds evaluated again by the interpreter.
+SIDE_EFFECT_PATTERN = re.compile(r'[\w$\])]\s*\(|\+\+|--|(?<![=!<>])=(?!=)')
+
+# Element datatype -> (dtype the array is stored in, dtype Java does the arithmetic in)
+DTYPES = {SHORT: ('int16', 'int32'), INT: ('int32', 'int32'), LONG: ('int64', 'int64'), DOUBLE: ('float64', 'float64')}
+# Datatypes whose scalar variables may appear in an expression computed in the given dtype
+SCALAR_TYPES = {'int32': [SHORT, INT], 'int64': [SHORT, INT, LONG], 'float64': [DOUBLE]}
+
+"""
+lower_for_loop() tries to run a for loop as a single vectorized NumPy operation.  The loop header must
+have the form "int i = start; i < end; i++" (or "i <= end", "++i", "i += 1", "i = i + 1"), and the body
+must be a single element-wise or reduction statement indexed only by the loop variable.
+
+Arguments:
+initialize, condition, update -- the three clauses of the for loop header
+statements -- the body of the for loop
+instance_vars -- the dictionary holding all the instance variables
+stack -- the list of dictionaries representing the stack frames on the stack
+evaluate -- the evaluator's evaluate_expression(exp_str, instance_vars, stack) function
+
+Returns:
+True if the loop was executed here, False if it must be run by the interpreter
+"""
+def lower_for_loop(initialize, condition, update, statements, instance_vars, stack, evaluate):
+    if numpy is None:
+        return False
+    header = match_counted_loop(initialize, condition, update)
+    if header is None or header[3] != 1 or lookup(header[0], instance_vars, stack) is not None:
+        return False
+    var, start, end, step, inclusive = header
+
+    body = statements.strip()
+    if body.endswith(";"):
+        body = body[:-1]
+    if ";" in body:
+        return False
+
+    elementwise = re.match(ELEMENTWISE_PATTERN, body)
+    if elementwise:
+        target, expression, written = elementwise.group(1), elementwise.group(3), None
+        if elementwise.group(2) != var:
+            return False
+    else:
+        target, expression, written, kind = None, None, None, None
+        for pattern in SUM_PATTERNS:
+            match = re.match(pattern, body)
+            if match:
+                written, expression, kind = match.group(1), match.group(2), 'sum'
+                break
+        match = re.match(MIN_MAX_PATTERN, body)
+        if match:
+            written, expression, kind = match.group(1), match.group(3), match.group(2)
+        if written is None:
+            return False
+
+    # Neither the bounds nor the terms may depend on anything the body writes.
+    if "[" in end or (written is not None and re.search(r'\b' + written + r'\b', end + " " + expression)):
+        return False
+    if SIDE_EFFECT_PATTERN.search(start + " " + end):
+        return False
+
+    # The bounds are evaluated only once the body is known to be lowered.
+    kernel = compile_kernel(expression, var, target, instance_vars, stack)
+    if kernel is None:
+        return False
+    code, arrays, names, datatype = kernel
+    if not elementwise and not accepts_reduction(written, kind, datatype, instance_vars, stack):
+        return False
+    start, end = evaluate(start, instance_vars, stack), evaluate(end, instance_vars, stack)
+    if type(start) is not int or type(end) is not int:
+        return False
+    if inclusive:
+        end += 1
+    if start >= end:
+        return True
+
+    # Out-of-range loops are left to the interpreter so the exception is raised on the right iteration.
+    destination = lookup_value(target, instance_vars, stack) if elementwise else None
+    for array in arrays + ([destination] if destination is not None else []):
+        if start < 0 or end > array.getLen():
+            return False
+
+    storage, compute = DTYPES[datatype]
+    if elementwise:
+        with numpy.errstate(all='ignore'):
+            result = evaluate_kernel(code, arrays, names, start, end, storage, compute)
+            destination.items[start:end] = result.astype(storage).tolist()
+        return True
+
+    variable = lookup(written, instance_vars, stack)[written]
+    current = variable.get_value()
+    with numpy.errstate(all='ignore'):
+        terms = evaluate_kernel(code, arrays, names, start, end, storage, compute)
+        if kind == 'sum' and compute == 'float64':
+            # cumsum adds strictly left to right, giving the same rounding as the Java loop.
+            result = float(numpy.concatenate(([current], terms)).cumsum()[-1])
+        elif kind == 'sum':
+            result = current + int(numpy.sum(terms, dtype='int64'))
+        elif kind == 'max':
+            result = max(current, int(terms.max()))
+        else:
+            result = min(current, int(terms.min()))
+    variable.set_value(narrow(result, variable.get_datatype()))
+    return True
+
+"""
+compile_kernel() translates a Java arithmetic expression over array elements into a Python expression
+on NumPy arrays.  Every array must be indexed by the loop variable and have the same element datatype;
+scalar variables must hold values of a datatype that Java would not widen.
+
+Arguments:
+expression -- the Java expression to translate
+var -- the name of the loop variable
+target -- the name of the array being written, or None for reductions
+instance_vars -- the dictionary holding all the instance variables
+stack -- the list of dictionaries representing the stack frames on the stack
+
+Returns:
+A tuple (code object, list of Arrays, dictionary of scalar values, element datatype), or None if the
+expression cannot be vectorized safely
+"""
+def compile_kernel(expression, var, target, instance_vars, stack):
+    source, arrays, placeholders, scalars, position = [], [], {}, {}, 0
+    datatype = None
+    if target is not None:
+        destination = lookup_value(target, instance_vars, stack)
+        if not isinstance(destination, Array) or destination.type not in DTYPES:
+            return None
+        datatype = destination.type
+    expression = expression.strip()
+    while position < len(expression):
+        token = TOKEN_PATTERN.match(expression, position)
+        if token is None:
+            return None
+        position = token.end()
+        if token.group('array'):
+            name = token.group('array')
+            if token.group('index') != var:
+                return None
+            array = lookup_value(name, instance_vars, stack)
+            if not isinstance(array, Array) or array.type not in DTYPES or datatype not in (None, array.type):
+                return None
+            datatype = array.type
+            if name not in placeholders:
+                placeholders[name] = "_A" + str(len(arrays))
+                arrays.append(array)
+            source.append(placeholders[name])
+        elif token.group('number'):
+            if "." not in token.group('number') and int(token.group('number')) >= 2 ** 31:
+                return None
+            source.append(token.group('number'))
+        elif token.group('name'):
+            if token.group('name') == var:
+                return None
+            scalars[token.group('name')] = "_S" + str(len(scalars))
+            source.append(scalars[token.group('name')])
+        else:
+            source.append(token.group('op'))
+    if not arrays:
+        return None
+    compute = DTYPES[datatype][1]
+    if compute != 'float64' and ("/" in source or any("." in item for item in source)):
+        return None
+
+    names = {}
+    for name, placeholder in scalars.items():
+        frame = lookup(name, instance_vars, stack)
+        if frame is None or frame[name].get_datatype() not in SCALAR_TYPES[compute]:
+            return None
+        value = frame[name].get_value()
+        if type(value) not in (int, float) or narrow(value, frame[name].get_datatype()) != value:
+            return None
+        names[placeholder] = numpy.dtype(compute).type(value)
+    # Literals are wrapped so that every operand, and therefore every intermediate result, is fixed-width.
+    source = ["_numpy." + compute + "(" + item + ")" if item[0].isdigit() else item for item in source]
+    try:
+        code = compile(" ".join(source), "<vectorized loop>", "eval")
+    except SyntaxError:
+        return None
+    return code, arrays, names, datatype
+
+"""
+evaluate_kernel() runs a compiled kernel over the slice [start, end) of its arrays.
+
+Returns:
+A NumPy array holding one result per iteration, in the dtype Java computes in
+"""
+def evaluate_kernel(code, arrays, names, start, end, storage, compute):
+    namespace = {"_numpy": numpy}
+    namespace.update(names)
+    for number, array in enumerate(arrays):
+        namespace["_A" + str(number)] = numpy.array(array.items[start:end], dtype=storage).astype(compute)
+    return eval(code, namespace)
+
+"""
+accepts_reduction() checks that the variable a reduction writes to has a datatype for which the vectorized
+result is exact: an integral type, or double for sums over doubles.
+"""
+def accepts_reduction(written, kind, datatype, instance_vars, stack):
+    frame = lookup(written, instance_vars, stack)
+    if frame is None:
+        return False
+    variable_type, value = frame[written].get_datatype(), frame[written].get_value()
+    if datatype == DOUBLE:
+        return kind == 'sum' and variable_type == DOUBLE and type(value) is float
+    return variable_type in INT_TYPES and type(value) is int and (kind == 'sum' or INT_BITS[variable_type] >= INT_BITS[datatype])
+
+def lookup(name, instance_vars, stack):
+    if name in stack[-1]:
+        return stack[-1]
+    if name in instance_vars:
+        return instance_vars
+    return None
+
+def lookup_value(name, instance_vars, stack):
+    frame = lookup(name, instance_vars, stack)
+    return frame[name].get_value() if frame is not None else None
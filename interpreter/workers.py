@@ -0,0 +1,376 @@
+'''
+workers.py
+A pool of worker processes running Java code for the web server.  Each worker imports the compiler and
+the interpreter when it starts, then serves jobs sent to it over a pipe, in the sessions
+(session.InterpreterSession) it keeps.  A job runs in the session it names, and a session stays on the
+worker that created it, so a user's variables and classes are there for their next job.
+
+A worker that takes longer than the pool's timeout is killed and replaced; the sessions it held are lost,
+and the job is answered with an error saying so.  Jobs on different workers run in parallel, so with one
+worker per core, throughput grows with the number of cores.
+
+    pool = WorkerPool(size=4, timeout=5.0)
+    pool.run("alice", "execute", "int n = 6 * 7; System.out.println(n);")
+    # -> Reply(ok=True, value=None, output='42\\n', error=None)
+
+A job's output is sent back with its reply, or, for a job run with stream(), as it is written:
+
+    for event, data in pool.stream("alice", "execute", "for (...) { System.out.println(i); }"):
+        ...     # ('stdout', '0\\n1\\n'), ('stdout', '2\\n'), ..., then ('reply', Reply(...))
+
+The output is read from the worker as it comes, whether or not the reader keeps up; what the reader has
+not taken is kept for it up to a limit, past which it is dropped.
+
+A web server running in several processes shares one pool through a PoolManager, so that a session is
+found whichever process serves its request.
+'''
+import os
+import time
+import collections
+import multiprocessing
+import threading
+from collections import namedtuple
+from multiprocessing.managers import BaseManager, IteratorProxy
+
+KINDS = ['load', 'load_compiled', 'execute', 'call', 'close']
+
+# What a job sent back: ok is False if it raised, and error is then the report the REPL would have
+# printed.  value is the text of the value the job produced, as the REPL would echo it.
+Reply = namedtuple('Reply', ['ok', 'value', 'output', 'error'])
+
+CHUNK = 4096            # Characters of a streamed job's output gathered before they are sent
+FLUSH_INTERVAL = 0.05   # Most seconds a streamed job's output waits before it is sent
+STREAM_LIMIT = 1 << 20  # Characters of a streamed job's output kept for a reader who has not taken them
+
+"""
+serve() is the main loop of a worker process: it imports the interpreter and says it is ready by sending
+None, then receives jobs (session id, kind, payload) and sends back a Reply for each, until the pipe is
+closed.  A job sent with a fourth item, True, is streamed: its output is sent as it is written, in
+('stdout', text) messages before the Reply (whose output is then empty).
+
+Arguments:
+connection -- the worker's end of the pipe
+new_session -- the function making the worker's sessions; by default, a new InterpreterSession
+"""
+def serve(connection, new_session=None):
+    from session import InterpreterSession    # Warms the worker up before its first job.
+    import javarepl
+    import throwables
+    sessions = {}
+    connection.send(None)
+    while True:
+        try:
+            session_id, kind, payload, *streamed = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if kind == 'close':
+            sessions.pop(session_id, None)
+            connection.send(Reply(True, None, '', None))
+            continue
+        if session_id not in sessions:
+            sessions[session_id] = new_session() if new_session is not None else InterpreterSession()
+        session = sessions[session_id]
+        try:
+            if streamed:
+                with StreamedOutput(connection) as out, session.writing_to(out):
+                    value = perform(session, kind, payload)
+            else:
+                value = perform(session, kind, payload)
+        except Exception as error:
+            throwable = throwables.as_throwable(error)
+            report = throwables.stack_trace(throwable) if throwable is not None else \
+                     type(error).__name__ + ': ' + str(error)
+            connection.send(Reply(False, None, '' if streamed else session.output(), report))
+        else:
+            if value is not None and kind not in ('load', 'load_compiled'):
+                value = str(javarepl.java_form(value))
+            connection.send(Reply(True, value, '' if streamed else session.output(), None))
+
+def perform(session, kind, payload):
+    if kind == 'load':
+        return session.load(payload)
+    elif kind == 'load_compiled':
+        return session.load_compiled(payload)
+    elif kind == 'execute':
+        return session.execute(payload)
+    return session.call(*payload)
+
+class StreamedOutput(object):
+    """The out of a session running a streamed job: the output is sent to the pool over the worker's pipe,
+    CHUNK characters at a time, or what there is every FLUSH_INTERVAL seconds, from a thread of its own.
+
+    Sending waits while the pipe is full, until the pool has read the output already sent (which it does as
+    it comes), so at most a CHUNK of the output is held here.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.pending = []   # Output not yet sent
+        self.size = 0
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.flusher = threading.Thread(target=self.flush_often, daemon=True)
+
+    def write(self, text):
+        with self.lock:
+            self.pending.append(text)
+            self.size += len(text)
+            if self.size >= CHUNK:
+                self.send()
+        return len(text)
+
+    def flush(self):
+        with self.lock:
+            self.send()
+
+    def send(self):
+        if self.pending:
+            text = ''.join(self.pending)
+            self.pending, self.size = [], 0
+            self.connection.send(('stdout', text))
+
+    def flush_often(self):
+        try:
+            while not self.done.wait(FLUSH_INTERVAL):
+                self.flush()
+        except OSError:     # The pool has gone; the worker is stopped with it.
+            pass
+
+    def __enter__(self):
+        self.flusher.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.done.set()
+        self.flusher.join()
+        self.flush()
+
+class Worker(object):
+    """One worker process, and the parent's end of its pipe.  lock is held while a job is on the worker.
+    The process is forked from zygote if one is given (see zygote.py), and started by context otherwise.
+    """
+    def __init__(self, context, zygote=None):
+        if zygote is not None:
+            self.connection, self.process = zygote.spawn()
+        else:
+            self.connection, child = context.Pipe()
+            self.process = context.Process(target=serve, args=(child,), daemon=True)
+            self.process.start()
+            child.close()
+        self.lock = threading.Lock()
+        self.sessions = set()
+        self.ready = False  # Whether the worker has finished starting up
+
+    def wait_ready(self):
+        if not self.ready:
+            self.connection.recv()
+            self.ready = True
+
+    def stop(self):
+        self.connection.close()
+        self.process.terminate()
+        self.process.join()
+
+class WorkerPool(object):
+    """A fixed number of worker processes, taking jobs from any number of threads of the web server.
+
+    size is the number of workers (by default, one per core); timeout is the most seconds a job may take
+    before its worker is replaced.  Workers are forked from zygote, if it is given, so they start (and are
+    replaced) with the zygote's classes loaded and its caches warm.
+    """
+    def __init__(self, size=None, timeout=5.0, context=None, zygote=None):
+        self.size = size if size is not None else os.cpu_count() or 1
+        self.timeout = timeout
+        self.context = context if context is not None else multiprocessing.get_context()
+        self.zygote = zygote
+        self.workers = [Worker(self.context, zygote) for _ in range(self.size)]
+        self.affinity = {}  # Session id -> index of the worker holding the session
+        self.lock = threading.Lock()
+
+    """
+    run() runs a job in a session, on the worker holding the session, and waits for its reply.  A new
+    session goes to the worker holding the fewest sessions.
+
+    Arguments:
+    session_id -- the session to run the job in; created if it does not exist
+    kind -- 'load' (payload is Java source holding classes), 'load_compiled' (payload is classes already
+    compiled, in the form of interface.serialize), 'execute' (payload is statements), 'call' (payload is
+    (class name, method name, arguments)) or 'close' (the session is ended)
+
+    Returns:
+    The job's Reply
+
+    Exceptions:
+    ValueError -- raised for an unknown kind of job
+    """
+    def run(self, session_id, kind, payload=None):
+        if kind not in KINDS:
+            raise ValueError("unknown kind of job: " + str(kind))
+        return self.job(session_id, kind, payload)
+
+    """
+    stream() runs a job as run() does, but gives its output as the program writes it, rather than with
+    its reply.  A thread of the pool reads the output from the worker as soon as it is sent, and keeps it
+    for the reader, up to limit characters: the worker never waits for the reader, so a slow reader holds
+    back neither the job (nor its timeout) nor the other sessions on the worker.  Output that would go
+    past the limit is dropped.  A reader that stops early should close() the events; the job then runs
+    to its end, its output dropped.
+
+    Returns:
+    An iterator of events (kind, data): ('stdout', text) for each piece of output kept, then
+    ('truncated', the number of characters dropped) if any were, then ('reply', Reply), with an empty
+    output
+
+    Exceptions:
+    ValueError -- raised for an unknown kind of job
+    """
+    def stream(self, session_id, kind, payload=None, limit=STREAM_LIMIT):
+        if kind not in KINDS:
+            raise ValueError("unknown kind of job: " + str(kind))
+        events = Events(limit)
+        threading.Thread(target=lambda: events.finish(self.job(session_id, kind, payload, events.put)),
+                         daemon=True).start()
+        return events
+
+    """
+    job() runs a job on the worker holding the session, and waits for its reply.  If output is given, the
+    job is streamed, and output is called with each piece of its output as it comes.
+    """
+    def job(self, session_id, kind, payload, output=None):
+        while True:
+            with self.lock:
+                index = self.affinity.get(session_id)
+                if index is None:
+                    if kind == 'close':
+                        return Reply(True, None, '', None)
+                    index = min(range(self.size), key=lambda i: len(self.workers[i].sessions))
+                    self.affinity[session_id] = index
+                    self.workers[index].sessions.add(session_id)
+                worker = self.workers[index]
+            with worker.lock:
+                if worker is not self.workers[index]:
+                    continue    # The worker was replaced while the job waited for it.
+                try:
+                    worker.wait_ready()
+                    worker.connection.send((session_id, kind, payload) if output is None else
+                                           (session_id, kind, payload, True))
+                    deadline = time.monotonic() + self.timeout
+                    while worker.connection.poll(max(0.0, deadline - time.monotonic())):
+                        message = worker.connection.recv()
+                        if isinstance(message, Reply):
+                            if kind == 'close':
+                                self.forget(session_id)
+                            return message
+                        output(message[1])
+                    error = "TimeoutException: the job took longer than {0} seconds".format(self.timeout)
+                except (EOFError, OSError):
+                    error = "WorkerError: the worker running the job stopped"
+                self.replace(index)
+                return Reply(False, None, '', error + "; its session was reset")
+
+    """
+    replace() kills a worker, and starts a new one in its place.  The sessions the worker held are lost.
+    """
+    def replace(self, index):
+        with self.lock:
+            worker = self.workers[index]
+            for session_id in worker.sessions:
+                del self.affinity[session_id]
+            worker.stop()
+            self.workers[index] = Worker(self.context, self.zygote)
+
+    def forget(self, session_id):
+        with self.lock:
+            index = self.affinity.pop(session_id, None)
+            if index is not None:
+                self.workers[index].sessions.discard(session_id)
+
+    """
+    close() stops every worker.
+    """
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+
+class Events(object):
+    """The events of a streamed job (see WorkerPool.stream()), an iterator.  The pool's thread reading the
+    job puts its output in; the reader takes it out.  Once the output kept would go past limit characters,
+    the rest of the job's output is dropped, and only counted.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.pending = collections.deque()  # Output not yet taken
+        self.size = 0
+        self.dropped = 0    # Characters of output dropped
+        self.reply = None
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, text):
+        with self.condition:
+            if self.closed:
+                return
+            kept = text[:max(0, self.limit - self.size)] if not self.dropped else ''
+            if kept:
+                self.pending.append(kept)
+                self.size += len(kept)
+            self.dropped += len(text) - len(kept)
+            self.condition.notify()
+
+    def finish(self, reply):
+        with self.condition:
+            self.reply = reply
+            self.condition.notify()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self.condition:
+            while not self.pending and self.reply is None and not self.closed:
+                self.condition.wait()
+            if self.pending:
+                text = self.pending.popleft()
+                self.size -= len(text)
+                return 'stdout', text
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                return 'truncated', dropped
+            if self.reply is None or self.closed:
+                raise StopIteration
+            self.closed = True
+            return 'reply', self.reply
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.pending.clear()
+            self.size = self.dropped = 0
+            self.condition.notify()
+
+class SharedPool(WorkerPool):
+    """The WorkerPool a PoolManager serves.  Its workers are forked from a zygote, preloaded with the Java
+    source in preload, if that is given (None for no zygote)."""
+    def __init__(self, size=None, timeout=5.0, preload=None):
+        from zygote import Zygote
+        WorkerPool.__init__(self, size, timeout, zygote=Zygote(preload) if preload is not None else None)
+
+    def close(self):
+        WorkerPool.close(self)
+        if self.zygote is not None:
+            self.zygote.close()
+
+class PoolManager(BaseManager):
+    """Runs a pool in a process of its own, for processes that share it (those of a preforked web server):
+    they call the pool through a proxy, which they inherit when they are forked.
+
+        manager = PoolManager()
+        manager.start()
+        pool = manager.WorkerPool(4, 5.0)     # Used as a WorkerPool is
+        ...
+        pool.close()
+        manager.shutdown()
+    """
+
+PoolManager.register('WorkerPool', SharedPool, exposed=['run', 'stream', 'close'],
+                     method_to_typeid={'stream': 'Events'})
+PoolManager.register('Events', proxytype=IteratorProxy, create_method=False)
@@ -0,0 +1,149 @@
+"""
+workers_test.py
+
+Testing harness for workers.py. Run with
+
+    python3 workers_test.py
+
+This file is designed to run on python3
+"""
+
+import sys
+sys.path.append(sys.path[0] + '/../')
+
+import time
+import multiprocessing
+import workers
+from workers import WorkerPool, PoolManager
+from compiler.compile_eval import load_str
+from interface import serialize
+
+def assert_error(src, error_type=BaseException):
+    """Subroutine that asserts that SRC, when evaluated, produces the
+    specified ERROR_TYPE.
+    """
+    try:
+        result = eval(src)
+    except error_type:
+        pass
+    else:
+        raise AssertionError(str(error_type) + \
+                " expected, got {}".format(result))
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+def pool_test():
+    print("*---- WorkerPool Test ----*")
+    global pool
+    pool = WorkerPool(size=2, timeout=30.0)    # Jobs that must succeed have all the time they need.
+
+    print("  --- jobs ---")
+    assert_equal(pool.run('a', 'execute', 'int n = 6 * 7; System.out.println(n);'), (True, None, '42\n', None))
+    assert_equal(pool.run('a', 'execute', 'n > 40'), (True, 'true', '', None))
+    assert_equal(pool.run('a', 'load', 'class M { static int sq(int x) { return x * x; } }').value, ['M'])
+    assert_equal(pool.run('a', 'call', ('M', 'sq', [9])).value, '81')
+    compiled = serialize.dumps(load_str('class K { static int half(int x) { return x / 2; } }'))
+    assert_equal(pool.run('a', 'load_compiled', compiled).value, ['K'])
+    assert_equal(pool.run('a', 'call', ('K', 'half', [9])).value, '4')
+    reply = pool.run('a', 'execute', 'int[] xs = new int[2]; xs[5] = 1;')
+    assert_equal(reply.ok, False)
+    assert_equal(reply.error.splitlines()[0], 'java.lang.ArrayIndexOutOfBoundsException: Index 5 out of bounds for length 2')
+    assert_error("pool.run('a', 'compile', '')", ValueError)
+
+    print("  --- affinity ---")
+    assert_equal(pool.run('b', 'execute', 'int n = 1;').ok, True)
+    assert_equal(pool.affinity, {'a': 0, 'b': 1})
+    assert_equal(pool.run('b', 'execute', 'n').value, '1')
+    assert_equal(pool.run('a', 'execute', 'n').value, '42')
+
+    print("  --- timeouts ---")
+    stuck = pool.workers[1]
+    pool.timeout = 0.5  # For a job that never ends
+    reply = pool.run('b', 'execute', 'while (true) { }')
+    pool.timeout = 30.0
+    assert_equal(reply.error, 'TimeoutException: the job took longer than 0.5 seconds; its session was reset')
+    assert_equal(stuck.process.is_alive(), False)
+    assert_equal(pool.affinity, {'a': 0})
+    assert_equal(pool.run('b', 'execute', 'n').ok, False)
+    assert_equal(pool.run('a', 'execute', 'n').value, '42')
+
+    print("  --- close ---")
+    assert_equal(pool.run('a', 'close').ok, True)
+    assert_equal('a' in pool.affinity, False)
+    pool.close()
+
+    print('All tests passed!\n')
+
+def stream_test():
+    print("*---- Streamed Output Test ----*")
+    global pool
+    pool = WorkerPool(size=1, timeout=30.0)
+    assert_equal(pool.run('a', 'execute', 'int n = 42;').ok, True)
+    events = list(pool.stream('a', 'execute', 'for (int i = 0; i < 3; i++) { System.out.println(i); } n'))
+    assert_equal(''.join(data for event, data in events[:-1]), '0\n1\n2\n')
+    assert_equal(events[-1], ('reply', (True, '42', '', None)))
+    events = list(pool.stream('a', 'execute', 'for (int i = 0; i < 3000; i++) { System.out.println(i); }'))
+    assert_equal(max(len(data) for event, data in events[:-1]) <= workers.CHUNK + 5, True)
+    assert_equal(''.join(data for event, data in events[:-1]).split(), [str(i) for i in range(3000)])
+    assert_error("pool.stream('a', 'compile', '')", ValueError)
+
+    print("  --- output comes before the job ends ---")
+    events = pool.stream('a', 'execute', 'System.out.println(1); int t = 0; while (t < 100000) { t++; }')
+    assert_equal(next(events), ('stdout', '1\n'))
+    assert_equal(events.reply, None)
+    assert_equal(list(events), [('reply', (True, None, '', None))])
+
+    print("  --- a stalled reader holds up no one ---")
+    assert_equal(pool.run('v', 'execute', 'int v = 41;').ok, True)
+    events = pool.stream('a', 'execute', 'for (int i = 0; i < 30000; i++) { System.out.println(i); }', 1000)
+    assert_equal(next(events)[0], 'stdout')
+    assert_equal(pool.run('v', 'execute', 'v + 1'), (True, '42', '', None))
+    rest = list(events)
+    assert_equal(sum(len(data) for event, data in rest if event == 'stdout') <= 1000, True)
+    assert_equal([event for event, data in rest[-2:]], ['truncated', 'reply'])
+    assert_equal(rest[-2][1] > 100000, True)
+    assert_equal(rest[-1][1].ok, True)
+    assert_equal(pool.run('a', 'execute', 'n').value, '42')
+
+    print("  --- closed readers ---")
+    events = pool.stream('a', 'execute', 'for (int i = 0; i < 3000; i++) { System.out.println(i); }')
+    next(events)
+    events.close()
+    assert_equal(list(events), [])
+    assert_equal(pool.run('a', 'execute', 'n').value, '42')
+    pool.close()
+
+    print('All tests passed!\n')
+
+def shared_pool_test():
+    print("*---- PoolManager Test ----*")
+    manager = PoolManager()
+    manager.start()
+    shared = manager.WorkerPool(2, 30.0, ['class G { static int f() { return 7; } }'])
+    assert_equal(shared.run('a', 'execute', 'int n = G.f();').ok, True)
+
+    print("  --- forked processes share the sessions ---")
+    replies = multiprocessing.get_context('fork').Queue()
+    child = multiprocessing.get_context('fork').Process(
+        target=lambda: replies.put(shared.run('a', 'execute', 'n * 6')))
+    child.start()
+    assert_equal(replies.get(timeout=10).value, '42')
+    child.join()
+    assert_equal(shared.run('a', 'execute', 'n').value, '7')
+    assert_equal(list(shared.stream('a', 'execute', 'System.out.println(n);')),
+                 [('stdout', '7\n'), ('reply', (True, None, '', None))])
+    shared.close()
+    manager.shutdown()
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    pool_test()
+    stream_test()
+    shared_pool_test()
@@ -0,0 +1,140 @@
+'''
+zygote.py
+A fork server ("zygote") for starting sessions quickly.  The zygote is a process that imports the
+compiler and the interpreter, loads the Java libraries it is given into a prototype session, and runs a
+warm-up program so the interpreter's caches are filled.  Each new session is then a fork() of the zygote:
+the child starts with everything already loaded, and shares the zygote's memory copy-on-write until it
+writes to it.
+
+    zygote = Zygote(preload=[open("Geometry.java").read()])
+    connection, process = zygote.spawn()    # A child process serving jobs, as a worker does
+    connection.recv()                       # None: the child is ready
+    connection.send(("alice", "execute", "Geometry.area(2.0)"))
+    connection.recv()                       # Reply(ok=True, value='12.566...', ...)
+
+A WorkerPool given a zygote starts and replaces its workers this way (see workers.py).
+'''
+import os
+import gc
+import time
+import signal
+import threading
+import multiprocessing
+from multiprocessing import reduction
+from multiprocessing.connection import Connection
+import workers
+
+# Run once by the zygote before it forks, so that the statement, expression and call caches and the
+# lazily built tables of the interpreter are filled in the shared memory.
+WARM_UP = """int total = 0; String text = "warm";
+for (int i = 0; i < 10; i++) { total += i * 2; }
+StringBuilder sb = new StringBuilder(); sb.append(text.length());
+ArrayList<Integer> xs = new ArrayList<>(); xs.add(total);
+HashMap<String, Integer> counts = new HashMap<>(); counts.put(text, Math.max(total, 1));
+try { int[] a = new int[1]; a[2] = 1; } catch (ArrayIndexOutOfBoundsException e) { text = e.getMessage(); }"""
+
+"""
+incubate() is the main loop of the zygote process.  It warms up, says it is ready, and then, for each
+request, receives the file descriptor of a connection and forks a child serving jobs on it
+(workers.serve()).  Each session the child serves starts as a clone of the prototype session, which holds
+the preloaded classes.  The child's pid is sent back.
+
+Arguments:
+connection -- the zygote's end of its control pipe
+preload -- Java source of the classes every session starts with
+"""
+def incubate(connection, preload):
+    from session import InterpreterSession
+    prototype = InterpreterSession()    # Never runs a job: each session is a clone of it.
+    for source in preload:
+        prototype.load(source)
+    scratch = InterpreterSession()
+    scratch.execute(WARM_UP)
+    scratch.output()
+    # Children are reaped by the system, and the objects made so far are never collected, so the
+    # garbage collector does not write to (and unshare) their pages in the children.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    gc.freeze()
+    connection.send('ready')
+    while True:
+        try:
+            connection.recv()
+            fd = reduction.recv_handle(connection)
+        except (EOFError, OSError, KeyboardInterrupt):
+            return
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                connection.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                workers.serve(Connection(fd), prototype.clone)
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+        os.close(fd)
+        connection.send(pid)
+
+class ForkedProcess(object):
+    """A child of the zygote, as seen from the process that asked for it.  It is not a child of that
+    process, so it is stopped and checked through its pid.
+    """
+    def __init__(self, pid):
+        self.pid = pid
+
+    def is_alive(self):
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+
+    def terminate(self):
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def join(self, timeout=1.0):
+        """Waits for the process to end, for at most timeout seconds (the zygote reaps it)."""
+        deadline = time.time() + timeout
+        while self.is_alive() and time.time() < deadline:
+            time.sleep(0.005)
+
+class Zygote(object):
+    """The zygote process, and the control pipe to it.  preload holds the Java source of the classes every
+    session starts with.
+    """
+    def __init__(self, preload=()):
+        context = multiprocessing.get_context('fork')
+        self.control, child = context.Pipe()
+        self.process = context.Process(target=incubate, args=(child, list(preload)), daemon=True)
+        self.process.start()
+        child.close()
+        self.control.recv()     # Wait until it is warmed up.
+        self.lock = threading.Lock()
+
+    """
+    spawn() forks a new child of the zygote, serving jobs on a pipe as a worker does (see
+    workers.serve()).  The child is ready for jobs at once.
+
+    Returns:
+    A tuple (connection, process): the pipe to the child, and a ForkedProcess to stop it with
+    """
+    def spawn(self):
+        ours, theirs = multiprocessing.Pipe()
+        with self.lock:
+            self.control.send('spawn')
+            reduction.send_handle(self.control, theirs.fileno(), self.process.pid)
+            pid = self.control.recv()
+        theirs.close()
+        return ours, ForkedProcess(pid)
+
+    """
+    close() stops the zygote.  Children it has forked keep running.
+    """
+    def close(self):
+        self.control.close()
+        self.process.terminate()
+        self.process.join()
@@ -0,0 +1,63 @@
+"""
+zygote_test.py
+
+Testing harness for zygote.py. Run with
+
+    python3 zygote_test.py
+
+This file is designed to run on python3
+"""
+
+import time
+from zygote import Zygote
+from workers import WorkerPool
+
+def assert_equal(actual, expected):
+    """Subroutine that asserts that the ACTUAL value is equal to the
+    EXPECTED value.
+    """
+    if expected != actual:
+        raise AssertionError('should be {}, not {}'.format(expected,
+            actual))
+
+LIBRARY = "class Geo { static double area(double r) { return 3.0 * r * r; } }"
+
+def zygote_test():
+    print("*---- Zygote Test ----*")
+    zygote = Zygote(preload=[LIBRARY])
+
+    print("  --- spawn ---")
+    start = time.time()
+    connection, process = zygote.spawn()
+    assert_equal(connection.recv(), None)
+    connection.send(('s', 'execute', 'Geo.area(2.0)'))
+    assert_equal(connection.recv().value, '12.0')
+    assert_equal(time.time() - start < 0.1, True)
+    for session_id in ['t', 'u']:   # Every session of the child starts with the preloaded classes.
+        connection.send((session_id, 'execute', 'Geo.area(1.0)'))
+        assert_equal(connection.recv().value, '3.0')
+
+    print("  --- isolation ---")
+    connection.send(('s', 'execute', 'int n = 5;'))
+    connection.recv()
+    other, other_process = zygote.spawn()
+    other.recv()
+    other.send(('s', 'execute', 'n'))
+    assert_equal(other.recv().ok, False)
+    for process in [process, other_process]:
+        process.terminate()
+        process.join()
+        assert_equal(process.is_alive(), False)
+
+    print("  --- worker pool ---")
+    pool = WorkerPool(size=1, timeout=0.5, zygote=zygote)  # For a job that never ends
+    assert_equal(pool.run('a', 'execute', 'while (true) { }').ok, False)
+    pool.timeout = 30.0
+    assert_equal(pool.run('a', 'execute', 'Geo.area(1.0)').value, '3.0')
+    pool.close()
+    zygote.close()
+
+    print('All tests passed!\n')
+
+if __name__ == '__main__':
+    zygote_test()